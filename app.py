@@ -3,33 +3,593 @@ ZonaMaco 2026 VIP Maps - Flask Application
 Serves interactive maps for ZonaMaco art week events
 """
 
+import json
+import mimetypes
 import os
-from flask import Flask, send_from_directory, redirect, url_for
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from datetime import date
+
+from flask import Flask, Response, abort, g, request, send_from_directory, redirect, url_for
+
+from change_log import CHANGES_FILE, changes_since
+from event_snapshot import SNAPSHOT_FILE, EventSnapshot
+from event_store import STORE_FILE, EventStore
+from tile_cache import TileUnavailable, proxy_from_env
 
 app = Flask(__name__, static_folder='static')
 
+MAPS_DIR = 'static/maps'
+RELEASES_DIR = 'static/releases'
+CURRENT_POINTER = os.path.join(RELEASES_DIR, 'CURRENT')
+BUILD_MANIFEST = 'build.json'
+VENDOR_MAX_AGE = 365 * 24 * 3600
+
+# Not in every platform's mime.types; browsers expect this type for the PWA manifest
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+
+
+# =============================================================================
+# METRICS (Prometheus text format)
+# =============================================================================
+# Upper bounds in seconds; the implicit +Inf bucket is the total count.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Metrics:
+    """In-process counters and latency histograms.
+
+    Recording is a bisect plus a handful of integer increments under one lock,
+    so the per-request overhead stays in the low microseconds. Each gunicorn
+    worker keeps its own counters.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.latency_counts = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self.latency_sum = defaultdict(float)
+        self.requests = defaultdict(int)      # (route, status) -> count
+        self.bytes_served = defaultdict(int)  # route -> bytes
+        self.cache = defaultdict(int)         # 'hit' | 'miss' -> count
+        self.root_file = defaultdict(int)     # 'served' | 'redirect' -> count
+        self.tiles = defaultdict(int)         # 'hit' | 'miss' | 'error' -> count (tile proxy)
+        self.change_streams = defaultdict(int)  # 'opened' | 'refused' -> count
+
+    def observe(self, route: str, status: int, seconds: float, size: int, cache_result: str = None):
+        idx = bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.latency_counts[route][idx] += 1
+            self.latency_sum[route] += seconds
+            self.requests[(route, status)] += 1
+            self.bytes_served[route] += size
+            if cache_result:
+                self.cache[cache_result] += 1
+
+    def incr_root_file(self, outcome: str):
+        with self.lock:
+            self.root_file[outcome] += 1
+
+    def incr_tile(self, outcome: str):
+        with self.lock:
+            self.tiles[outcome] += 1
+
+    def incr_change_stream(self, outcome: str):
+        with self.lock:
+            self.change_streams[outcome] += 1
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            lines.append('# HELP zonamaco_request_duration_seconds Request latency by route.')
+            lines.append('# TYPE zonamaco_request_duration_seconds histogram')
+            for route, counts in sorted(self.latency_counts.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f'zonamaco_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'zonamaco_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {cumulative}')
+                lines.append(f'zonamaco_request_duration_seconds_sum{{route="{route}"}} {self.latency_sum[route]:.6f}')
+                lines.append(f'zonamaco_request_duration_seconds_count{{route="{route}"}} {cumulative}')
+
+            lines.append('# HELP zonamaco_requests_total Requests by route and status code.')
+            lines.append('# TYPE zonamaco_requests_total counter')
+            for (route, status), count in sorted(self.requests.items()):
+                lines.append(f'zonamaco_requests_total{{route="{route}",status="{status}"}} {count}')
+
+            lines.append('# HELP zonamaco_response_bytes_total Response body bytes by route.')
+            lines.append('# TYPE zonamaco_response_bytes_total counter')
+            for route, size in sorted(self.bytes_served.items()):
+                lines.append(f'zonamaco_response_bytes_total{{route="{route}"}} {size}')
+
+            lines.append('# HELP zonamaco_cache_total Static files answered 304 (client cache hit) vs sent in full (miss).')
+            lines.append('# TYPE zonamaco_cache_total counter')
+            for result in ('hit', 'miss'):
+                lines.append(f'zonamaco_cache_total{{result="{result}"}} {self.cache[result]}')
+
+            lines.append('# HELP zonamaco_root_file_total Outcomes of serve_root_file(); missing files redirect to the index.')
+            lines.append('# TYPE zonamaco_root_file_total counter')
+            for outcome in ('served', 'redirect'):
+                lines.append(f'zonamaco_root_file_total{{outcome="{outcome}"}} {self.root_file[outcome]}')
+
+            lines.append('# HELP zonamaco_tile_cache_total Tile proxy requests answered from the disk cache (hit), fetched upstream (miss) or failed.')
+            lines.append('# TYPE zonamaco_tile_cache_total counter')
+            for outcome in ('hit', 'miss', 'error'):
+                lines.append(f'zonamaco_tile_cache_total{{outcome="{outcome}"}} {self.tiles[outcome]}')
+
+            lines.append('# HELP zonamaco_change_streams_total /api/changes/stream requests opened or refused (too many open streams).')
+            lines.append('# TYPE zonamaco_change_streams_total counter')
+            for outcome in ('opened', 'refused'):
+                lines.append(f'zonamaco_change_streams_total{{outcome="{outcome}"}} {self.change_streams[outcome]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+# Endpoints whose responses come from send_from_directory and honour If-None-Match
+CACHEABLE_ENDPOINTS = {'index', 'serve_map', 'serve_root_file'}
+
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.endpoint or 'unmatched'
+        size = response.content_length or 0
+        cache_result = None
+        if route in CACHEABLE_ENDPOINTS:
+            if response.status_code == 304:
+                cache_result = 'hit'
+            elif response.status_code == 200:
+                cache_result = 'miss'
+        metrics.observe(route, response.status_code, time.perf_counter() - start, size, cache_result)
+    return response
+
+
+# =============================================================================
+# REAL-USER MONITORING
+# =============================================================================
+RUM_METRICS = {'ttfb', 'dom_interactive', 'dom_content_loaded', 'load',
+               'map_ready', 'markers_rendered', 'sidebar_rendered', 'cards_rendered'}
+RUM_DEVICES = {'mobile', 'mobile-low', 'desktop', 'desktop-low'}
+RUM_SAMPLES_PER_KEY = 500   # most recent samples kept per (page, device, metric)
+RUM_MAX_BODY = 16 * 1024
+RUM_MAX_VALUE_MS = 120000
+
+
+class RumAggregator:
+    """Bounded in-memory store of page timings from the generated pages.
+
+    Only known pages, device classes and metric names are accepted, so memory
+    is capped at pages x devices x metrics x RUM_SAMPLES_PER_KEY values.
+    """
+
+    def __init__(self, samples_per_key=RUM_SAMPLES_PER_KEY):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=samples_per_key))
+
+    def add_batch(self, batch, known_pages) -> int:
+        """Add a list of beacon entries; returns how many samples were accepted."""
+        accepted = 0
+        if not isinstance(batch, list):
+            return 0
+        with self.lock:
+            for entry in batch[:20]:
+                if not isinstance(entry, dict):
+                    continue
+                page, device, values = entry.get('page'), entry.get('device'), entry.get('metrics')
+                if page not in known_pages or device not in RUM_DEVICES or not isinstance(values, dict):
+                    continue
+                for name, value in values.items():
+                    if name in RUM_METRICS and isinstance(value, (int, float)) and 0 <= value <= RUM_MAX_VALUE_MS:
+                        self.samples[(page, device, name)].append(value)
+                        accepted += 1
+        return accepted
+
+    def summary(self) -> dict:
+        """Percentiles per page and device class: {page: {device: {metric: {...}}}}."""
+        with self.lock:
+            snapshot = {key: sorted(values) for key, values in self.samples.items()}
+        result = {}
+        for (page, device, name), values in sorted(snapshot.items()):
+            result.setdefault(page, {}).setdefault(device, {})[name] = {
+                'count': len(values),
+                'p50': _percentile(values, 50),
+                'p75': _percentile(values, 75),
+                'p95': _percentile(values, 95),
+            }
+        return result
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, -(-pct * len(sorted_values) // 100) - 1)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+rum = RumAggregator()
+
+
+def known_pages() -> set:
+    """Page names (file names without .html) that may report timings."""
+    manifest = load_build_manifest()
+    return {os.path.splitext(name)[0] for name in manifest.get('artifacts', []) if name.endswith('.html')}
+
+
+_release_cache = {'mtime': None, 'dir': MAPS_DIR}
+
+
+def maps_dir() -> str:
+    """Directory of the live build.
+
+    Follows static/releases/CURRENT, which the generator replaces atomically
+    after each build, so a request never sees a half-written release. Without
+    a pointer (e.g. a deploy of the committed files) static/maps is served.
+    """
+    try:
+        mtime = os.stat(CURRENT_POINTER).st_mtime_ns
+    except OSError:
+        return MAPS_DIR
+    if mtime != _release_cache['mtime']:
+        try:
+            with open(CURRENT_POINTER, encoding='utf-8') as f:
+                release = os.path.join(RELEASES_DIR, f.read().strip())
+        except OSError:
+            return MAPS_DIR
+        _release_cache['dir'] = release if os.path.isdir(release) else MAPS_DIR
+        _release_cache['mtime'] = mtime
+    return _release_cache['dir']
+
+
+_manifest_cache = {'path': None, 'mtime': None, 'manifest': None}
+
+
+def load_build_manifest() -> dict:
+    """Read the build manifest written by zonamaco_mapper.main().
+
+    The parsed manifest is reused until the file's mtime changes. Trees without
+    one (builds older than the manifest, or the committed static/maps of a
+    static deploy) fall back to the HTML files on disk, with 'manifest': False.
+    """
+    directory = maps_dir()
+    path = os.path.join(directory, BUILD_MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        if (path, mtime) != (_manifest_cache['path'], _manifest_cache['mtime']):
+            with open(path, encoding='utf-8') as f:
+                _manifest_cache['manifest'] = json.load(f)
+            _manifest_cache['path'], _manifest_cache['mtime'] = path, mtime
+        return _manifest_cache['manifest']
+    except (OSError, ValueError):
+        pages = sorted(f for f in os.listdir(directory) if f.endswith('.html')) if os.path.isdir(directory) else []
+        return {'version': 'unversioned', 'artifacts': pages, 'manifest': False}
+
+
+# =============================================================================
+# EVENT SNAPSHOT
+# =============================================================================
+API_MAX_EVENTS = 500
+
+# (path, inode, mtime, size) of the mapped file -> EventSnapshot; replaced as one tuple
+_snapshot = (None, None)
+
+
+def event_snapshot():
+    """The live build's events.bin, memory-mapped read-only, or None if missing or invalid.
+
+    A new release (or a rewritten file) is picked up by mapping it and swapping
+    the module-level reference; requests still holding the old snapshot keep
+    reading it until they finish. Unreadable files keep the previous snapshot.
+    """
+    global _snapshot
+    path = os.path.join(maps_dir(), SNAPSHOT_FILE)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    current_key, snapshot = _snapshot
+    if key != current_key:
+        try:
+            snapshot = EventSnapshot(path)
+        except (OSError, ValueError) as exc:
+            app.logger.warning('event snapshot %s not loaded: %s', path, exc)
+            return snapshot
+        _snapshot = (key, snapshot)
+    return snapshot
+
+
+# =============================================================================
+# EVENT STORE (SQLite)
+# =============================================================================
+_store = threading.local()  # one read-only connection per thread: (file key, EventStore)
+
+
+def event_store():
+    """The live build's events.sqlite opened read-only for this thread, or None if missing."""
+    path = os.path.join(maps_dir(), STORE_FILE)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_ino, st.st_mtime_ns)
+    current_key, store = getattr(_store, 'current', (None, None))
+    if key != current_key:
+        try:
+            new_store = EventStore(path)
+        except (sqlite3.Error, ValueError) as exc:
+            app.logger.warning('event store %s not loaded: %s', path, exc)
+            return store
+        if store is not None:
+            store.close()
+        store = new_store
+        _store.current = (key, store)
+    return store
+
+
+# =============================================================================
+# CHANGE FEED
+# =============================================================================
+CHANGES_MAX_AGE = 5            # seconds; lets proxies answer most polls of a busy evening
+CHANGE_STREAM_POLL = 2         # seconds between checks for a new release
+CHANGE_STREAM_HEARTBEAT = 15   # seconds between keep-alive comments
+CHANGE_STREAM_SECONDS = 55     # a stream ends after this long and EventSource reconnects
+CHANGE_STREAM_RETRY_MS = 5000
+# Each open stream holds a gunicorn thread (16 per worker, see Procfile); past this many per
+# worker, streams are refused with 503 and the pages poll /api/changes instead
+CHANGE_STREAM_MAX = int(os.environ.get('ZONAMACO_CHANGE_STREAMS', 4))
+CHANGE_STREAM_BUSY_RETRY = 60  # seconds, for Retry-After on a refused stream
+
+_change_streams = threading.BoundedSemaphore(CHANGE_STREAM_MAX)
+
+# (path, inode, mtime, size) of the parsed file -> feed; replaced as one tuple
+_change_feed = (None, None)
+
+
+def change_feed():
+    """The live build's changes.json (see change_log.py), parsed once per file, or None if missing."""
+    global _change_feed
+    path = os.path.join(maps_dir(), CHANGES_FILE)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    current_key, feed = _change_feed
+    if key != current_key:
+        try:
+            with open(path, encoding='utf-8') as f:
+                feed = json.load(f)
+        except (OSError, ValueError) as exc:
+            app.logger.warning('change feed %s not loaded: %s', path, exc)
+            return feed
+        _change_feed = (key, feed)
+    return feed
+
+
+def _venue_json(row) -> dict:
+    return {key: row[key] for key in ('key', 'name', 'lat', 'lon', 'venue_type', 'neighborhood',
+                                      'address', 'phone', 'email', 'website')}
+
+
+# =============================================================================
+# TILE PROXY (optional, ZONAMACO_TILE_PROXY=1)
+# =============================================================================
+TILE_MAX_AGE = 7 * 24 * 3600
+
+tile_proxy = proxy_from_env()
+
+
+# =============================================================================
+# ROUTES
+# =============================================================================
 @app.route('/')
 def index():
     """Serve the main index page."""
-    return send_from_directory('static/maps', 'index.html')
+    return send_from_directory(maps_dir(), 'index.html')
+
+def _send_map_file(filename):
+    # vendor/ bundles, fonts and images have content-hashed names
+    max_age = VENDOR_MAX_AGE if filename.startswith('vendor/') else None
+    return send_from_directory(maps_dir(), filename, max_age=max_age)
 
 @app.route('/maps/<path:filename>')
 def serve_map(filename):
     """Serve individual map files."""
-    return send_from_directory('static/maps', filename)
+    return _send_map_file(filename)
 
 @app.route('/<path:filename>')
 def serve_root_file(filename):
     """Serve files from root (for compatibility)."""
-    if os.path.exists(os.path.join('static/maps', filename)):
-        return send_from_directory('static/maps', filename)
+    if os.path.exists(os.path.join(maps_dir(), filename)):
+        metrics.incr_root_file('served')
+        return _send_map_file(filename)
+    metrics.incr_root_file('redirect')
     return redirect(url_for('index'))
 
+@app.route('/tiles/<layer>/<int:z>/<int:x>/<int:y>.png')
+def serve_tile(layer, z, x, y):
+    """Map tile from the disk cache, fetched from the tile server on a miss."""
+    if tile_proxy is None:
+        abort(404)
+    try:
+        data, hit = tile_proxy.get(layer, z, x, y)
+    except (KeyError, ValueError):
+        abort(404)
+    except TileUnavailable:
+        metrics.incr_tile('error')
+        abort(502)
+    metrics.incr_tile('hit' if hit else 'miss')
+    response = Response(data, mimetype='image/png')
+    response.headers['Cache-Control'] = f'public, max-age={TILE_MAX_AGE}'
+    return response
+
+@app.route('/api/events')
+def api_events():
+    """Events from the snapshot in start-time order; filters: day=YYYY-MM-DD, fair, category."""
+    snapshot = event_snapshot()
+    if snapshot is None:
+        return {'error': 'event snapshot not available'}, 503
+    day = request.args.get('day')
+    if day is not None:
+        try:
+            day = date.fromisoformat(day)
+        except ValueError:
+            return {'error': 'day must be YYYY-MM-DD'}, 400
+    rows = snapshot.query(day=day, fair=request.args.get('fair'), category=request.args.get('category'))
+    events = [snapshot.record(row) for _, row in zip(range(API_MAX_EVENTS), rows)]
+    return {'version': snapshot.version, 'count': len(events), 'events': events}
+
+@app.route('/api/changes')
+def api_changes():
+    """Event changes since a version of the change log: since=<version>, log=<log id>."""
+    feed = change_feed()
+    if feed is None:
+        return {'error': 'change feed not available'}, 503
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return {'error': 'since must be an integer'}, 400
+    return changes_since(feed, request.args.get('log'), since), 200, {'Cache-Control': f'public, max-age={CHANGES_MAX_AGE}'}
+
+@app.route('/api/changes/stream')
+def api_changes_stream():
+    """Server-sent events: a `changes` event (id = version) whenever a release brings new changes.
+
+    Starts from Last-Event-ID on reconnects, since=<version> otherwise. Streams
+    end after CHANGE_STREAM_SECONDS so a worker thread is never held for long,
+    and at most CHANGE_STREAM_MAX run at once per worker; beyond that the
+    request gets 503 with Retry-After.
+    """
+    if change_feed() is None:
+        return {'error': 'change feed not available'}, 503
+    log_id = request.args.get('log')
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since', 0))
+    except ValueError:
+        return {'error': 'since must be an integer'}, 400
+    if not _change_streams.acquire(blocking=False):
+        metrics.incr_change_stream('refused')
+        return ({'error': 'too many change streams, poll /api/changes', 'retry': CHANGE_STREAM_BUSY_RETRY}, 503,
+                {'Retry-After': str(CHANGE_STREAM_BUSY_RETRY)})
+    metrics.incr_change_stream('opened')
+
+    def stream(since):
+        yield f'retry: {CHANGE_STREAM_RETRY_MS}\n\n'
+        start = last_sent = time.monotonic()
+        while True:
+            feed = change_feed()
+            if feed is not None and (feed['version'] != since or feed['log'] != log_id):
+                delta = changes_since(feed, log_id, since)
+                yield f"id: {delta['version']}\nevent: changes\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+                if delta.get('reset'):
+                    return
+                since, last_sent = delta['version'], time.monotonic()
+            elif time.monotonic() - last_sent >= CHANGE_STREAM_HEARTBEAT:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+            if time.monotonic() - start >= CHANGE_STREAM_SECONDS:
+                return
+            time.sleep(CHANGE_STREAM_POLL)
+
+    response = Response(stream(since), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The server closes the response however the stream ends (finished, client gone, error)
+    response.call_on_close(_change_streams.release)
+    return response
+
+@app.route('/api/venues')
+def api_venues():
+    """Venues, optionally filtered by neighborhood and type."""
+    store = event_store()
+    if store is None:
+        return {'error': 'event store not available'}, 503
+    rows = store.venues(neighborhood=request.args.get('neighborhood'), venue_type=request.args.get('type'))
+    return {'count': len(rows), 'venues': [_venue_json(row) for row in rows]}
+
+@app.route('/api/venues/<key>/events')
+def api_venue_events(key):
+    """One venue and its events in start-time order (optional day=YYYY-MM-DD)."""
+    store = event_store()
+    if store is None:
+        return {'error': 'event store not available'}, 503
+    venue = store.venue(key)
+    if venue is None:
+        abort(404)
+    rows = store.events(venue=key, day=request.args.get('day'), limit=API_MAX_EVENTS)
+    events = [{k: row[k] for k in ('starts_at', 'fair', 'organizer', 'title', 'description', 'category')}
+              for row in rows]
+    return {'venue': _venue_json(venue), 'count': len(events), 'events': events}
+
 # Health check for deployment platforms
 @app.route('/health')
 def health():
     return {'status': 'healthy', 'app': 'zonamaco-maps'}
 
+@app.route('/ready')
+def ready():
+    """Readiness probe: the build is loaded and its artifacts are present.
+
+    Without build.json (a static deploy of the committed pages, which has no
+    release, snapshot or change feed to wait for) the app is ready as is.
+    """
+    manifest = load_build_manifest()
+    artifacts = manifest.get('artifacts', [])
+    directory = maps_dir()
+    present = sum(1 for name in artifacts if os.path.exists(os.path.join(directory, name)))
+    has_manifest = manifest.get('manifest', True)
+    is_ready = not has_manifest or (bool(artifacts) and present == len(artifacts))
+    body = {
+        'status': 'ready' if is_ready else 'not_ready',
+        'version': manifest.get('version'),
+        'manifest': has_manifest,
+        'artifacts': present,
+        'expected_artifacts': len(artifacts),
+    }
+    return body, 200 if is_ready else 503
+
+@app.route('/rum', methods=['POST'])
+def rum_beacon():
+    """Receive a batch of timings sent with navigator.sendBeacon."""
+    if (request.content_length or 0) > RUM_MAX_BODY:
+        return '', 413
+    # chunked bodies have no Content-Length: read one byte past the limit to tell
+    body = b''
+    while len(body) <= RUM_MAX_BODY:
+        chunk = request.stream.read(RUM_MAX_BODY + 1 - len(body))
+        if not chunk:
+            break
+        body += chunk
+    if len(body) > RUM_MAX_BODY:
+        return '', 413
+    try:
+        batch = json.loads(body or b'[]')
+    except ValueError:
+        return '', 400
+    rum.add_batch(batch, known_pages())
+    return '', 204
+
+@app.route('/rum/summary')
+def rum_summary():
+    """Percentiles per page and device class."""
+    return rum.summary()
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,222 @@
+"""
+Vendored front-end bundles
+--------------------------
+Replaces the per-page CDN <script>/<link> tags in the generated pages with a
+few local, content-hashed bundles: every external script and stylesheet in a
+page's <head> is downloaded once, and the scripts and the stylesheets are
+concatenated in document order into vendor/<hash>.js and vendor/<hash>.css.
+Pages that load the same assets (all day maps, the fair maps) share the same
+bundles, so a visitor downloads them once and the CDNs drop out of the
+critical path.
+
+Relative url()s in the stylesheets (Font Awesome webfonts, Leaflet images,
+Bootstrap glyphicons) are vendored too and rewritten to point next to the
+bundle. Downloads are cached in data/vendor_cache, so only the first build
+needs network access; a page whose assets can't be fetched (or aren't
+UTF-8 text) keeps its CDN links.
+"""
+
+import hashlib
+import os
+import re
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+VENDOR_DIR = "vendor"
+DOWNLOAD_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vendor_cache")
+DOWNLOAD_TIMEOUT = 20  # seconds
+
+SCRIPT_TAG_RE = re.compile(r'[ \t]*<script src="(https://[^"]+\.js)"></script>\n?')
+STYLESHEET_TAG_RE = re.compile(r'[ \t]*<link rel="stylesheet" href="(https://[^"]+\.css)"/?>\n?')
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+SOURCE_MAP_RE = re.compile(r'^\s*(//[#@] sourceMappingURL=.*|/\*[#@] sourceMappingURL=.*?\*/)\s*$', re.MULTILINE)
+CHARSET_RE = re.compile(r'@charset\s+"[^"]*";\s*', re.IGNORECASE)
+
+
+def _short_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class AssetFetcher:
+    """Download URLs once per build, backed by an on-disk cache across builds."""
+
+    def __init__(self, cache_dir: str = DOWNLOAD_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.memo: Dict[str, Optional[bytes]] = {}
+
+    def _cache_path(self, url: str) -> str:
+        ext = os.path.splitext(urlsplit(url).path)[1]
+        return os.path.join(self.cache_dir, _short_hash(url.encode("utf-8")) + ext)
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        """Body of url, or None if it can't be downloaded."""
+        if url in self.memo:
+            return self.memo[url]
+        path = self._cache_path(url)
+        data = None
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+        else:
+            try:
+                request = urllib.request.Request(url, headers={"User-Agent": "zonamaco-maps build"})
+                with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+                    data = response.read()
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data)
+                os.replace(path + ".tmp", path)
+            except OSError as exc:
+                print(f"  ⚠️  No se pudo descargar {url}: {exc}")
+        self.memo[url] = data
+        return data
+
+
+class Bundler:
+    """Builds the vendor/ bundles for a set of pages, deduplicated across pages."""
+
+    def __init__(self, output_dir: str, fetcher: Optional[AssetFetcher] = None):
+        self.output_dir = output_dir
+        self.fetcher = fetcher or AssetFetcher()
+        self.bundles: Dict[Tuple[str, ...], Optional[str]] = {}  # asset URLs -> bundle filename
+        self.files: Dict[str, bytes] = {}  # vendor/<name> -> content
+
+    def _emit(self, data: bytes, ext: str) -> str:
+        name = f"{VENDOR_DIR}/{_short_hash(data)}{ext}"
+        self.files[name] = data
+        return name
+
+    def _vendor_css_urls(self, css: str, base_url: str) -> Optional[str]:
+        """Rewrite url()s relative to the stylesheet to vendored copies next to the bundle."""
+        missing = []
+
+        def replace(match):
+            ref = match.group(2).strip()
+            if ref.startswith(("data:", "#")):
+                return match.group(0)
+            absolute, fragment = urldefrag(urljoin(base_url, ref))
+            target = absolute.split("?", 1)[0]
+            data = self.fetcher.fetch(target)
+            if data is None:
+                missing.append(target)
+                return f'url("{absolute}{"#" + fragment if fragment else ""}")'
+            name = self._emit(data, os.path.splitext(urlsplit(target).path)[1])
+            suffix = absolute[len(target):] + ("#" + fragment if fragment else "")
+            return f'url("{os.path.basename(name)}{suffix}")'
+
+        rewritten = CSS_URL_RE.sub(replace, css)
+        if missing:
+            print(f"  ⚠️  {len(missing)} recursos de {base_url} se quedan en el CDN")
+        return rewritten
+
+    def bundle(self, urls: Tuple[str, ...], ext: str) -> Optional[str]:
+        """Filename of the bundle for these URLs (in order), or None if one can't be fetched."""
+        key = (ext,) + urls
+        if key in self.bundles:
+            return self.bundles[key]
+        parts = []
+        for url in urls:
+            data = self.fetcher.fetch(url)
+            if data is None:
+                self.bundles[key] = None
+                return None
+            try:
+                text = SOURCE_MAP_RE.sub("", data.decode("utf-8-sig"))
+            except UnicodeDecodeError as exc:
+                print(f"  ⚠️  {url} no es UTF-8 ({exc.reason}), se queda en el CDN")
+                self.bundles[key] = None
+                return None
+            if ext == ".css":
+                text = self._vendor_css_urls(CHARSET_RE.sub("", text), url)
+            parts.append(f"/* {url} */\n{text.strip()}\n")
+        separator = "\n" if ext == ".css" else ";\n"
+        content = separator.join(parts)
+        if ext == ".css":
+            content = '@charset "UTF-8";\n' + content
+        name = self._emit(content.encode("utf-8"), ext)
+        self.bundles[key] = name
+        return name
+
+    def rewrite_page(self, html: str) -> str:
+        """Replace the page's external <head> scripts and stylesheets with bundle tags.
+
+        The script bundle takes the place of the first script (inline scripts
+        before it still run first); the stylesheet bundle the place of the last
+        stylesheet, so the CDN styles keep their relative order.
+        """
+        head_end = html.find("</head>")
+        if head_end < 0:
+            return html
+        head, rest = html[:head_end], html[head_end:]
+
+        scripts = SCRIPT_TAG_RE.findall(head)
+        if scripts:
+            name = self.bundle(tuple(scripts), ".js")
+            if name:
+                first = SCRIPT_TAG_RE.search(head)
+                tag = f'    <script src="{name}"></script>\n'
+                head = head[:first.start()] + tag + SCRIPT_TAG_RE.sub("", head[first.start():])
+
+        stylesheets = STYLESHEET_TAG_RE.findall(head)
+        if stylesheets:
+            name = self.bundle(tuple(stylesheets), ".css")
+            if name:
+                last = list(STYLESHEET_TAG_RE.finditer(head))[-1]
+                tag = f'    <link rel="stylesheet" href="{name}"/>\n'
+                head = STYLESHEET_TAG_RE.sub("", head[:last.start()]) + tag + head[last.end():]
+        return head + rest
+
+    def write_files(self) -> List[str]:
+        os.makedirs(os.path.join(self.output_dir, VENDOR_DIR), exist_ok=True)
+        for name, data in self.files.items():
+            path = os.path.join(self.output_dir, name)
+            if not os.path.exists(path):  # content-hashed names never change content
+                with open(path, "wb") as f:
+                    f.write(data)
+        return sorted(self.files)
+
+
+def referenced_vendor_files(output_dir: str) -> List[str]:
+    """vendor/ files used by the pages in output_dir (bundles plus the fonts/images they load)."""
+    vendor_path = os.path.join(output_dir, VENDOR_DIR)
+    used = set()
+    for page in os.listdir(output_dir):
+        if page.endswith(".html"):
+            with open(os.path.join(output_dir, page), encoding="utf-8") as f:
+                used.update(re.findall(rf'"({VENDOR_DIR}/[0-9a-f]+\.(?:js|css))"', f.read()))
+    for name in sorted(n for n in used if n.endswith(".css")):
+        try:
+            with open(os.path.join(output_dir, name), encoding="utf-8") as f:
+                css = f.read()
+        except OSError:
+            continue
+        for _, ref in CSS_URL_RE.findall(css):
+            ref = ref.split("#", 1)[0].split("?", 1)[0]
+            if "/" not in ref and os.path.exists(os.path.join(vendor_path, ref)):
+                used.add(f"{VENDOR_DIR}/{ref}")
+    return sorted(n for n in used if os.path.exists(os.path.join(output_dir, n)))
+
+
+def bundle_pages(output_dir: str, pages: List[str]) -> List[str]:
+    """Rewrite `pages` to use vendored bundles and drop vendor files no page uses.
+
+    Returns every vendor/ file the pages in output_dir reference.
+    """
+    bundler = Bundler(output_dir)
+    for page in pages:
+        path = os.path.join(output_dir, page)
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        rewritten = bundler.rewrite_page(html)
+        if rewritten != html:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(rewritten)
+    bundler.write_files()
+
+    used = referenced_vendor_files(output_dir)
+    vendor_path = os.path.join(output_dir, VENDOR_DIR)
+    for name in os.listdir(vendor_path):
+        if f"{VENDOR_DIR}/{name}" not in used:
+            os.remove(os.path.join(vendor_path, name))
+    return used
@@ -0,0 +1,150 @@
+"""
+Event change log
+----------------
+Every build diffs its events against the ones the previous build published
+and appends what was added, updated or removed to a SQLite log
+(data/change_log.sqlite by default), under a version number that grows by one
+per build with changes. Events are identified by event_ids(): a hash of fair,
+organizer, title and day, so a rescheduled opening is an update of the same
+event rather than a removal plus an addition.
+
+The build exports the most recent versions into changes.json in the release.
+app.py serves deltas from it (/api/changes?since=<version> and an SSE stream),
+and the pages, which carry the version they were rendered at, patch their
+rows in place. Each log has a random id; a client whose id or version the
+feed can't answer from gets a reset instead of a wrong delta.
+
+The log file must persist between builds (it is gitignored, so keep data/ or
+point ZONAMACO_CHANGE_LOG at a persistent path on the build host). A build
+that starts a new log gets a new id on purpose: its versions restart at 1, so
+pages published from the old log get a reset and stay as rendered until they
+are reloaded, rather than being patched with another log's deltas.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CHANGES_FILE = "changes.json"
+DEFAULT_CHANGE_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "change_log.sqlite")
+FEED_VERSIONS = 50  # versions exported to changes.json; older clients get a reset
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, record TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS versions (version INTEGER PRIMARY KEY, built_at TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    version INTEGER NOT NULL REFERENCES versions(version),
+    op TEXT NOT NULL,
+    id TEXT NOT NULL,
+    record TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_version ON changes(version);
+"""
+
+
+def event_ids(events: Iterable) -> Dict[int, str]:
+    """id(event) -> stable event id, for zonamaco_mapper.Event objects.
+
+    The id hashes fair, organizer, title and day. Events sharing all four get
+    "-2", "-3", ... in start-time order, so any list holding all events of a
+    day (a day page, a fair page, the whole catalog) gives the same ids.
+    """
+    ids, seen = {}, {}
+    for event in sorted(events, key=lambda e: e.date):
+        base = hashlib.sha1(json.dumps([event.fair, event.organizer, event.title, event.date.date().isoformat()],
+                                       ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+        seen[base] = seen.get(base, 0) + 1
+        ids[id(event)] = base if seen[base] == 1 else f"{base}-{seen[base]}"
+    return ids
+
+
+class ChangeLog:
+    """The persistent log; record() once per build, then export() into the release.
+
+    created is True when this opened a new log (and gave it a new id).
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.created = self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('log', ?)",
+                                             (secrets.token_hex(8),)).rowcount == 1
+        self.log_id: str = self.conn.execute("SELECT value FROM meta WHERE key = 'log'").fetchone()[0]
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @property
+    def version(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(version), 0) FROM versions").fetchone()[0]
+
+    def record(self, records: Dict[str, dict]) -> Tuple[int, Dict[str, int]]:
+        """Log the differences between records ({event id: JSON-ready dict}) and the last published set.
+
+        Returns (current version, {op: count}); the version only moves when something changed.
+        """
+        new = {event_id: json.dumps(record, ensure_ascii=False, sort_keys=True) for event_id, record in records.items()}
+        old = dict(self.conn.execute("SELECT id, record FROM events"))
+        changes = [("added", event_id, new[event_id]) for event_id in sorted(new.keys() - old.keys())]
+        changes += [("updated", event_id, new[event_id]) for event_id in sorted(new.keys() & old.keys())
+                    if new[event_id] != old[event_id]]
+        changes += [("removed", event_id, None) for event_id in sorted(old.keys() - new.keys())]
+        counts = {op: sum(1 for change in changes if change[0] == op) for op in ("added", "updated", "removed")}
+        if not changes:
+            return self.version, counts
+        version = self.version + 1
+        with self.conn:
+            self.conn.execute("INSERT INTO versions (version, built_at) VALUES (?, ?)",
+                              (version, datetime.now().isoformat(timespec="seconds")))
+            self.conn.executemany("INSERT INTO changes (version, op, id, record) VALUES (?, ?, ?, ?)",
+                                  [(version, op, event_id, record) for op, event_id, record in changes])
+            self.conn.execute("DELETE FROM events")
+            self.conn.executemany("INSERT INTO events (id, record) VALUES (?, ?)", sorted(new.items()))
+        return version, counts
+
+    def feed(self, versions: int = FEED_VERSIONS) -> dict:
+        """The last `versions` versions as {log, version, oldest, changes: [[version, op, id, record or None]]}.
+
+        A client at any version from oldest on can be brought up to date from it.
+        """
+        version = self.version
+        oldest = max(0, version - versions)
+        rows = self.conn.execute("SELECT version, op, id, record FROM changes WHERE version > ? ORDER BY seq",
+                                 (oldest,))
+        return {
+            "log": self.log_id,
+            "version": version,
+            "oldest": oldest,
+            "changes": [[v, op, event_id, None if record is None else json.loads(record)] for v, op, event_id, record in rows],
+        }
+
+    def export(self, path: str, versions: int = FEED_VERSIONS) -> int:
+        """Write feed() to path (changes.json in a release); returns its size in bytes."""
+        text = json.dumps(self.feed(versions), ensure_ascii=False, separators=(",", ":"))
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+        return len(text.encode("utf-8"))
+
+
+def changes_since(feed: dict, log_id: Optional[str], since: int) -> dict:
+    """The delta a client at (log_id, since) needs: one entry per changed event, the last change winning.
+
+    Clients of another log, ahead of the feed or older than what it holds get {"reset": true}.
+    """
+    if log_id != feed["log"] or since > feed["version"] or since < feed["oldest"]:
+        return {"log": feed["log"], "version": feed["version"], "reset": True}
+    latest: Dict[str, List] = {}
+    for version, op, event_id, record in feed["changes"]:
+        if version > since:
+            latest.pop(event_id, None)  # keep the order of the last change
+            latest[event_id] = [op, event_id, record]
+    return {"log": feed["log"], "version": feed["version"], "changes": list(latest.values())}
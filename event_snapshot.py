@@ -0,0 +1,212 @@
+"""
+Binary event snapshot
+---------------------
+The build writes every event into events.bin next to the pages: fixed-width
+little-endian columns (start time, coordinates, category/fair/period codes,
+string ids), one deduplicated UTF-8 string table and prebuilt sort orders.
+app.py maps the file read-only, so all gunicorn workers share one copy in the
+page cache, opening it costs a header parse, and queries read the columns
+through memoryview casts without copying or parsing anything.
+
+Layout: a 16-byte header (magic, format version, metadata length, row count),
+a JSON metadata block (section offsets, code tables, content version) and the
+sections themselves, each 8-byte aligned.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SNAPSHOT_FILE = "events.bin"
+MAGIC = b"ZMEV"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHII")  # magic, format version, reserved, metadata bytes, rows
+ALIGN = 8
+EPOCH = datetime(1970, 1, 1)
+NO_COORD = -2 ** 31  # lat/lon of events without a venue
+COORD_SCALE = 1_000_000  # microdegrees
+
+CODE_COLUMNS = ("category", "fair", "time_period", "venue_type")
+STRING_COLUMNS = ("organizer", "title", "description", "neighborhood", "venue")
+
+if sys.byteorder != "little":  # memoryview.cast reads native order
+    raise ImportError("event_snapshot requires a little-endian platform")
+
+
+def _event_fields(event) -> dict:
+    venue = event.venue
+    return {
+        "category": event.category,
+        "fair": event.fair,
+        "time_period": event.time_period,
+        "venue_type": venue.venue_type if venue else "special",
+        "organizer": event.organizer,
+        "title": event.title,
+        "description": event.description,
+        "neighborhood": venue.neighborhood if venue else "",
+        "venue": venue.name if venue else "",
+    }
+
+
+def encode_snapshot(events: Iterable) -> bytes:
+    """Serialize events (zonamaco_mapper.Event) into the snapshot format."""
+    events = list(events)
+    rows = [_event_fields(e) for e in events]
+    codes: Dict[str, List[str]] = {col: sorted({row[col] for row in rows}) for col in CODE_COLUMNS}
+    if any(len(values) > 255 for values in codes.values()):
+        raise ValueError("more than 255 distinct values in a code column")
+    code_index = {col: {value: i for i, value in enumerate(values)} for col, values in codes.items()}
+
+    strings: Dict[str, int] = {}
+    for row in rows:
+        for col in STRING_COLUMNS:
+            strings.setdefault(row[col], len(strings))
+    blob = bytearray()
+    string_offsets = [0]
+    for text in strings:
+        blob += text.encode("utf-8")
+        string_offsets.append(len(blob))
+
+    def coord(value: Optional[float]) -> int:
+        return NO_COORD if value is None else round(value * COORD_SCALE)
+
+    times = [int((e.date - EPOCH).total_seconds()) for e in events]
+    order_time = sorted(range(len(events)), key=lambda i: (times[i], rows[i]["title"]))
+    order_organizer = sorted(range(len(events)), key=lambda i: (rows[i]["organizer"].casefold(), times[i]))
+
+    sections: List[Tuple[str, str, list]] = [
+        ("time", "q", times),
+        ("lat", "i", [coord(e.lat) for e in events]),
+        ("lon", "i", [coord(e.lon) for e in events]),
+    ]
+    sections += [(col, "B", [code_index[col][row[col]] for row in rows]) for col in CODE_COLUMNS]
+    sections += [(col, "I", [strings[row[col]] for row in rows]) for col in STRING_COLUMNS]
+    sections += [
+        ("order_time", "I", order_time),
+        ("order_organizer", "I", order_organizer),
+        ("string_offsets", "I", string_offsets),
+    ]
+
+    payload = bytearray()
+    layout = {}
+    for name, fmt, values in sections:
+        payload += b"\0" * (-len(payload) % ALIGN)
+        layout[name] = [len(payload), fmt, len(values)]
+        payload += struct.pack(f"<{len(values)}{fmt}", *values)
+    payload += b"\0" * (-len(payload) % ALIGN)
+    layout["string_data"] = [len(payload), "B", len(blob)]
+    payload += blob
+
+    meta = {
+        "version": hashlib.sha256(payload).hexdigest()[:16],
+        "sections": layout,  # offsets relative to the end of the metadata block
+        "codes": codes,
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    meta_bytes += b" " * (-(HEADER.size + len(meta_bytes)) % ALIGN)
+    return HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(meta_bytes), len(events)) + meta_bytes + bytes(payload)
+
+
+def write_snapshot(path: str, events: Iterable) -> int:
+    """Write the snapshot atomically (unchanged content is left alone). Returns its size in bytes."""
+    data = encode_snapshot(events)
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return len(data)
+    except OSError:
+        pass
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return len(data)
+
+
+class EventSnapshot:
+    """Read-only view of an events.bin file.
+
+    Rows are addressed by index; columns are memoryviews over the mapping.
+    Raises ValueError for files that aren't a snapshot of this format version.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        if len(buf) < HEADER.size:
+            raise ValueError(f"{path}: truncated snapshot")
+        magic, version, _, meta_len, self.count = HEADER.unpack_from(buf)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path}: not a version {FORMAT_VERSION} event snapshot")
+        start = HEADER.size + meta_len
+        meta = json.loads(bytes(buf[HEADER.size:start]))
+        self.version: str = meta["version"]
+        self.codes: Dict[str, List[str]] = meta["codes"]
+        self.columns: Dict[str, memoryview] = {}
+        for name, (offset, fmt, length) in meta["sections"].items():
+            end = start + offset + length * struct.calcsize(fmt)
+            if end > len(buf):
+                raise ValueError(f"{path}: section {name} out of bounds")
+            self.columns[name] = buf[start + offset:end].cast(fmt)
+        self._strings = self.columns["string_data"]
+        self._string_offsets = self.columns["string_offsets"]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def string(self, string_id: int) -> str:
+        return str(self._strings[self._string_offsets[string_id]:self._string_offsets[string_id + 1]], "utf-8")
+
+    def code(self, column: str, row: int) -> str:
+        return self.codes[column][self.columns[column][row]]
+
+    def start(self, row: int) -> datetime:
+        return EPOCH + timedelta(seconds=self.columns["time"][row])
+
+    def record(self, row: int) -> dict:
+        """One event as a dict, with the keys of Event.to_dict() plus venue and coordinates."""
+        when = self.start(row)
+        lat, lon = self.columns["lat"][row], self.columns["lon"][row]
+        record = {
+            "date": when.isoformat(),
+            "time": when.strftime("%H:%M"),
+            "lat": None if lat == NO_COORD else lat / COORD_SCALE,
+            "lon": None if lon == NO_COORD else lon / COORD_SCALE,
+        }
+        for column in STRING_COLUMNS:
+            record[column] = self.string(self.columns[column][row])
+        for column in CODE_COLUMNS:
+            record[column] = self.code(column, row)
+        return record
+
+    def _code_of(self, column: str, value: Optional[str]) -> Optional[int]:
+        try:
+            return self.codes[column].index(value)
+        except ValueError:
+            return -1
+
+    def query(self, day: Optional[date] = None, fair: Optional[str] = None,
+              category: Optional[str] = None) -> Iterator[int]:
+        """Rows matching all given filters, in start-time order."""
+        order, times = self.columns["order_time"], self.columns["time"]
+        lo, hi = 0, len(order)
+        if day is not None:
+            first = int((datetime.combine(day, datetime.min.time()) - EPOCH).total_seconds())
+            lo = bisect_left(order, first, key=lambda row: times[row])
+            hi = bisect_left(order, first + 86400, lo, key=lambda row: times[row])
+        filters = [(self.columns[column], self._code_of(column, value))
+                   for column, value in (("fair", fair), ("category", category)) if value is not None]
+        for position in range(lo, hi):
+            row = order[position]
+            if all(column[row] == wanted for column, wanted in filters):
+                yield row
+
+    def by_organizer(self) -> memoryview:
+        """Row indices sorted by organizer (case-insensitive), then start time."""
+        return self.columns["order_organizer"]
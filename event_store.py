@@ -0,0 +1,180 @@
+"""
+SQLite event store
+------------------
+Venues, fairs and events in an embedded SQLite database, indexed on day,
+venue, category, fair and neighborhood so callers fetch only the rows a page
+or endpoint needs instead of scanning the Python lists.
+
+import_catalog() fills a database from the in-code structures (VENUES and the
+parse_*_events() lists); export_catalog() dumps one back out as JSON-ready
+dicts. The build writes a store into every release next to events.bin, and
+app.py opens it read-only. A standalone catalog (data/events.sqlite by
+default) can also be the build's event source instead of the tuple lists.
+"""
+
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+STORE_FILE = "events.sqlite"
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "events.sqlite")
+SCHEMA_VERSION = 2  # 2: venue lat/lon may be NULL (not geocoded yet)
+
+SCHEMA = """
+CREATE TABLE fairs (
+    key TEXT PRIMARY KEY,
+    title TEXT NOT NULL
+);
+CREATE TABLE venues (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    lat REAL,
+    lon REAL,
+    venue_type TEXT NOT NULL,
+    neighborhood TEXT NOT NULL DEFAULT '',
+    address TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT '',
+    website TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE events (
+    id INTEGER PRIMARY KEY,
+    starts_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    fair TEXT NOT NULL REFERENCES fairs(key),
+    organizer TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL,
+    venue_id INTEGER REFERENCES venues(id),
+    venue_key TEXT
+);
+CREATE INDEX events_day ON events(day, starts_at);
+CREATE INDEX events_venue ON events(venue_id, starts_at);
+CREATE INDEX events_category ON events(category, starts_at);
+CREATE INDEX events_fair ON events(fair, starts_at);
+CREATE INDEX venues_neighborhood ON venues(neighborhood);
+"""
+
+VENUE_COLUMNS = ("name", "lat", "lon", "venue_type", "neighborhood", "address", "phone", "email", "website")
+
+# Events joined with their venue; every query below only appends WHERE/ORDER BY
+EVENT_SELECT = """
+SELECT e.id, e.starts_at, e.day, e.fair, e.organizer, e.title, e.description, e.category, e.venue_key,
+       v.key AS venue, v.name AS venue_name, v.lat, v.lon, v.venue_type, v.neighborhood,
+       v.address, v.phone, v.email, v.website
+FROM events e LEFT JOIN venues v ON v.id = e.venue_id
+"""
+
+
+def import_catalog(path: str, venues: Dict[str, object], events: Iterable, fairs: Dict[str, str]) -> int:
+    """Write venues, fairs and events (zonamaco_mapper objects) into a new database at path.
+
+    The file is built next to path and moved into place, so readers never see
+    a partial catalog. Returns the number of events.
+    """
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.executemany("INSERT INTO fairs (key, title) VALUES (?, ?)", sorted(fairs.items()))
+            venue_ids = {}
+            for key, venue in venues.items():
+                cursor = conn.execute(
+                    f"INSERT INTO venues (key, {', '.join(VENUE_COLUMNS)}) VALUES ({', '.join('?' * (len(VENUE_COLUMNS) + 1))})",
+                    (key, *(getattr(venue, column) for column in VENUE_COLUMNS)))
+                venue_ids[id(venue)] = cursor.lastrowid
+            count = 0
+            for event in events:
+                conn.execute(
+                    "INSERT INTO events (starts_at, day, fair, organizer, title, description, category, venue_id, venue_key)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (event.date.isoformat(), event.date.date().isoformat(), event.fair, event.organizer, event.title,
+                     event.description, event.category, venue_ids.get(id(event.venue)), event.venue_key))
+                count += 1
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return count
+
+
+class EventStore:
+    """Queries against a catalog database; every statement is parameterized.
+
+    read_only opens the file with mode=ro, so several processes can share it
+    and a missing file is an error instead of a new empty database.
+    """
+
+    def __init__(self, path: str, read_only: bool = True):
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.close()
+            raise ValueError(f"{path}: schema version {version}, expected {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def fairs(self) -> Dict[str, str]:
+        return dict(self.conn.execute("SELECT key, title FROM fairs ORDER BY key"))
+
+    def venues(self, neighborhood: Optional[str] = None, venue_type: Optional[str] = None) -> List[sqlite3.Row]:
+        clauses, params = [], []
+        if neighborhood is not None:
+            clauses.append("neighborhood = ?")
+            params.append(neighborhood)
+        if venue_type is not None:
+            clauses.append("venue_type = ?")
+            params.append(venue_type)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.conn.execute(f"SELECT * FROM venues{where} ORDER BY id", params).fetchall()
+
+    def venue(self, key: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM venues WHERE key = ?", (key,)).fetchone()
+
+    def events(self, day: Optional[str] = None, fair: Optional[str] = None, category: Optional[str] = None,
+               venue: Optional[str] = None, neighborhood: Optional[str] = None,
+               limit: Optional[int] = None, by_time: bool = True) -> List[sqlite3.Row]:
+        """Events with their venue columns, in start-time order (by_time=False: catalog order).
+
+        day is YYYY-MM-DD; venue is a venue key. All filters are optional and combined.
+        """
+        clauses, params = [], []
+        for clause, value in (("e.day = ?", day), ("e.fair = ?", fair), ("e.category = ?", category),
+                              ("v.key = ?", venue), ("v.neighborhood = ?", neighborhood)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = EVENT_SELECT
+        if clauses:
+            sql += f"WHERE {' AND '.join(clauses)}\n"
+        sql += "ORDER BY e.starts_at, e.id" if by_time else "ORDER BY e.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def export_catalog(self) -> dict:
+        """The whole catalog as JSON-ready dicts: {fairs, venues, events}."""
+        venues = {row["key"]: {column: row[column] for column in VENUE_COLUMNS} for row in self.venues()}
+        events = [{
+            "starts_at": row["starts_at"],
+            "fair": row["fair"],
+            "organizer": row["organizer"],
+            "title": row["title"],
+            "description": row["description"],
+            "category": row["category"],
+            "venue": row["venue"],
+            "venue_key": row["venue_key"],
+        } for row in self.conn.execute(EVENT_SELECT + "ORDER BY e.id")]
+        return {"fairs": self.fairs(), "venues": venues, "events": events}
@@ -0,0 +1,121 @@
+"""
+Fragment cache
+--------------
+Rendered HTML fragments (popups, tooltips, venue contact blocks) keyed by a
+hash of the fields they are rendered from plus a template version. Lookups go
+through an in-process LRU first and a SQLite file second, so a rebuild only
+renders the fragments of events and venues that changed since the last one,
+and a long-running watch session keeps the hot ones in memory.
+
+Entries of other template versions are dropped when the cache is flushed, and
+entries unused for FRAGMENT_MAX_AGE_DAYS are pruned.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+DEFAULT_FRAGMENT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fragment_cache.sqlite")
+FRAGMENT_MEMORY_ENTRIES = 4096
+FRAGMENT_MAX_AGE_DAYS = 30
+
+
+class FragmentCache:
+    """Two-level (memory LRU + SQLite) cache of rendered fragments.
+
+    `path=None` keeps the memory layer only. Disk writes are batched until
+    flush(), which the build calls once per release.
+    """
+
+    def __init__(self, path: Optional[str], version: str, max_entries: int = FRAGMENT_MEMORY_ENTRIES):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.memory: "OrderedDict[str, str]" = OrderedDict()
+        self.pending: Dict[str, str] = {}  # rendered this run, not yet on disk
+        self.touched: set = set()          # read from disk this run (refresh used_at)
+        self.stats = {"memory": 0, "disk": 0, "rendered": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute("CREATE TABLE IF NOT EXISTS fragments ("
+                                   "key TEXT PRIMARY KEY, version TEXT NOT NULL, html TEXT NOT NULL, used_at INTEGER NOT NULL)")
+            except sqlite3.Error as exc:
+                print(f"  ⚠️  Caché de fragmentos desactivada ({self.path}): {exc}")
+                self.path = None
+                return None
+        return self._conn
+
+    def set_version(self, version: str) -> None:
+        """Switch to another template version; the memory entries of the old one can't hit any more."""
+        with self.lock:
+            if version != self.version:
+                self.version = version
+                self.memory.clear()
+
+    def key(self, kind: str, fields) -> str:
+        payload = json.dumps([self.version, kind, fields], ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, fields, render: Callable[[], str]) -> str:
+        """The fragment for (kind, fields), rendering and storing it on a miss.
+
+        `fields` must contain everything the fragment depends on (JSON-serialisable,
+        datetimes allowed).
+        """
+        key = self.key(kind, fields)
+        with self.lock:
+            html = self.memory.get(key)
+            if html is not None:
+                self.memory.move_to_end(key)
+                self.stats["memory"] += 1
+                return html
+            db = self._db()
+            row = db.execute("SELECT html FROM fragments WHERE key = ?", (key,)).fetchone() if db else None
+        if row is not None:
+            html = row[0]
+            result = "disk"
+        else:
+            html = render()
+            result = "rendered"
+        with self.lock:
+            self.stats[result] += 1
+            if result == "disk":
+                self.touched.add(key)
+            else:
+                self.pending[key] = html
+            self.memory[key] = html
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+        return html
+
+    def flush(self) -> Dict[str, int]:
+        """Write new fragments to disk, prune stale ones; returns and resets the hit counters."""
+        with self.lock:
+            db = self._db()
+            if db is not None:
+                now = int(time.time())
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO fragments (key, version, html, used_at) VALUES (?, ?, ?, ?)",
+                                   [(key, self.version, html, now) for key, html in self.pending.items()])
+                    db.executemany("UPDATE fragments SET used_at = ? WHERE key = ?",
+                                   [(now, key) for key in self.touched])
+                    db.execute("DELETE FROM fragments WHERE version != ? OR used_at < ?",
+                               (self.version, now - FRAGMENT_MAX_AGE_DAYS * 86400))
+            self.pending.clear()
+            self.touched.clear()
+            stats, self.stats = self.stats, {"memory": 0, "disk": 0, "rendered": 0}
+        return stats
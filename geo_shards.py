@@ -0,0 +1,173 @@
+"""
+Geohash-sharded proximity data
+------------------------------
+The docs/ deployment has no server, so "near me" runs in the browser. Instead
+of every event, the page fetches a few small static files: the build groups
+venues and their events by the geohash of the venue (SHARD_PRECISION
+characters, cells of roughly 5 x 5 km in Mexico City) and writes one JSON file
+per non-empty cell into shards/.
+
+Each shard lists its venues, their events and the walking minutes from each
+venue to every venue in the same or an adjacent shard within
+WALK_PAIR_MAX_MIN, plus the adjacent shards those pairs point into.
+shards/index.json maps every cell that is, or touches, a non-empty cell to the
+shards to fetch for a position there (itself and its non-empty neighbours),
+so a lookup is one geohash and one dictionary access, and the files a client
+downloads depend on how dense its surroundings are, not on the size of the
+catalog.
+"""
+
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Tuple
+
+SHARD_DIR = "shards"
+SHARD_INDEX = "index.json"
+SHARD_PRECISION = 5
+FORMAT_VERSION = 1
+WALK_PAIR_MAX_MIN = 45  # venue pairs further apart than this aren't listed
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lon: float, precision: int = SHARD_PRECISION) -> str:
+    """Standard base-32 geohash of a point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_bounds(cell: str) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lon_min, lon_max) of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def neighbors(cell: str) -> List[str]:
+    """The (up to 8) cells of the same precision around cell; none beyond the poles."""
+    lat_min, lat_max, lon_min, lon_max = cell_bounds(cell)
+    height, width = lat_max - lat_min, lon_max - lon_min
+    lat, lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+    around = []
+    for dlat in (1, 0, -1):
+        for dlon in (-1, 0, 1):
+            if dlat == dlon == 0 or not -90 < lat + dlat * height < 90:
+                continue
+            around.append(geohash(lat + dlat * height, (lon + dlon * width + 180) % 360 - 180, len(cell)))
+    return around
+
+
+def build_shards(events: Iterable, walk_minutes: Callable[[float, float, float, float], int],
+                 page_of: Callable[[object], str], precision: int = SHARD_PRECISION) -> Tuple[Dict[str, dict], dict]:
+    """Shards and index for events (zonamaco_mapper.Event) with a venue.
+
+    walk_minutes(lat1, lon1, lat2, lon2) gives the walking time of a venue
+    pair; page_of(event) the map page the event links to. Returns
+    ({cell: shard}, index).
+    """
+    venues: Dict[tuple, dict] = {}  # (name, lat, lon) -> venue entry
+    for event in sorted(events, key=lambda e: (e.date, e.organizer)):
+        venue = event.venue
+        if venue is None or not (venue.lat and venue.lon):
+            continue
+        entry = venues.setdefault((venue.name, venue.lat, venue.lon), {
+            "cell": geohash(venue.lat, venue.lon, precision),
+            "row": [venue.name, venue.lat, venue.lon, venue.venue_type, venue.neighborhood],
+            "events": [],
+        })
+        entry["events"].append([event.date.isoformat(timespec="minutes"), event.organizer, event.title,
+                                event.category, event.fair, page_of(event)])
+
+    cells: Dict[str, List[dict]] = {}
+    for key in sorted(venues):
+        cells.setdefault(venues[key]["cell"], []).append(venues[key])
+    adjacent = {cell: [n for n in neighbors(cell) if n in cells] for cell in cells}
+
+    shards = {}
+    for cell, members in sorted(cells.items()):
+        events_rows, walks = [], []
+        for i, venue in enumerate(members):
+            events_rows += [[i] + row for row in venue["events"]]
+            lat, lon = venue["row"][1], venue["row"][2]
+            for other_cell in [cell] + adjacent[cell]:
+                for j, other in enumerate(cells[other_cell]):
+                    if other is venue:
+                        continue
+                    minutes = walk_minutes(lat, lon, other["row"][1], other["row"][2])
+                    if minutes <= WALK_PAIR_MAX_MIN:
+                        walks.append([i, other_cell, j, minutes])
+        shards[cell] = {
+            "version": FORMAT_VERSION,
+            "cell": cell,
+            "neighbors": adjacent[cell],
+            # [name, lat, lon, venue_type, neighborhood]
+            "venues": [venue["row"] for venue in members],
+            # [venue index, start, organizer, title, category, fair, page], by start time
+            "events": sorted(events_rows, key=lambda row: (row[1], row[0])),
+            # [venue index, shard of the other venue, its index there, walking minutes], nearest first
+            "walks": sorted(walks, key=lambda row: (row[0], row[3], row[1], row[2])),
+        }
+
+    lookup: Dict[str, List[str]] = {}
+    for cell in cells:
+        for around in [cell] + neighbors(cell):
+            lookup.setdefault(around, [])
+    for around in lookup:
+        lookup[around] = sorted(c for c in [around] + neighbors(around) if c in cells)
+    index = {"version": FORMAT_VERSION, "precision": precision, "cells": dict(sorted(lookup.items()))}
+    return shards, index
+
+
+def write_shards(directory: str, events: Iterable, walk_minutes: Callable[[float, float, float, float], int],
+                 page_of: Callable[[object], str], precision: int = SHARD_PRECISION) -> Tuple[int, int]:
+    """Write shards/<cell>.json and shards/index.json, dropping shards of cells that emptied.
+
+    Returns (shard count, total bytes).
+    """
+    shards, index = build_shards(events, walk_minutes, page_of, precision)
+    os.makedirs(directory, exist_ok=True)
+    files = {f"{cell}.json": shard for cell, shard in shards.items()}
+    files[SHARD_INDEX] = index
+    total = 0
+    for name, data in files.items():
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        total += len(text.encode("utf-8"))
+        path = os.path.join(directory, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                if f.read() == text:
+                    continue
+        except OSError:
+            pass
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+    for name in os.listdir(directory):
+        if name.endswith(".json") and name not in files:
+            os.remove(os.path.join(directory, name))
+    return len(shards), total
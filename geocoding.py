@@ -0,0 +1,212 @@
+"""
+Offline geocoding
+-----------------
+Fills in coordinates the venue table doesn't have. Addresses are looked up
+through a pluggable geocoder, either:
+
+- gazetteer:<path>: a local JSON ({"address": [lat, lon]}) or CSV
+  (address,lat,lon) file;
+- nominatim:<base url>: a Nominatim-compatible /search endpoint (a local
+  Nominatim, or any stand-in serving the same API). Lookups run on a few
+  worker threads over keep-alive connections and are retried with
+  exponential backoff on connection errors, 429 and 5xx.
+
+Every answer, including "not found", goes into a SQLite cache
+(data/geocode_cache.sqlite by default) keyed by the normalized address, so a
+repeat build makes no geocoder calls. Misses are asked again only when a
+different geocoder is configured; lookups that failed are not cached.
+
+The build reads the geocoder from ZONAMACO_GEOCODER and the cache file from
+ZONAMACO_GEOCODE_CACHE; without a geocoder only the cache is consulted.
+`validate` only reads the cache, even with a geocoder configured.
+"""
+
+import csv
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+DEFAULT_GEOCODE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "geocode_cache.sqlite")
+GEOCODE_WORKERS = 4
+GEOCODE_RETRIES = 3     # attempts after the first one
+GEOCODE_BACKOFF = 0.5   # seconds before the first retry, doubled for each further one
+GEOCODE_TIMEOUT = 10    # seconds
+USER_AGENT = "zonamaco-maps geocoder"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+Coords = Tuple[float, float]
+
+
+class GeocodeUnavailable(Exception):
+    """The geocoder couldn't answer (as opposed to answering "not found")."""
+
+
+def normalize_address(address: str) -> str:
+    """Cache and gazetteer key: lowercase, no accents or punctuation, comma-separated parts."""
+    text = unicodedata.normalize("NFKD", address).encode("ascii", "ignore").decode("ascii").lower()
+    parts = (" ".join(re.sub(r"[^a-z0-9]+", " ", part).split()) for part in text.split(","))
+    return ", ".join(part for part in parts if part)
+
+
+class GazetteerGeocoder:
+    """Lookups in a local address file; an address matches its longest listed leading part."""
+
+    def __init__(self, path: str):
+        self.name = f"gazetteer:{path}"
+        self.entries: Dict[str, Coords] = {}
+        with open(path, encoding="utf-8", newline="") as f:
+            if path.endswith(".csv"):
+                rows = [(row["address"], row["lat"], row["lon"]) for row in csv.DictReader(f)]
+            else:
+                rows = [(address, lat, lon) for address, (lat, lon) in json.load(f).items()]
+        for address, lat, lon in rows:
+            self.entries[normalize_address(address)] = (float(lat), float(lon))
+
+    def lookup(self, address: str) -> Optional[Coords]:
+        parts = normalize_address(address).split(", ")
+        for end in range(len(parts), 0, -1):
+            coords = self.entries.get(", ".join(parts[:end]))
+            if coords is not None:
+                return coords
+        return None
+
+
+class NominatimGeocoder:
+    """Lookups against a Nominatim-compatible /search endpoint."""
+
+    def __init__(self, base_url: str, workers: int = GEOCODE_WORKERS, retries: int = GEOCODE_RETRIES,
+                 backoff: float = GEOCODE_BACKOFF):
+        from tile_cache import ConnectionPool  # http.client is only needed with a Nominatim geocoder
+
+        url = urlsplit(base_url)
+        self.name = f"nominatim:{base_url}"
+        self.path = url.path.rstrip("/") + "/search"
+        self.pool = ConnectionPool(url.scheme, url.netloc, size=workers, timeout=GEOCODE_TIMEOUT, user_agent=USER_AGENT)
+        self.retries = retries
+        self.backoff = backoff
+
+    def lookup(self, address: str) -> Optional[Coords]:
+        import http.client
+
+        path = f"{self.path}?{urlencode({'q': address, 'format': 'jsonv2', 'limit': 1})}"
+        for attempt in range(self.retries + 1):
+            try:
+                status, body = self.pool.request(path)
+            except (http.client.HTTPException, OSError) as exc:
+                error = f"{exc}"
+            else:
+                if status == 200:
+                    try:
+                        results = json.loads(body)
+                        return (float(results[0]["lat"]), float(results[0]["lon"])) if results else None
+                    except (ValueError, KeyError, IndexError, TypeError) as exc:
+                        raise GeocodeUnavailable(f"{address}: bad response ({exc})") from exc
+                if status not in RETRY_STATUSES:
+                    raise GeocodeUnavailable(f"{address}: status {status}")
+                error = f"status {status}"
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        raise GeocodeUnavailable(f"{address}: {error} after {self.retries + 1} attempts")
+
+
+def geocoder_from_spec(spec: str, workers: int = GEOCODE_WORKERS):
+    """A geocoder from "gazetteer:<path>" or "nominatim:<base url>"; ValueError otherwise."""
+    kind, _, target = spec.partition(":")
+    if kind == "gazetteer" and target:
+        return GazetteerGeocoder(target)
+    if kind == "nominatim" and target:
+        return NominatimGeocoder(target, workers=workers)
+    raise ValueError(f"unknown geocoder {spec!r} (expected gazetteer:<path> or nominatim:<url>)")
+
+
+def geocoder_from_env(workers: int = GEOCODE_WORKERS):
+    """The geocoder configured by ZONAMACO_GEOCODER, or None."""
+    spec = os.environ.get("ZONAMACO_GEOCODER")
+    return geocoder_from_spec(spec, workers) if spec else None
+
+
+class GeocodeCache:
+    """Answers by normalized address; lat/lon are NULL for addresses the source didn't find.
+
+    read_only opens an existing cache without creating or changing it; a missing file reads as empty.
+    """
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.conn: Optional[sqlite3.Connection] = None
+        if read_only:
+            if os.path.exists(path):
+                self.conn = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS geocodes ("
+                              "key TEXT PRIMARY KEY, lat REAL, lon REAL, source TEXT NOT NULL, resolved_at TEXT NOT NULL)")
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+
+    def get(self, key: str) -> Optional[Tuple[Optional[float], Optional[float], str]]:
+        if self.conn is None:
+            return None
+        return self.conn.execute("SELECT lat, lon, source FROM geocodes WHERE key = ?", (key,)).fetchone()
+
+    def put(self, answers: Dict[str, Optional[Coords]], source: str) -> None:
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO geocodes (key, lat, lon, source, resolved_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, *(coords or (None, None)), source, now) for key, coords in answers.items()])
+
+
+def geocode(addresses: Iterable[str], cache: GeocodeCache, geocoder=None,
+            workers: int = GEOCODE_WORKERS) -> Tuple[Dict[str, Optional[Coords]], Dict[str, int]]:
+    """Coordinates for addresses ({address: (lat, lon) or None}) and counts of how they were answered.
+
+    Each normalized address is looked up once; cache misses go to the
+    geocoder (if any) on `workers` threads. Counts: cached, geocoded (calls
+    made), found (by those calls), failed (calls that raised).
+    """
+    keys = {address: normalize_address(address) for address in addresses}
+    stats = {"cached": 0, "geocoded": 0, "found": 0, "failed": 0}
+    known: Dict[str, Optional[Coords]] = {}
+    todo: Dict[str, str] = {}  # key -> address sent to the geocoder
+    for address, key in keys.items():
+        if key in known or key in todo:
+            continue
+        row = cache.get(key)
+        if row is not None and (row[0] is not None or geocoder is None or row[2] == geocoder.name):
+            known[key] = None if row[0] is None else (row[0], row[1])
+            stats["cached"] += 1
+        elif geocoder is not None:
+            todo[key] = address
+        else:
+            known[key] = None
+
+    def lookup(address: str) -> Tuple[Optional[Coords], bool]:
+        try:
+            return geocoder.lookup(address), True
+        except GeocodeUnavailable as exc:
+            print(f"  ⚠️  Geocodificación fallida: {exc}")
+            return None, False
+
+    if todo:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = dict(zip(todo, pool.map(lookup, todo.values())))
+        answered = {key: coords for key, (coords, ok) in results.items() if ok}
+        cache.put(answered, geocoder.name)
+        for key, (coords, ok) in results.items():
+            known[key] = coords
+        stats["geocoded"] = len(todo)
+        stats["found"] = sum(1 for coords in answered.values() if coords is not None)
+        stats["failed"] = len(todo) - len(answered)
+    return {address: known[key] for address, key in keys.items()}, stats
@@ -0,0 +1,477 @@
+"""
+Direct-Leaflet map pages
+------------------------
+The second map backend (build --backend leaflet). folium builds a Python
+object, a random id and a JS snippet for every marker, popup, tooltip and
+icon, and serializes the tree through Jinja. Here a page is a fixed Leaflet
+shell plus one JSON payload: tiles, overlay layers, markers, the route and the
+layer control. MAP_RUNTIME, the same inline script on every page, creates the
+map from that payload client-side.
+
+Popups are not in the page with either backend. zonamaco_mapper renders
+them once in Python and write_popups() stores them, one per marker, in
+popups/<page>-<hash>.json. LAZY_POPUPS_JS fetches that file the first time
+a marker is hovered or opened and keeps each built popup for the next time,
+so a page's weight doesn't grow with its popups and the HTML has a single
+template. Tooltips are short and stay inline.
+
+Both backends draw from the same MapSpec, which zonamaco_mapper builds once
+per page. folium_features() and leaflet_features() read a finished page of
+either kind back into the same summary, popups included, so check-backends
+can verify that the two produce the same map.
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from page_stream import CompiledTemplate, Chunks, write_chunks
+from tile_cache import TILE_LAYERS, leaflet_tile_layer
+
+# Route arrows for both backends: legs are [lat, lon, rotation_deg, label or ""],
+# the icon markup is built here instead of being shipped once per leg.
+ROUTE_ARROWS_JS = """function(target, color, legs) {
+    var arrowStyle = 'color: ' + color + '; transform: rotate(ROTdeg); text-shadow: 1px 1px 2px white, -1px -1px 2px white; font-weight: bold;';
+    legs.forEach(function(leg) {
+        var arrow = arrowStyle.replace('ROT', leg[2]), html, size;
+        if (leg[3]) {
+            html = '<div style="text-align: center;"><div style="font-size: 14px; ' + arrow + '">➤</div>'
+                + '<div style="font-size: 9px; background: white; color: #666; padding: 1px 4px; border-radius: 8px; box-shadow: 0 1px 3px rgba(0,0,0,0.2); white-space: nowrap; margin-top: 2px;">' + leg[3] + '</div></div>';
+            size = [60, 40];
+        } else {
+            html = '<div style="font-size: 16px; ' + arrow + '">➤</div>';
+            size = [20, 20];
+        }
+        L.marker([leg[0], leg[1]], {
+            icon: L.divIcon({className: 'empty', html: html, iconSize: size, iconAnchor: [size[0] / 2, size[1] / 2]}),
+            interactive: false
+        }).addTo(target);
+    });
+}"""
+
+# Event id -> marker index for both backends, registered once at load: entries are
+# [marker, layer or map it is added to, [event ids]]. zmMarkers.focus(id) pans to an
+# event's marker and opens its popup; zmMarkers.filter(visible) keeps only the markers
+# with at least one event id set in visible, so the sidebar filters drive the map.
+MARKER_INDEX_JS = """function(map, entries) {
+    var byEvent = {};
+    entries.forEach(function(entry) {
+        entry[2].forEach(function(id) { byEvent[id] = entry; });
+    });
+    window.zmMap = map;
+    window.zmMarkers = {
+        focus: function(id) {
+            var entry = byEvent[id];
+            if (!entry) return false;
+            if (!map.hasLayer(entry[1])) map.addLayer(entry[1]);  // overlay switched off in the layer control
+            map.setView(entry[0].getLatLng(), 16);
+            entry[0].openPopup();
+            return true;
+        },
+        filter: function(visible) {
+            entries.forEach(function(entry) {
+                if (!entry[2].length) return;
+                if (entry[2].some(function(id) { return visible[id]; })) entry[1].addLayer(entry[0]);
+                else entry[1].removeLayer(entry[0]);
+            });
+        }
+    };
+}"""
+
+
+POPUP_DIR = "popups"
+
+# Lazy popups for both backends: markers are [marker, popup max width], in the order of
+# the popups file at url. The file is fetched on the first hover or open; a failed fetch
+# shows `failed` and is retried on the next open.
+LAZY_POPUPS_JS = """function(url, markers, failed) {
+    var popups = null, loading = null;
+    function load() {
+        if (!loading) {
+            loading = fetch(url)
+                .then(function(response) {
+                    if (!response.ok) throw new Error(response.status);
+                    return response.json();
+                })
+                .then(function(data) { popups = data; }, function(error) { loading = null; throw error; });
+        }
+        return loading;
+    }
+    markers.forEach(function(entry, i) {
+        var marker = entry[0], element = null;
+        marker.on('mouseover', function() { load().catch(function() {}); });
+        marker.bindPopup(function() {
+            if (element) return element;
+            var built = document.createElement('div');
+            if (popups) {
+                built.innerHTML = popups[i];
+                return element = built;
+            }
+            built.innerHTML = '<div style="padding: 8px; color: #94a3b8;">…</div>';
+            load().then(function() {
+                built.innerHTML = popups[i];
+                element = built;
+                marker.getPopup().update();
+            }, function() {
+                built.innerHTML = '<div style="padding: 8px; color: #94a3b8;">' + failed + '</div>';
+            });
+            return built;
+        }, {maxWidth: entry[1]});
+    });
+}"""
+
+
+def write_popups(page_path: str, popups: List[str]) -> str:
+    """Write a page's popup HTML (one per marker, in order) next to it; returns the URL the page fetches.
+
+    The file is popups/<page>-<content hash>.json, so a cached copy never
+    pairs with a newer page; earlier files of the same page are removed.
+    """
+    text = json.dumps(popups, ensure_ascii=False, separators=(",", ":"))
+    stem = os.path.splitext(os.path.basename(page_path))[0]
+    name = f"{stem}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}.json"
+    directory = os.path.join(os.path.dirname(page_path), POPUP_DIR)
+    os.makedirs(directory, exist_ok=True)
+    earlier = re.compile(re.escape(stem) + r"-[0-9a-f]{12}\.json$")
+    for other in os.listdir(directory):
+        if other != name and earlier.match(other):
+            os.remove(os.path.join(directory, other))
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+    return quote(f"{POPUP_DIR}/{name}")
+
+
+def popup_files(output_dir: str) -> List[str]:
+    """The popups files in output_dir, as paths relative to it."""
+    directory = os.path.join(output_dir, POPUP_DIR)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f"{POPUP_DIR}/{f}" for f in os.listdir(directory) if f.endswith(".json"))
+
+
+def read_popups(directory: str, url: str) -> List[str]:
+    """The popups a page in `directory` fetches from url."""
+    with open(os.path.join(directory, unquote(url)), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass
+class MapMarker:
+    """An awesome-markers pin for one or more co-located events (zonamaco_mapper.Event, chronological).
+
+    layer indexes MapSpec.layers (None: the map itself). The caller renders the
+    popup and tooltip from the events; short_tooltip shows just date and title.
+    ids are the events' ids (change_log.event_ids), for the sidebar's marker index.
+    """
+    lat: float
+    lon: float
+    events: list
+    color: str
+    icon: str
+    prefix: str = "fa"
+    layer: Optional[int] = None
+    max_width: int = 380
+    short_tooltip: bool = False
+    ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class MapRoute:
+    """The suggested route: an animated path plus a direction arrow per leg."""
+    path: List[List[float]]
+    legs: List[list]
+    style: Dict[str, object]  # L.polyline.antPath options
+    arrow_color: str
+    layer: Optional[int] = None
+
+
+@dataclass
+class MapSpec:
+    """Everything on a map page's map, independent of the backend that writes it."""
+    center: List[float]
+    zoom: int
+    tiles: List[Tuple[str, Optional[str]]]  # (TILE_LAYERS key, layer-control name)
+    layers: List[str] = field(default_factory=list)  # overlay feature groups, in order
+    markers: List[MapMarker] = field(default_factory=list)
+    route: Optional[MapRoute] = None
+    scale: bool = False
+    layer_control: Optional[Dict[str, object]] = None  # L.control.layers options
+
+    def tile_name(self, layer: str, name: Optional[str]) -> str:
+        return name or TILE_LAYERS[layer]["folium"]
+
+    def payload(self, tooltips: List[str], popups: str, popup_failed: str) -> dict:
+        """The JSON the runtime reads: tooltips are per marker, popups the URL from write_popups()."""
+        markers = [[m.lat, m.lon, _layer_index(m.layer), m.color, m.icon, m.prefix, tooltip, m.max_width, m.ids]
+                   for m, tooltip in zip(self.markers, tooltips)]
+        tiles = []
+        for layer, name in self.tiles:
+            url, options = leaflet_tile_layer(layer)
+            tiles.append({"name": self.tile_name(layer, name), "url": url, "options": options})
+        route = None
+        if self.route:
+            route = {"layer": _layer_index(self.route.layer), "path": self.route.path, "style": self.route.style,
+                     "arrowColor": self.route.arrow_color, "legs": self.route.legs}
+        return {
+            "center": self.center,
+            "zoom": self.zoom,
+            "scale": self.scale,
+            "tiles": tiles,
+            "layers": self.layers,
+            # [lat, lon, layer or -1, color, icon, prefix, tooltip html, popup max width, [event ids]]
+            "markers": markers,
+            "route": route,
+            "layerControl": self.layer_control,
+            "popups": popups,
+            "popupFailed": popup_failed,
+        }
+
+
+def _layer_index(layer: Optional[int]) -> int:
+    return -1 if layer is None else layer
+
+
+MAP_RUNTIME = """(function() {
+    var routeArrows = """ + ROUTE_ARROWS_JS + """;
+    var markerIndex = """ + MARKER_INDEX_JS + """;
+    var lazyPopups = """ + LAZY_POPUPS_JS + """;
+    var data = JSON.parse(document.getElementById('zm-map-data').textContent);
+    var map = L.map('map', {center: data.center, zoom: data.zoom, zoomControl: true, preferCanvas: false});
+    if (data.scale) L.control.scale().addTo(map);
+    var baseLayers = {}, overlays = {};
+    data.tiles.forEach(function(tile) {
+        baseLayers[tile.name] = L.tileLayer(tile.url, tile.options).addTo(map);
+    });
+    var groups = data.layers.map(function(name) { return overlays[name] = L.featureGroup(); });
+    function target(layer) { return layer < 0 ? map : groups[layer]; }
+    var entries = data.markers.map(function(m) {
+        var marker = L.marker([m[0], m[1]], {icon: L.AwesomeMarkers.icon({icon: m[4], prefix: m[5], markerColor: m[3], iconColor: 'white'})})
+            .bindTooltip(m[6], {sticky: true})
+            .addTo(target(m[2]));
+        return [marker, target(m[2]), m[8]];
+    });
+    lazyPopups(data.popups, entries.map(function(entry, i) { return [entry[0], data.markers[i][7]]; }), data.popupFailed);
+    if (data.route) {
+        L.polyline.antPath(data.route.path, data.route.style).addTo(target(data.route.layer));
+        routeArrows(target(data.route.layer), data.route.arrowColor, data.route.legs);
+    }
+    groups.forEach(function(group) { group.addTo(map); });
+    if (data.layerControl) L.control.layers(baseLayers, overlays, data.layerControl).addTo(map);
+    markerIndex(map, entries);
+})();"""
+
+# Same Leaflet and awesome-markers builds as folium's pages; jQuery, Bootstrap
+# and folium's own stylesheets are not needed without folium's templates.
+LEAFLET_SCRIPTS = (
+    "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js",
+    "https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.js",
+)
+ANT_PATH_SCRIPT = "https://cdn.jsdelivr.net/npm/leaflet-ant-path@1.1.2/dist/leaflet-ant-path.min.js"
+LEAFLET_STYLESHEETS = (
+    "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css",
+    "https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.css",
+)
+
+# Bootstrap 3's base typography and box model, which the sidebar and popups were laid out with
+SHELL_STYLES = """<style>html, body {width: 100%;height: 100%;margin: 0;padding: 0;}
+*, *::before, *::after {box-sizing: border-box;}
+body {font-family: "Helvetica Neue", Helvetica, Arial, sans-serif;font-size: 14px;line-height: 1.42857143;color: #333;}
+#map {position: absolute;top: 0;bottom: 0;right: 0;left: 0;}
+.leaflet-container {font-size: 1rem;}</style>"""
+
+PAGE_SHELL = CompiledTemplate("""<!DOCTYPE html>
+<html>
+<head>
+    <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no" />
+{head}
+{assets}
+    {styles}
+</head>
+<body>
+{body}
+<div id="map"></div>
+<script type="application/json" id="zm-map-data">{payload}</script>
+<script>
+{runtime}
+</script>
+</body>
+</html>
+""")
+
+
+def _json_for_script(data) -> str:
+    """JSON that can't end its <script> element early."""
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return text.replace("</", "<\\/").replace("<!--", "\\u003c!--")
+
+
+def write_leaflet_page(path: str, spec: MapSpec, head: List[str], body: List[Chunks], tooltips: List[str],
+                       popups: str, popup_failed: str) -> None:
+    """Write a map page: shell, `head` and `body` elements in order, the payload and the runtime.
+
+    tooltips is the HTML per marker, popups the URL write_popups() returned and
+    popup_failed the text shown when that file can't be fetched.
+    """
+    scripts = LEAFLET_SCRIPTS + ((ANT_PATH_SCRIPT,) if spec.route else ())
+    assets = [f'    <script src="{url}"></script>\n' for url in scripts]
+    assets += [f'    <link rel="stylesheet" href="{url}"/>\n' for url in LEAFLET_STYLESHEETS]
+
+    def body_chunks():
+        for element in body:
+            if isinstance(element, str):
+                yield element
+            else:
+                yield from element
+            yield "\n"
+
+    write_chunks(path, PAGE_SHELL.stream(
+        head="\n".join(f"    {element}" for element in head),
+        assets="".join(assets).rstrip("\n"),
+        styles=SHELL_STYLES,
+        body=body_chunks(),
+        payload=_json_for_script(spec.payload(tooltips, popups, popup_failed)),
+        runtime=MAP_RUNTIME,
+    ))
+
+
+# --- Parity: read both kinds of page back into the same summary ---------------
+
+FOLIUM_MAP_RE = re.compile(r'L\.map\(\s*"\w+",\s*\{\s*center: \[([^\]]+)\],.*?zoom: (\d+),', re.S)
+FOLIUM_TILE_RE = re.compile(r'var (tile_layer_\w+) = L\.tileLayer\(\s*"([^"]+)",\s*(\{.*?\})\s*\);', re.S)
+FOLIUM_MARKER_RE = re.compile(r'var (marker_\w+) = L\.marker\(\s*\[([^\]]+)\],\s*\{\}\s*\)\.addTo\((\w+)\);', re.S)
+FOLIUM_ICON_RE = re.compile(r'var (icon_\w+) = L\.AwesomeMarkers\.icon\(\s*(\{.*?\})\s*\);\s*(marker_\w+)\.setIcon', re.S)
+FOLIUM_POPUPS_RE = re.compile(r'\}\)\(("(?:[^"\\]|\\.)*"), (\[.*?\]), "(?:[^"\\]|\\.)*"\);\n', re.S)
+FOLIUM_POPUP_ENTRY_RE = re.compile(r'\[(marker_\w+), (\d+)\]')
+FOLIUM_TOOLTIP_RE = re.compile(r'(marker_\w+)\.bindTooltip\(\s*`<div>(.*?)</div>`,\s*(\{.*?\})\s*\);', re.S)
+FOLIUM_ANT_PATH_RE = re.compile(r'L\.polyline\.antPath\(\s*(\[.*?\]),\s*(\{.*?\})\s*\)\.addTo\((\w+)\);', re.S)
+FOLIUM_ARROWS_RE = re.compile(r'\}\)\((\w+), ("(?:[^"\\]|\\.)*"), (\[.*?\])\);\n', re.S)
+FOLIUM_CONTROL_RE = re.compile(r'base_layers : \{(.*?)\},\s*overlays :\s*\{(.*?)\},.*?L\.control\.layers\(.*?(\{[^{}]*\})\s*\)\.addTo',
+                               re.S)
+FOLIUM_CONTROL_ENTRY_RE = re.compile(r'("(?:[^"\\]|\\.)*") : (\w+),')
+FOLIUM_INDEX_ENTRY_RE = re.compile(r'\[(marker_\w+), \w+, (\[[^\[\]]*\])\]')
+LEAFLET_PAYLOAD_RE = re.compile(r'<script type="application/json" id="zm-map-data">(.*?)</script>', re.S)
+
+
+def _text(html: Optional[str]) -> Optional[str]:
+    """HTML with whitespace around tags dropped and other runs collapsed, for comparing across templates."""
+    if html is None:
+        return None
+    html = re.sub(r"\s*(<[^>]*>)\s*", r"\1", html.replace("\\`", "`"))
+    return re.sub(r"\s+", " ", html).strip()
+
+
+def _body(html: str, map_element: str) -> str:
+    start = html.index("<body>") + len("<body>")
+    return _text(html[start:html.index(map_element, start)])
+
+
+def _features(center, zoom, scale, tiles, markers, route, control, body) -> dict:
+    return {
+        "center": [round(c, 6) for c in center],
+        "zoom": zoom,
+        "scale": scale,
+        "tiles": tiles,
+        "markers": sorted(markers, key=lambda marker: marker[:6]),
+        "route": route,
+        "layer_control": control,
+        "body": body,
+    }
+
+
+def folium_features(html: str, directory: Optional[str] = None) -> dict:
+    """Summary of a folium page's map (see _features).
+
+    With the page's directory, popups are read from its popups file; otherwise they are left out (None).
+    """
+    center, zoom = FOLIUM_MAP_RE.search(html).groups()
+    tiles = {name: (url, json.loads(options)) for name, url, options in FOLIUM_TILE_RE.findall(html)}
+    names: Dict[str, str] = {}
+    control = None
+    match = FOLIUM_CONTROL_RE.search(html)
+    if match:
+        for part in match.group(1, 2):
+            names.update({var: json.loads(label) for label, var in FOLIUM_CONTROL_ENTRY_RE.findall(part)})
+        options = json.loads(match.group(3))
+        control = {"collapsed": options["collapsed"], "position": options["position"]}
+    icons = {marker: json.loads(options) for _, options, marker in FOLIUM_ICON_RE.findall(html)}
+    url, entries = FOLIUM_POPUPS_RE.search(html).groups()
+    contents = read_popups(directory, json.loads(url)) if directory else None
+    popups = {marker: (_text(contents[i]) if contents else None, int(max_width))
+              for i, (marker, max_width) in enumerate(FOLIUM_POPUP_ENTRY_RE.findall(entries))}
+    tooltips = {marker: _text(content) for marker, content, _ in FOLIUM_TOOLTIP_RE.findall(html)}
+    ids = {marker: json.loads(event_ids) for marker, event_ids in FOLIUM_INDEX_ENTRY_RE.findall(html)}
+    markers = []
+    for marker, location, parent in FOLIUM_MARKER_RE.findall(html):
+        lat, lon = (float(v) for v in location.split(","))
+        icon = icons[marker]
+        popup, max_width = popups[marker]
+        markers.append((lat, lon, names.get(parent, ""), icon["markerColor"], icon["icon"], icon["prefix"],
+                        popup, tooltips[marker], max_width, ids.get(marker)))
+    route = None
+    match = FOLIUM_ANT_PATH_RE.search(html)
+    if match:
+        options = json.loads(match.group(2))
+        arrows = FOLIUM_ARROWS_RE.search(html)
+        route = {"layer": names.get(match.group(3), ""), "path": json.loads(match.group(1)),
+                 "style": {key: options[key] for key in ("color", "weight", "opacity", "dashArray", "delay", "pulseColor")},
+                 "arrow_color": json.loads(arrows.group(2)), "legs": json.loads(arrows.group(3))}
+    return _features(
+        [float(v) for v in center.split(",")], int(zoom), "L.control.scale()" in html,
+        [(names.get(var, ""), url, options["maxZoom"]) for var, (url, options) in tiles.items()],
+        markers, route, control, _body(html, '<div class="folium-map"'),
+    )
+
+
+def leaflet_features(html: str, directory: Optional[str] = None) -> dict:
+    """Summary of a direct-Leaflet page's map (see _features); popups as for folium_features()."""
+    data = json.loads(LEAFLET_PAYLOAD_RE.search(html).group(1))
+    layers = data["layers"]
+    popups = read_popups(directory, data["popups"]) if directory else [None] * len(data["markers"])
+
+    def layer_name(index: int) -> str:
+        return "" if index < 0 else layers[index]
+
+    control = data["layerControl"]
+    markers = [(lat, lon, layer_name(layer), color, icon, prefix, _text(popup), _text(tooltip), max_width, ids)
+               for (lat, lon, layer, color, icon, prefix, tooltip, max_width, ids), popup
+               in zip(data["markers"], popups)]
+    route = data["route"]
+    if route:
+        route = {"layer": layer_name(route["layer"]), "path": route["path"], "style": route["style"],
+                 "arrow_color": route["arrowColor"], "legs": route["legs"]}
+    return _features(
+        data["center"], data["zoom"], data["scale"],
+        [(tile["name"] if control else "", tile["url"], tile["options"]["maxZoom"]) for tile in data["tiles"]],
+        markers, route, control, _body(html, '<div id="map">'),
+    )
+
+
+def compare_features(expected: dict, actual: dict) -> List[str]:
+    """Human-readable differences between two page summaries (empty: same map).
+
+    Marker fields that are None on either side (popups read without a directory) aren't compared.
+    """
+    problems = []
+    for key in expected:
+        if key == "markers":
+            continue
+        if expected[key] != actual[key]:
+            problems.append(f"{key} differs")
+    if len(expected["markers"]) != len(actual["markers"]):
+        problems.append(f"{len(expected['markers'])} vs {len(actual['markers'])} markers")
+    else:
+        for a, b in zip(expected["markers"], actual["markers"]):
+            if a != b:
+                fields = ("lat", "lon", "layer", "color", "icon", "prefix", "popup", "tooltip", "max_width", "ids")
+                diff = ", ".join(name for name, x, y in zip(fields, a, b) if x != y and None not in (x, y))
+                if diff:
+                    problems.append(f"marker at {a[0]}, {a[1]}: {diff}")
+    return problems
@@ -0,0 +1,200 @@
+"""
+Page locales
+------------
+String tables for the generated pages, one per locale. The build parses,
+geocodes and validates the events once and then renders each page once per
+locale from the same objects. Routes, travel times and the schedule plan of
+a day are computed once for all its variants, and fragments without text
+(contact blocks, tooltips) come from the same cache entries.
+
+The default locale keeps the plain filenames (index.html,
+2026-02-03_Martes.html); the others get a suffix (index.en.html), so every
+variant sits next to the others and shares vendor/, shards/, changes.json
+and the service worker. Event data (titles, descriptions, the "Público" and
+"Privado" category values) is not translated; only labels are.
+
+"index" holds the index template's placeholders and "script" the strings the
+in-page scripts read from window.zmText.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Iterable
+
+DEFAULT_LOCALE = "es"
+
+STRINGS: Dict[str, dict] = {
+    "es": {
+        "name": "Español",
+        "days": ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"),
+        "months": ("Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre",
+                   "Octubre", "Noviembre", "Diciembre"),
+        "date": "{day} de {month}",
+        "events": "{count} eventos",
+        "categories": {"Público": "Público", "Privado": "Privado"},
+        "category_short": {"Público": "púb", "Privado": "priv"},
+        "venue_types": {"museum": "Museo", "gallery": "Galería", "hotel": "Hotel", "studio": "Estudio",
+                        "foundation": "Fundación", "special": "Especial", "fair": "Feria"},
+        "periods": {"morning": "Mañana", "afternoon": "Tarde", "evening": "Noche"},
+        "contact": "Contacto",
+        "no_contact": "Sin información de contacto",
+        "popup_failed": "No se pudo cargar el detalle del evento.",
+        "hosted_by": "Organiza",
+        "route": "Ruta sugerida",
+        "light_tiles": "Claro",
+        "legend": "Leyenda",
+        "search": "Buscar...",
+        "all": "Todos",
+        "plan_count": "Máx. {count} alcanzables en un día",
+        "plan": "Plan",
+        "plan_title": "Parte del plan con más eventos posibles",
+        "conflict": "Conflicto",
+        "conflict_title": "Llegas {late} min tarde desde {previous} ({travel} min de trayecto)",
+        "fair_dates": "Feb 4-8, 2026",
+        "view_map": "Ver mapa",
+        "view_program": "Ver programa {fair} →",
+        "index": {
+            "dates": "2 - 8 de Febrero",
+            "search_placeholder": "Buscar eventos, galerías, artistas...",
+            "category": "Categoría",
+            "venue_type": "Tipo de venue",
+            "time_of_day": "Horario",
+            "fair": "Feria",
+            "clear": "Limpiar",
+            "hero_title": "Semana del <span>Arte</span>",
+            "hero_subtitle": "ZonaMaco + Material + Salón ACME • Ciudad de México",
+            "stat_events": "Eventos",
+            "stat_venues": "Venues",
+            "stat_fairs": "Ferias",
+            "public_total": "Públicos",
+            "private_total": "Privados",
+            "nearby_title": "Cerca de ti",
+            "nearby_button": "Buscar eventos cerca de mí",
+            "fairs_title": "Las Ferias",
+            "zonamaco_about": "La feria de arte contemporáneo más importante de América Latina. 200+ galerías internacionales.",
+            "material_about": "Arte emergente y diseño. Galerías jóvenes de México y Latinoamérica.",
+            "acme_about": "Arte independiente y experimental en el icónico Frontón México.",
+            "days_title": "Programa ZonaMaco VIP por Día",
+        },
+        "script": {
+            "events": "{count} eventos",
+            "of": "{count} de {total}",
+            "public_count": "{count} púb",
+            "private_count": "{count} priv",
+            "no_events": "Sin eventos",
+            "no_results": "No se encontraron eventos con los filtros seleccionados",
+            "geolocation_unsupported": "Tu navegador no permite obtener tu ubicación.",
+            "venues_around": "{count} venues a tu alrededor",
+            "searching": "Buscando eventos cercanos...",
+            "nothing_nearby": "No hay eventos a pocos kilómetros de tu ubicación.",
+            "nearby_failed": "No se pudieron cargar los eventos cercanos.",
+            "locating": "Obteniendo tu ubicación...",
+            "locate_failed": "No se pudo obtener tu ubicación.",
+            "on_foot": "A pie",
+        },
+    },
+    "en": {
+        "name": "English",
+        "days": ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"),
+        "months": ("January", "February", "March", "April", "May", "June", "July", "August", "September",
+                   "October", "November", "December"),
+        "date": "{month} {day}",
+        "events": "{count} events",
+        "categories": {"Público": "Public", "Privado": "Private"},
+        "category_short": {"Público": "public", "Privado": "private"},
+        "venue_types": {"museum": "Museum", "gallery": "Gallery", "hotel": "Hotel", "studio": "Studio",
+                        "foundation": "Foundation", "special": "Special", "fair": "Fair"},
+        "periods": {"morning": "Morning", "afternoon": "Afternoon", "evening": "Evening"},
+        "contact": "Contact",
+        "no_contact": "No contact information",
+        "popup_failed": "Couldn't load the event details.",
+        "hosted_by": "Hosted by",
+        "route": "Suggested route",
+        "light_tiles": "Light",
+        "legend": "Legend",
+        "search": "Search...",
+        "all": "All",
+        "plan_count": "Max. {count} reachable in one day",
+        "plan": "Plan",
+        "plan_title": "Part of the plan with the most events possible",
+        "conflict": "Conflict",
+        "conflict_title": "You arrive {late} min late from {previous} ({travel} min away)",
+        "fair_dates": "Feb 4-8, 2026",
+        "view_map": "View map",
+        "view_program": "See the {fair} program →",
+        "index": {
+            "dates": "February 2 - 8",
+            "search_placeholder": "Search events, galleries, artists...",
+            "category": "Category",
+            "venue_type": "Venue type",
+            "time_of_day": "Time of day",
+            "fair": "Fair",
+            "clear": "Clear",
+            "hero_title": "Art <span>Week</span>",
+            "hero_subtitle": "ZonaMaco + Material + Salón ACME • Mexico City",
+            "stat_events": "Events",
+            "stat_venues": "Venues",
+            "stat_fairs": "Fairs",
+            "public_total": "Public",
+            "private_total": "Private",
+            "nearby_title": "Near you",
+            "nearby_button": "Find events near me",
+            "fairs_title": "The Fairs",
+            "zonamaco_about": "Latin America's leading contemporary art fair. 200+ international galleries.",
+            "material_about": "Emerging art and design. Young galleries from Mexico and Latin America.",
+            "acme_about": "Independent and experimental art at the iconic Frontón México.",
+            "days_title": "ZonaMaco VIP Program by Day",
+        },
+        "script": {
+            "events": "{count} events",
+            "of": "{count} of {total}",
+            "public_count": "{count} public",
+            "private_count": "{count} private",
+            "no_events": "No events",
+            "no_results": "No events match the selected filters",
+            "geolocation_unsupported": "Your browser can't share your location.",
+            "venues_around": "{count} venues around you",
+            "searching": "Looking for events nearby...",
+            "nothing_nearby": "No events within a few kilometres of you.",
+            "nearby_failed": "Couldn't load the events nearby.",
+            "locating": "Getting your location...",
+            "locate_failed": "Couldn't get your location.",
+            "on_foot": "On foot",
+        },
+    },
+}
+
+LOCALES = tuple(STRINGS)
+
+
+def locale_filename(filename: str, locale: str) -> str:
+    """A page's filename in a locale: unchanged for the default, "<stem>.<locale>.html" otherwise."""
+    if locale == DEFAULT_LOCALE:
+        return filename
+    stem, _, ext = filename.rpartition(".")
+    return f"{stem}.{locale}.{ext}"
+
+
+def day_name(day: datetime, locale: str) -> str:
+    return STRINGS[locale]["days"][day.weekday()]
+
+
+def format_date(day: datetime, locale: str) -> str:
+    """Day and month, e.g. "3 de Febrero" / "February 3"."""
+    return STRINGS[locale]["date"].format(day=day.day, month=STRINGS[locale]["months"][day.month - 1])
+
+
+def text_script(locale: str) -> str:
+    """<script> setting window.zmText (the locale's "script" strings plus the page filename suffix)."""
+    suffix = "" if locale == DEFAULT_LOCALE else f".{locale}"
+    text = dict(STRINGS[locale]["script"], lang=locale, page_suffix=suffix)
+    return f"<script>window.zmText = {json.dumps(text, ensure_ascii=False, sort_keys=True)};</script>"
+
+
+def alternate_links(filename: str, locales: Iterable[str]) -> str:
+    """<link rel="alternate" hreflang> tags for a page's locale variants; empty with a single locale."""
+    locales = list(locales)
+    if len(locales) < 2:
+        return ""
+    return "".join(f'<link rel="alternate" hreflang="{locale}" href="{locale_filename(filename, locale)}">'
+                   for locale in locales)
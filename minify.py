@@ -0,0 +1,438 @@
+"""
+Build-time HTML/CSS/JS minification
+-----------------------------------
+Strips insignificant whitespace and comments from the generated pages:
+indentation and blank lines between tags, HTML comments, and comments and
+indentation in inline <style> and <script> blocks. Strings, template literals
+and regex literals in scripts are copied verbatim, and newlines are kept so
+automatic semicolon insertion can't change the meaning of the code.
+
+Safe mode (the default) collapses whitespace between tags to a single space
+instead of dropping it and leaves <pre>, <textarea> and any element styled
+with `white-space: pre*` untouched. Every minified page is checked with
+same_dom() against the original (same elements, attributes, text and script
+tokens, style rules); a page that fails the check is written unminified.
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import List, Tuple
+
+PRESERVE_TAGS = {"pre", "textarea"}
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+RAW_TEXT_TAGS = {"script", "style"}
+JS_TYPES = {"", "text/javascript", "application/javascript", "module"}
+
+TAG_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<!\[CDATA\[.*?\]\]>"
+    r"|<![^>]*>"
+    r"|</[a-zA-Z][^\s>]*\s*>"
+    r"|<[a-zA-Z][^\s/>]*(?:\s+[^\s=>/]+(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s>]+))?)*\s*/?>",
+    re.DOTALL,
+)
+TAG_NAME_RE = re.compile(r"</?([a-zA-Z][^\s/>]*)")
+ATTR_RE = re.compile(r"""([^\s=>/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+WHITESPACE_RE = re.compile(r"\s+")
+WHITE_SPACE_PRE_RE = re.compile(r"white-space\s*:\s*pre", re.IGNORECASE)
+
+
+# -----------------------------------------------------------------------------
+# JavaScript
+# -----------------------------------------------------------------------------
+# A "/" after one of these (or at the start) begins a regex literal, not a division
+REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else"}
+# A space next to one of these is never needed
+JS_PUNCTUATION = set("{}()[];,:=<>!&|?")
+
+
+def js_tokens(source: str) -> List[Tuple[str, str]]:
+    """Split JavaScript into (kind, text) tokens.
+
+    kind is 'ws' (whitespace), 'comment', 'string' (quotes, template literals
+    and regex literals, kept verbatim) or 'code'. Template literal
+    substitutions (${...}) are tokenized as code.
+    """
+    tokens: List[Tuple[str, str]] = []
+    i, n = 0, len(source)
+    template_depth: List[int] = []  # brace depth at each open ${
+    braces = 0
+    last_significant = ""
+
+    def scan_template(start: int) -> int:
+        """From just after ` or }, return the index after the closing ` or the ${."""
+        j = start
+        while j < n:
+            c = source[j]
+            if c == "\\":
+                j += 2
+            elif c == "`":
+                return j + 1
+            elif c == "$" and source.startswith("${", j):
+                return j + 2
+            else:
+                j += 1
+        return n
+
+    while i < n:
+        c = source[i]
+        if c.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            tokens.append(("ws", source[i:j]))
+            i = j
+        elif source.startswith("//", i):
+            j = source.find("\n", i)
+            j = n if j < 0 else j
+            tokens.append(("comment", source[i:j]))
+            i = j
+        elif source.startswith("/*", i):
+            j = source.find("*/", i + 2)
+            j = n if j < 0 else j + 2
+            tokens.append(("comment", source[i:j]))
+            i = j
+        elif c in "'\"":
+            j = i + 1
+            while j < n and source[j] != c and source[j] != "\n":
+                j += 2 if source[j] == "\\" else 1
+            j = min(j + 1, n)
+            tokens.append(("string", source[i:j]))
+            last_significant = "a"
+            i = j
+        elif c == "`":
+            j = scan_template(i + 1)
+            tokens.append(("string", source[i:j]))
+            if source.startswith("${", j - 2):
+                template_depth.append(braces)
+                braces += 1
+                last_significant = "{"
+            else:
+                last_significant = "a"
+            i = j
+        elif c == "}" and template_depth and braces - 1 == template_depth[-1]:
+            braces -= 1
+            template_depth.pop()
+            j = scan_template(i + 1)
+            tokens.append(("string", source[i:j]))
+            if source.startswith("${", j - 2):
+                template_depth.append(braces)
+                braces += 1
+                last_significant = "{"
+            else:
+                last_significant = "a"
+            i = j
+        elif c == "/" and (not last_significant or last_significant in REGEX_PREFIX
+                           or last_significant in REGEX_KEYWORDS):
+            j, in_class = i + 1, False
+            while j < n and source[j] != "\n":
+                ch = source[j]
+                if ch == "\\":
+                    j += 2
+                    continue
+                if ch == "[":
+                    in_class = True
+                elif ch == "]":
+                    in_class = False
+                elif ch == "/" and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and (source[j].isalnum() or source[j] in "_$"):
+                j += 1  # flags
+            tokens.append(("string", source[i:j]))
+            last_significant = "a"
+            i = j
+        elif c.isalnum() or c in "_$":
+            j = i
+            while j < n and (source[j].isalnum() or source[j] in "_$"):
+                j += 1
+            word = source[i:j]
+            tokens.append(("code", word))
+            last_significant = word if word in REGEX_KEYWORDS else "a"
+            i = j
+        else:
+            if c == "{":
+                braces += 1
+            elif c == "}":
+                braces -= 1
+            # ++ and -- before a "/" are postfix (i++ / 2), so like a value
+            postfix = c in "+-" and tokens and tokens[-1] == ("code", c)
+            tokens.append(("code", c))
+            last_significant = "a" if c in ")]" or postfix else c
+            i += 1
+    return tokens
+
+
+def minify_js(source: str) -> str:
+    """Drop comments and indentation; keep one newline wherever there was one."""
+    out: List[str] = []
+    tokens: List[Tuple[str, str]] = []
+    for kind, text in js_tokens(source):
+        if kind == "comment":  # a comment still separates tokens
+            kind, text = "ws", "\n" if "\n" in text else " "
+        if kind == "ws" and tokens and tokens[-1][0] == "ws":
+            tokens[-1] = ("ws", tokens[-1][1] + text)
+        else:
+            tokens.append((kind, text))
+    for k, (kind, text) in enumerate(tokens):
+        if kind != "ws":
+            out.append(text)
+            continue
+        prev = out[-1][-1:] if out else ""
+        nxt = tokens[k + 1][1][:1] if k + 1 < len(tokens) else ""
+        if not prev or not nxt:
+            continue
+        if "\n" in text:
+            if prev != "\n":
+                out.append("\n")
+        elif prev not in JS_PUNCTUATION and nxt not in JS_PUNCTUATION and prev != "\n":
+            out.append(" ")
+    return "".join(out).strip()
+
+
+def _js_signature(source: str) -> List[str]:
+    """Significant tokens, plus a "\\n" token wherever the gap between two of them held a line break (ASI)."""
+    signature: List[str] = []
+    for kind, text in js_tokens(source):
+        if kind not in ("ws", "comment"):
+            signature.append(text)
+        elif "\n" in text and signature and signature[-1] != "\n":
+            signature.append("\n")
+    if signature and signature[-1] == "\n":
+        signature.pop()
+    return signature
+
+
+# -----------------------------------------------------------------------------
+# CSS
+# -----------------------------------------------------------------------------
+CSS_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|\s+|[^"\'/\s]+|/', re.DOTALL)
+CSS_TIGHT = set("{};,>")
+
+
+CSS_RULE_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|[{};]|\s+|[^"\'{};/\s]+|/', re.DOTALL)
+CSS_SEPARATOR_SPACE_RE = re.compile(r" ?([,>]) ?")
+
+
+def css_rules(source: str) -> List[tuple]:
+    """Parse CSS into a comparable tree, independently of minify_css().
+
+    Rules and at-rules become (prelude, [children]); declarations become
+    (property, value) and bare statements (e.g. @import) a 1-tuple. Comments and
+    empty statements are dropped and whitespace runs become one space, except
+    around selector commas and combinators (">"), after commas in values and
+    after colons in parentheses (media queries), where it means nothing.
+    """
+    root: List[tuple] = []
+    stack = [root]
+    text: List[str] = []
+
+    def statement() -> None:
+        body = "".join(text).strip()
+        text.clear()
+        if not body:
+            return
+        name, colon, value = body.partition(":")
+        if colon and not body.startswith("@"):
+            stack[-1].append((name.strip().lower(), re.sub(r", ", ",", value.strip())))
+        else:
+            stack[-1].append((body,))
+
+    for token in CSS_RULE_TOKEN_RE.findall(source):
+        if token.startswith("/*"):
+            continue
+        if token == "{":
+            prelude = CSS_SEPARATOR_SPACE_RE.sub(r"\1", "".join(text).strip())
+            prelude = re.sub(r"(\([^()]*?:) ", r"\1", prelude)
+            text.clear()
+            block: List[tuple] = []
+            stack[-1].append((prelude, block))
+            stack.append(block)
+        elif token in ";}":
+            statement()
+            if token == "}" and len(stack) > 1:
+                stack.pop()
+        else:
+            text.append(" " if token.isspace() else token)
+    statement()
+    return root
+
+
+def minify_css(source: str) -> str:
+    """Drop comments and whitespace around braces, semicolons, commas and after colons."""
+    out: List[str] = []
+    pending_space = False
+    for token in CSS_TOKEN_RE.findall(source):
+        if token.startswith("/*"):
+            continue
+        if token.isspace():
+            pending_space = True
+            continue
+        if pending_space and out and out[-1][-1] not in CSS_TIGHT and out[-1][-1] != ":" and token[0] not in CSS_TIGHT:
+            out.append(" ")
+        pending_space = False
+        if token[0] == "}" and out and out[-1].endswith(";"):
+            out[-1] = out[-1][:-1]
+        out.append(token)
+    return "".join(out)
+
+
+# -----------------------------------------------------------------------------
+# HTML
+# -----------------------------------------------------------------------------
+def _tag_name(tag: str) -> str:
+    match = TAG_NAME_RE.match(tag)
+    return match.group(1).lower() if match else ""
+
+
+def _attr(tag: str, name: str) -> str:
+    for key, v1, v2, v3 in ATTR_RE.findall(tag[len(_tag_name(tag)) + 1:]):
+        if key.lower() == name:
+            return v1 or v2 or v3 or ""
+    return ""
+
+
+def _is_preserved(tag: str, name: str) -> bool:
+    return name in PRESERVE_TAGS or bool(WHITE_SPACE_PRE_RE.search(_attr(tag, "style")))
+
+
+def minify_html(html: str, safe: bool = True) -> str:
+    """Minify a page (see module docstring for what safe mode keeps)."""
+    out: List[str] = []
+    pos = 0
+    preserve_name, preserve_depth = None, 0
+
+    def text(chunk: str) -> None:
+        if preserve_name or not chunk:
+            out.append(chunk)
+        elif chunk.isspace():
+            if safe:
+                out.append(" " if out and not out[-1].endswith(" ") else "")
+        else:
+            chunk = WHITESPACE_RE.sub(" ", chunk)
+            out.append(chunk[1:] if chunk[0] == " " and out and out[-1].endswith(" ") else chunk)
+
+    while True:
+        match = TAG_RE.search(html, pos)
+        if not match:
+            text(html[pos:])
+            break
+        text(html[pos:match.start()])
+        tag = match.group(0)
+        pos = match.end()
+        if tag.startswith("<!--"):
+            if preserve_name or tag.startswith("<!--[if") or tag.startswith("<!--<!"):
+                out.append(tag)
+            continue
+        name = _tag_name(tag)
+        out.append(tag)
+        if tag.startswith("</"):
+            if preserve_name == name:
+                preserve_depth -= 1
+                if preserve_depth == 0:
+                    preserve_name = None
+            continue
+        if preserve_name:
+            if name == preserve_name and not tag.endswith("/>"):
+                preserve_depth += 1
+            continue
+        if name in RAW_TEXT_TAGS:
+            end = re.compile(rf"</{name}\s*>", re.IGNORECASE).search(html, pos)
+            end_pos = end.start() if end else len(html)
+            body = html[pos:end_pos]
+            if name == "style":
+                body = minify_css(body)
+            elif _attr(tag, "type").lower() in JS_TYPES and not _attr(tag, "src"):
+                body = minify_js(body)
+            out.append(body)
+            pos = end_pos
+        elif _is_preserved(tag, name) and not tag.endswith("/>"):
+            preserve_name, preserve_depth = name, 1
+    return "".join(out)
+
+
+class _DomRecorder(HTMLParser):
+    """Elements, attributes and text of a document, with whitespace normalised."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events: List[tuple] = []
+        self.stack: List[Tuple[str, bool]] = []  # (tag, preserved)
+        self.raw: List[str] = []  # script/style text, which the parser may deliver in pieces
+
+    def handle_starttag(self, tag, attrs):
+        preserved = tag in PRESERVE_TAGS or any(
+            k == "style" and v and WHITE_SPACE_PRE_RE.search(v) for k, v in attrs)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append((tag, preserved or any(p for _, p in self.stack)))
+        self.events.append(("start", tag, tuple(attrs)))
+
+    def handle_startendtag(self, tag, attrs):
+        self.events.append(("start", tag, tuple(attrs)))
+
+    def handle_endtag(self, tag):
+        if tag in RAW_TEXT_TAGS and self.stack and self.stack[-1][0] == tag:
+            data = "".join(self.raw)
+            self.raw = []
+            self.events.append((tag, tuple(_js_signature(data)) if tag == "script" else css_rules(data)))
+        for k in range(len(self.stack) - 1, -1, -1):
+            if self.stack[k][0] == tag:
+                del self.stack[k:]
+                break
+        self.events.append(("end", tag))
+
+    def handle_data(self, data):
+        tag, preserved = self.stack[-1] if self.stack else ("", False)
+        if tag in RAW_TEXT_TAGS:
+            self.raw.append(data)
+        elif preserved:
+            self.events.append(("text", data))
+        elif data.strip():
+            self.events.append(("text", WHITESPACE_RE.sub(" ", data).strip()))
+
+
+
+def dom_signature(html: str) -> List[tuple]:
+    recorder = _DomRecorder()
+    recorder.feed(html)
+    recorder.close()
+    # Adjacent text nodes merge once the comment between them is gone
+    merged: List[tuple] = []
+    for event in recorder.events:
+        if event[0] == "text" and merged and merged[-1][0] == "text":
+            merged[-1] = ("text", WHITESPACE_RE.sub(" ", merged[-1][1] + " " + event[1]).strip())
+        else:
+            merged.append(event)
+    return merged
+
+
+def same_dom(original: str, minified: str) -> bool:
+    """True if both documents have the same elements, attributes, text, script tokens and style rules."""
+    return dom_signature(original) == dom_signature(minified)
+
+
+def minify_pages(output_dir: str, pages: List[str], safe: bool = True) -> List[Tuple[str, int, int]]:
+    """Minify pages in place. Returns (page, bytes before, bytes after) per page.
+
+    A page whose minified DOM differs from the original is left as it was
+    (reported with after == before).
+    """
+    import os
+
+    report = []
+    for page in pages:
+        path = os.path.join(output_dir, page)
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        minified = minify_html(html, safe=safe)
+        before = len(html.encode("utf-8"))
+        if not same_dom(html, minified):
+            print(f"  ⚠️  {page}: la minificación cambia el DOM, se deja sin minificar")
+            report.append((page, before, before))
+            continue
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(minified)
+        report.append((page, before, len(minified.encode("utf-8"))))
+    return report
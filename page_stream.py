@@ -0,0 +1,54 @@
+"""
+Streaming page output
+---------------------
+Pages are written as a stream of chunks instead of being assembled into one
+string: a template is parsed once into literal/placeholder parts, and each
+render yields the literals and the values in order, where a value may itself
+be an iterable of chunks (one per card, event row, JSON record, ...). The
+chunks go straight into a buffered file, so no full copy of the page is held
+while it is written.
+"""
+
+import string
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+WRITE_BUFFER = 64 * 1024
+
+Chunks = Union[str, Iterable[str]]
+
+
+class CompiledTemplate:
+    """A str.format-style template ({name} placeholders, {{ }} escapes), parsed once."""
+
+    def __init__(self, source: str):
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in string.Formatter().parse(source):
+            if field is not None and (spec or conversion or not field.isidentifier()):
+                raise ValueError(f"unsupported placeholder {{{field}}}: only plain names are allowed")
+            self.parts.append((literal, field))
+        self.fields = {field for _, field in self.parts if field is not None}
+
+    def stream(self, **values: Chunks) -> Iterator[str]:
+        """Yield the page chunk by chunk; iterable values are streamed lazily."""
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"missing template values: {', '.join(sorted(missing))}")
+        for literal, field in self.parts:
+            if literal:
+                yield literal
+            if field is not None:
+                value = values[field]
+                if isinstance(value, str):
+                    yield value
+                else:
+                    yield from value
+
+
+def write_chunks(path: str, chunks: Iterable[str]) -> int:
+    """Write chunks through a buffered text file; returns the number of characters written."""
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER) as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    return written
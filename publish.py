@@ -0,0 +1,145 @@
+"""
+Atomic publishing
+-----------------
+Builds are rendered into a staging directory under static/releases/, which is
+renamed to static/releases/<version> once complete. The CURRENT file names the
+live release and is replaced atomically (write + os.replace), so app.py, which
+follows it, only ever sees a complete build. Older releases are pruned, keeping
+the last RELEASES_KEEP for requests still in flight.
+
+docs/ (GitHub Pages) and static/maps/ (the committed copy the static deploys
+serve) are then synced by content hash: only files whose bytes changed are
+rewritten and files no longer in the release are deleted. folium gives every
+element a random id; stabilize_element_ids() makes them deterministic so an
+unchanged page is byte-identical across builds.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import time
+from typing import Dict, Optional, Tuple
+
+CURRENT_POINTER = "CURRENT"
+RELEASES_KEEP = 3
+STAGING_PREFIX = ".staging-"
+STALE_STAGING_SECONDS = 3600
+SYNC_KEEP = {".nojekyll", "CNAME"}  # hand-made files in docs/ that a sync must not delete
+
+ELEMENT_ID_RE = re.compile(r"\b([a-z][a-z_]*)_([0-9a-f]{32})(?![0-9A-Za-z])")
+
+
+def stabilize_element_ids(html: str, seed: str) -> str:
+    """Replace folium's random element ids with ids derived from `seed` and order of appearance."""
+    mapping: Dict[str, str] = {}
+
+    def replace(match):
+        random_id = match.group(2)
+        if random_id not in mapping:
+            mapping[random_id] = hashlib.sha256(f"{seed}:{len(mapping)}".encode("utf-8")).hexdigest()[:32]
+        return f"{match.group(1)}_{mapping[random_id]}"
+
+    return ELEMENT_ID_RE.sub(replace, html)
+
+
+def current_release(releases_dir: str) -> Optional[str]:
+    """Directory of the live release, or None before the first publish."""
+    try:
+        with open(os.path.join(releases_dir, CURRENT_POINTER), encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(releases_dir, name)
+    return path if name and os.path.isdir(path) else None
+
+
+def stage_release(releases_dir: str, base_dir: Optional[str] = None) -> str:
+    """Create a staging directory, seeded with a copy of base_dir for partial builds."""
+    os.makedirs(releases_dir, exist_ok=True)
+    staging = os.path.join(releases_dir, f"{STAGING_PREFIX}{os.getpid()}-{time.time_ns()}")
+    if base_dir and os.path.isdir(base_dir):
+        # Real copies, not hardlinks: rendering rewrites files in place
+        shutil.copytree(base_dir, staging, ignore=shutil.ignore_patterns(STAGING_PREFIX + "*"))
+    else:
+        os.makedirs(staging)
+    return staging
+
+
+def publish_release(staging: str, releases_dir: str, version: str) -> str:
+    """Move a finished staging directory into place and point CURRENT at it."""
+    name, n = version, 1
+    while os.path.exists(os.path.join(releases_dir, name)):
+        n += 1
+        name = f"{version}.{n}"
+    release = os.path.join(releases_dir, name)
+    os.rename(staging, release)
+
+    pointer = os.path.join(releases_dir, CURRENT_POINTER)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer + ".tmp", pointer)
+    prune_releases(releases_dir, name)
+    return release
+
+
+def prune_releases(releases_dir: str, current: str, keep: int = RELEASES_KEEP) -> None:
+    """Delete all but the newest `keep` releases (always keeping `current`) and abandoned staging dirs."""
+    releases = sorted(d for d in os.listdir(releases_dir)
+                      if os.path.isdir(os.path.join(releases_dir, d)) and not d.startswith("."))
+    for name in releases[:-keep]:
+        if name != current:
+            shutil.rmtree(os.path.join(releases_dir, name), ignore_errors=True)
+    now = time.time()
+    for name in os.listdir(releases_dir):
+        path = os.path.join(releases_dir, name)
+        if name.startswith(STAGING_PREFIX) and now - os.path.getmtime(path) > STALE_STAGING_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _tree_files(root: str) -> Dict[str, str]:
+    """Relative path -> absolute path of every file under root."""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            files[os.path.relpath(path, root)] = path
+    return files
+
+
+def sync_tree(src: str, dst: str) -> Tuple[int, int]:
+    """Make dst an exact copy of src, touching only files whose content differs.
+
+    Returns (files written, files deleted).
+    """
+    os.makedirs(dst, exist_ok=True)
+    source, target = _tree_files(src), _tree_files(dst)
+    written = deleted = 0
+    for rel, path in sorted(source.items()):
+        existing = target.get(rel)
+        if existing and os.path.getsize(existing) == os.path.getsize(path) and _file_hash(existing) == _file_hash(path):
+            continue
+        out = os.path.join(dst, rel)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        shutil.copyfile(path, out + ".tmp")
+        os.replace(out + ".tmp", out)
+        written += 1
+    for rel, path in sorted(target.items()):
+        if rel not in source and os.path.basename(rel) not in SYNC_KEEP:
+            os.remove(path)
+            deleted += 1
+    # bottom-up, listing each directory again: its emptied subdirectories are gone by then
+    for dirpath, _, _ in os.walk(dst, topdown=False):
+        if dirpath != dst and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return written, deleted
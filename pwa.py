@@ -0,0 +1,228 @@
+"""
+Offline support (installable PWA)
+---------------------------------
+Writes a web app manifest and a service worker next to the generated pages.
+The service worker precaches the index, every day and fair page and the
+CDN assets they load, from a precache list with a content hash (revision)
+per URL generated from the build outputs (including the vendor/ bundles). On update only entries whose
+revision changed are downloaded again and entries that are no longer in the
+list are dropped, so a rebuild that touches one day re-fetches one page.
+
+Everything is served cache-first: after the first visit the maps open with
+no network at all. Map tiles (from the tile servers or the /tiles proxy)
+and fonts are cached at runtime as they are viewed (tiles capped at
+TILE_CACHE_MAX entries).
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import List, Tuple
+from urllib.parse import quote
+
+from asset_bundles import VENDOR_DIR
+from leaflet_pages import popup_files
+
+MANIFEST_FILE = "manifest.webmanifest"
+SERVICE_WORKER_FILE = "sw.js"
+ICON_FILE = "icon.svg"
+PWA_FILES = (MANIFEST_FILE, SERVICE_WORKER_FILE, ICON_FILE)
+
+THEME_COLOR = "#1e3a5f"
+TILE_CACHE_MAX = 1500  # ~15-25 MB of 256px tiles
+
+# Scripts and stylesheets the pages load from CDNs (versioned URLs, so the URL is the revision)
+CDN_ASSET_RE = re.compile(r'(?:src|href)="(https://[^"]+\.(?:js|css))"')
+
+ICON_SVG = """<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 512 512">
+<rect width="512" height="512" rx="96" fill="#1e3a5f"/>
+<path d="M256 96c-70 0-124 54-124 122 0 92 124 198 124 198s124-106 124-198c0-68-54-122-124-122z" fill="#4a90d9"/>
+<circle cx="256" cy="218" r="48" fill="#ffffff"/>
+</svg>
+"""
+
+SERVICE_WORKER_TEMPLATE = """// Generated by zonamaco_mapper.py - do not edit
+const PRECACHE = %(precache)s;
+const PRECACHE_NAME = 'zonamaco-precache';
+const RUNTIME_NAME = 'zonamaco-runtime';
+const TILES_NAME = 'zonamaco-tiles';
+const TILE_CACHE_MAX = %(tile_max)d;
+const REVISIONS_KEY = new URL('__precache-revisions', self.location).href;
+const TILE_RE = /\\/\\d+\\/\\d+\\/\\d+(@2x)?\\.png$/;
+const VENDOR_RE = /\\/vendor\\/[0-9a-f]+\\.\\w+$/;
+
+function absolute(url) { return new URL(url, self.location).href; }
+
+function precacheRequest(url) {
+    const abs = absolute(url);
+    return new URL(abs).origin === self.location.origin
+        ? new Request(abs, { cache: 'reload' })
+        : new Request(abs, { mode: 'no-cors' });
+}
+
+async function storedRevisions(cache) {
+    const res = await cache.match(REVISIONS_KEY);
+    return res ? res.json() : {};
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(PRECACHE_NAME);
+        const known = await storedRevisions(cache);
+        const revisions = {};
+        await Promise.all(PRECACHE.map(async entry => {
+            const key = absolute(entry.url);
+            revisions[key] = entry.revision;
+            if (known[key] === entry.revision && await cache.match(key)) return;
+            const res = await fetch(precacheRequest(entry.url));
+            if (!res.ok && res.type !== 'opaque') throw new Error('precache failed: ' + entry.url);
+            await cache.put(key, res);
+        }));
+        await cache.put(REVISIONS_KEY, new Response(JSON.stringify(revisions), { headers: { 'Content-Type': 'application/json' } }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const keep = new Set(PRECACHE.map(entry => absolute(entry.url)).concat([REVISIONS_KEY]));
+        const cache = await caches.open(PRECACHE_NAME);
+        for (const request of await cache.keys()) {
+            if (!keep.has(request.url)) await cache.delete(request);
+        }
+        for (const name of await caches.keys()) {
+            if (![PRECACHE_NAME, RUNTIME_NAME, TILES_NAME].includes(name)) await caches.delete(name);
+        }
+        await self.clients.claim();
+    })());
+});
+
+async function trimTiles(cache) {
+    const keys = await cache.keys();
+    for (let i = 0; i < keys.length - TILE_CACHE_MAX; i++) await cache.delete(keys[i]);
+}
+
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const res = await fetch(request);
+    if (res.ok || res.type === 'opaque') {
+        await cache.put(request, res.clone());
+        if (cacheName === TILES_NAME) trimTiles(cache);
+    }
+    return res;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (TILE_RE.test(url.pathname)) {
+        event.respondWith(cacheFirst(request, TILES_NAME));
+        return;
+    }
+    if (url.origin === self.location.origin && url.pathname.startsWith('/api/')) return;  // live data (change feed)
+    if (url.origin === self.location.origin) {
+        event.respondWith((async () => {
+            const cache = await caches.open(PRECACHE_NAME);
+            const precached = await cache.match(request, { ignoreSearch: true });
+            if (precached) return precached;
+            // Fonts and images referenced by the vendored stylesheets (immutable names)
+            return VENDOR_RE.test(url.pathname) ? cacheFirst(request, RUNTIME_NAME) : fetch(request);
+        })());
+        return;
+    }
+    event.respondWith((async () => {
+        const precached = await caches.match(request.url, { cacheName: PRECACHE_NAME });
+        return precached || cacheFirst(request, RUNTIME_NAME);
+    })());
+});
+"""
+
+
+def pwa_head_html() -> str:
+    """Manifest link and service-worker registration for a page's <head>.
+
+    Paths are relative, so the pages work both under /maps/ and at the root.
+    Registration fails silently on file:// and in browsers without support.
+    """
+    return f"""<link rel="manifest" href="{MANIFEST_FILE}">
+<meta name="theme-color" content="{THEME_COLOR}">
+<link rel="icon" href="{ICON_FILE}" type="image/svg+xml">
+<script>
+if ('serviceWorker' in navigator) {{
+    window.addEventListener('load', function() {{ navigator.serviceWorker.register('{SERVICE_WORKER_FILE}').catch(function() {{}}); }});
+}}
+</script>"""
+
+
+def _revision(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def precache_entries(output_dir: str) -> List[dict]:
+    """Precache list for the pages in output_dir: [{url, revision}], sorted by url.
+
+    Local files (pages, their popups and vendor/ bundles) are revisioned by content; CDN
+    assets still linked from a page by their (versioned) URL.
+    "./" aliases the index so the site root opens offline too.
+    """
+    entries = {}
+    cdn_assets = set()
+    pages = sorted(f for f in os.listdir(output_dir) if f.endswith(".html"))
+    vendor_dir = os.path.join(output_dir, VENDOR_DIR)
+    bundles = sorted(f"{VENDOR_DIR}/{f}" for f in os.listdir(vendor_dir)
+                     if f.endswith((".js", ".css"))) if os.path.isdir(vendor_dir) else []
+    for name in pages + bundles + popup_files(output_dir) + [MANIFEST_FILE, ICON_FILE]:
+        with open(os.path.join(output_dir, name), "rb") as f:
+            data = f.read()
+        entries[quote(name)] = _revision(data)
+        if name.endswith(".html"):
+            cdn_assets.update(CDN_ASSET_RE.findall(data.decode("utf-8", "replace")))
+    if "index.html" in entries:
+        entries["./"] = entries["index.html"]
+    for url in cdn_assets:
+        entries[url] = _revision(url.encode("utf-8"))
+    return [{"url": url, "revision": rev} for url, rev in sorted(entries.items())]
+
+
+def _write_if_changed(path: str, content: str) -> None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            if f.read() == content:
+                return
+    except OSError:
+        pass
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def write_pwa_files(output_dir: str, name: str, short_name: str) -> Tuple[List[str], int]:
+    """Write the manifest, icon and service worker for the pages in output_dir.
+
+    Must run after the pages are rendered. Returns (filenames, precached URLs).
+    """
+    manifest = {
+        "name": name,
+        "short_name": short_name,
+        "lang": "es",
+        "start_url": "./",
+        "scope": "./",
+        "display": "standalone",
+        "background_color": "#f8fafc",
+        "theme_color": THEME_COLOR,
+        "icons": [{"src": ICON_FILE, "sizes": "any", "type": "image/svg+xml", "purpose": "any maskable"}],
+    }
+    _write_if_changed(os.path.join(output_dir, ICON_FILE), ICON_SVG)
+    _write_if_changed(os.path.join(output_dir, MANIFEST_FILE),
+                      json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+
+    entries = precache_entries(output_dir)
+    worker = SERVICE_WORKER_TEMPLATE % {
+        "precache": "[\n" + ",\n".join("    " + json.dumps(e, ensure_ascii=False) for e in entries) + "\n]",
+        "tile_max": TILE_CACHE_MAX,
+    }
+    _write_if_changed(os.path.join(output_dir, SERVICE_WORKER_FILE), worker)
+    return list(PWA_FILES), len(entries)
@@ -0,0 +1,103 @@
+"""
+Schedule feasibility and conflict detection
+-------------------------------------------
+Given one day's events and venue-to-venue travel times, flags consecutive
+events that can't both be attended and finds the largest set of events one
+person can attend (weighted interval scheduling where consecutive picks must
+leave room for the visit plus the travel between venues).
+
+Events at the same coordinates are treated as one visit: a later (or
+simultaneous) event at the same place is always reachable.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+MIN_VISIT_MINUTES = 30  # time spent at an opening before leaving for the next one
+
+
+@dataclass
+class Conflict:
+    """`event` can't be reached in time after `previous`."""
+    event: object
+    previous: object
+    travel_minutes: int
+    late_by_minutes: int
+
+
+@dataclass
+class DayFeasibility:
+    plan: List[object] = field(default_factory=list)  # max attendable set, chronological
+    conflicts: Dict[int, Conflict] = field(default_factory=dict)  # id(event) -> Conflict
+
+    def in_plan(self, event) -> bool:
+        return any(e is event for e in self.plan)
+
+
+def _minutes(event) -> int:
+    return event.date.hour * 60 + event.date.minute
+
+
+def analyze_day(events: Sequence, travel: Callable[[object, object], float],
+                max_travel_into: Callable[[object], float],
+                visit_minutes: int = MIN_VISIT_MINUTES,
+                weight: Optional[Callable[[object], float]] = None) -> DayFeasibility:
+    """Conflicts between consecutive events and the maximum attendable set for a day.
+
+    `travel(a, b)` gives minutes from event a to event b; `max_travel_into(b)`
+    an upper bound on travel into b's venue from anywhere (both constant-time
+    matrix lookups). Events are sorted once (O(n log n)); each event then
+    binary-searches the predecessors that are compatible whatever their venue
+    (they ended at least max_travel_into(b) before b starts) and only checks
+    the few inside that travel window one by one, so the cost is
+    O(n log n + n * w) with w the number of events starting within one
+    maximal hop of each other.
+    """
+    weight = weight or (lambda e: 1)
+    located = [e for e in events if e.lat is not None and e.lon is not None]
+    order = sorted(located, key=lambda e: e.date)
+    result = DayFeasibility()
+    if not order:
+        return result
+
+    def same_place(a, b) -> bool:
+        return (a.lat, a.lon) == (b.lat, b.lon)
+
+    def compatible(a, b) -> bool:
+        """a (earlier in order) then b."""
+        if same_place(a, b):
+            return True
+        return _minutes(a) + visit_minutes + travel(a, b) <= _minutes(b)
+
+    # Consecutive conflicts
+    for prev, cur in zip(order, order[1:]):
+        if not compatible(prev, cur):
+            minutes = 0 if same_place(prev, cur) else round(travel(prev, cur))
+            late = _minutes(prev) + visit_minutes + minutes - _minutes(cur)
+            result.conflicts[id(cur)] = Conflict(cur, prev, minutes, late)
+
+    # Weighted interval scheduling with travel gaps
+    n = len(order)
+    starts = [_minutes(e) for e in order]
+    dp = [0.0] * n
+    parent: List[Optional[int]] = [None] * n
+    prefix_best: List[Tuple[float, Optional[int]]] = [(0.0, None)] * (n + 1)
+    for p, event in enumerate(order):
+        bound = starts[p] - visit_minutes - max_travel_into(event)
+        safe = bisect_right(starts, bound, 0, p)  # order[:safe] always fit before `event`
+        best, best_idx = prefix_best[safe]
+        for q in range(safe, p):
+            if dp[q] > best and compatible(order[q], event):
+                best, best_idx = dp[q], q
+        dp[p] = weight(event) + best
+        parent[p] = best_idx
+        prefix_best[p + 1] = max(prefix_best[p], (dp[p], p), key=lambda t: t[0])
+
+    _, last = prefix_best[n]
+    plan = []
+    while last is not None:
+        plan.append(order[last])
+        last = parent[last]
+    result.plan = plan[::-1]
+    return result
@@ -0,0 +1,152 @@
+// Generated by zonamaco_mapper.py - do not edit
+const PRECACHE = [
+    {"url": "./", "revision": "610a3e26397d"},
+    {"url": "2026-02-02_Lunes.en.html", "revision": "b3383982d661"},
+    {"url": "2026-02-02_Lunes.html", "revision": "9b0155ffded4"},
+    {"url": "2026-02-03_Martes.en.html", "revision": "b754782af4c1"},
+    {"url": "2026-02-03_Martes.html", "revision": "47763f032fac"},
+    {"url": "2026-02-04_Mi%C3%A9rcoles.en.html", "revision": "8637f8c91522"},
+    {"url": "2026-02-04_Mi%C3%A9rcoles.html", "revision": "22963347e85f"},
+    {"url": "2026-02-05_Jueves.en.html", "revision": "cab03bd62933"},
+    {"url": "2026-02-05_Jueves.html", "revision": "4c09937decec"},
+    {"url": "2026-02-06_Viernes.en.html", "revision": "48b7a894bad1"},
+    {"url": "2026-02-06_Viernes.html", "revision": "565be513ca50"},
+    {"url": "2026-02-07_S%C3%A1bado.en.html", "revision": "4454eca8fd37"},
+    {"url": "2026-02-07_S%C3%A1bado.html", "revision": "b2b009c62da6"},
+    {"url": "2026-02-08_Domingo.en.html", "revision": "efa890437ebc"},
+    {"url": "2026-02-08_Domingo.html", "revision": "cd78b3527628"},
+    {"url": "acme.en.html", "revision": "ac1f8e7931d4"},
+    {"url": "acme.html", "revision": "cb168f28b4e4"},
+    {"url": "https://cdn.jsdelivr.net/gh/python-visualization/folium/folium/templates/leaflet.awesome.rotate.min.css", "revision": "1bd8c4bfe936"},
+    {"url": "https://cdn.jsdelivr.net/npm/@fortawesome/fontawesome-free@6.2.0/css/all.min.css", "revision": "26ac4b4d0040"},
+    {"url": "https://cdn.jsdelivr.net/npm/bootstrap@5.2.2/dist/css/bootstrap.min.css", "revision": "37c38033d691"},
+    {"url": "https://cdn.jsdelivr.net/npm/bootstrap@5.2.2/dist/js/bootstrap.bundle.min.js", "revision": "f155f3d071cf"},
+    {"url": "https://cdn.jsdelivr.net/npm/leaflet-ant-path@1.1.2/dist/leaflet-ant-path.min.js", "revision": "8b2524b86a3e"},
+    {"url": "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css", "revision": "a58114980cde"},
+    {"url": "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js", "revision": "59d28e5bacf9"},
+    {"url": "https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.css", "revision": "b2e43b1d8201"},
+    {"url": "https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.js", "revision": "cd3ff5a40338"},
+    {"url": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css", "revision": "4db4f90110a4"},
+    {"url": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css", "revision": "d51a5571b986"},
+    {"url": "https://code.jquery.com/jquery-3.7.1.min.js", "revision": "8c616cf01259"},
+    {"url": "https://netdna.bootstrapcdn.com/bootstrap/3.0.0/css/bootstrap.min.css", "revision": "e6cdae3ea607"},
+    {"url": "icon.svg", "revision": "3f24c33a7e31"},
+    {"url": "index.en.html", "revision": "adb986610ea8"},
+    {"url": "index.html", "revision": "610a3e26397d"},
+    {"url": "manifest.webmanifest", "revision": "d01828bd964c"},
+    {"url": "material.en.html", "revision": "02b6b4f39eec"},
+    {"url": "material.html", "revision": "3fd0908e94aa"},
+    {"url": "popups/2026-02-02_Lunes-7ef1b8c0f352.json", "revision": "7ef1b8c0f352"},
+    {"url": "popups/2026-02-02_Lunes.en-d93a31d1e820.json", "revision": "d93a31d1e820"},
+    {"url": "popups/2026-02-03_Martes-3460e6617a29.json", "revision": "3460e6617a29"},
+    {"url": "popups/2026-02-03_Martes.en-8370f9936ec4.json", "revision": "8370f9936ec4"},
+    {"url": "popups/2026-02-04_Mi%C3%A9rcoles-316d5de63c84.json", "revision": "316d5de63c84"},
+    {"url": "popups/2026-02-04_Mi%C3%A9rcoles.en-07cc2c9f288a.json", "revision": "07cc2c9f288a"},
+    {"url": "popups/2026-02-05_Jueves-f7459e87c553.json", "revision": "f7459e87c553"},
+    {"url": "popups/2026-02-05_Jueves.en-e1ea3b6196c9.json", "revision": "e1ea3b6196c9"},
+    {"url": "popups/2026-02-06_Viernes-520f48867225.json", "revision": "520f48867225"},
+    {"url": "popups/2026-02-06_Viernes.en-ecad84c70eec.json", "revision": "ecad84c70eec"},
+    {"url": "popups/2026-02-07_S%C3%A1bado-15c092a0a68a.json", "revision": "15c092a0a68a"},
+    {"url": "popups/2026-02-07_S%C3%A1bado.en-680bb0ee33fa.json", "revision": "680bb0ee33fa"},
+    {"url": "popups/2026-02-08_Domingo-467e48a6fd40.json", "revision": "467e48a6fd40"},
+    {"url": "popups/2026-02-08_Domingo.en-fc670029f3d8.json", "revision": "fc670029f3d8"},
+    {"url": "popups/acme-6293ffe2dd23.json", "revision": "6293ffe2dd23"},
+    {"url": "popups/acme.en-9d52bf89c24a.json", "revision": "9d52bf89c24a"},
+    {"url": "popups/material-4e104e4b767d.json", "revision": "4e104e4b767d"},
+    {"url": "popups/material.en-dcbca7182be3.json", "revision": "dcbca7182be3"}
+];
+const PRECACHE_NAME = 'zonamaco-precache';
+const RUNTIME_NAME = 'zonamaco-runtime';
+const TILES_NAME = 'zonamaco-tiles';
+const TILE_CACHE_MAX = 1500;
+const REVISIONS_KEY = new URL('__precache-revisions', self.location).href;
+const TILE_RE = /\/\d+\/\d+\/\d+(@2x)?\.png$/;
+const VENDOR_RE = /\/vendor\/[0-9a-f]+\.\w+$/;
+
+function absolute(url) { return new URL(url, self.location).href; }
+
+function precacheRequest(url) {
+    const abs = absolute(url);
+    return new URL(abs).origin === self.location.origin
+        ? new Request(abs, { cache: 'reload' })
+        : new Request(abs, { mode: 'no-cors' });
+}
+
+async function storedRevisions(cache) {
+    const res = await cache.match(REVISIONS_KEY);
+    return res ? res.json() : {};
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(PRECACHE_NAME);
+        const known = await storedRevisions(cache);
+        const revisions = {};
+        await Promise.all(PRECACHE.map(async entry => {
+            const key = absolute(entry.url);
+            revisions[key] = entry.revision;
+            if (known[key] === entry.revision && await cache.match(key)) return;
+            const res = await fetch(precacheRequest(entry.url));
+            if (!res.ok && res.type !== 'opaque') throw new Error('precache failed: ' + entry.url);
+            await cache.put(key, res);
+        }));
+        await cache.put(REVISIONS_KEY, new Response(JSON.stringify(revisions), { headers: { 'Content-Type': 'application/json' } }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const keep = new Set(PRECACHE.map(entry => absolute(entry.url)).concat([REVISIONS_KEY]));
+        const cache = await caches.open(PRECACHE_NAME);
+        for (const request of await cache.keys()) {
+            if (!keep.has(request.url)) await cache.delete(request);
+        }
+        for (const name of await caches.keys()) {
+            if (![PRECACHE_NAME, RUNTIME_NAME, TILES_NAME].includes(name)) await caches.delete(name);
+        }
+        await self.clients.claim();
+    })());
+});
+
+async function trimTiles(cache) {
+    const keys = await cache.keys();
+    for (let i = 0; i < keys.length - TILE_CACHE_MAX; i++) await cache.delete(keys[i]);
+}
+
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const res = await fetch(request);
+    if (res.ok || res.type === 'opaque') {
+        await cache.put(request, res.clone());
+        if (cacheName === TILES_NAME) trimTiles(cache);
+    }
+    return res;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (TILE_RE.test(url.pathname)) {
+        event.respondWith(cacheFirst(request, TILES_NAME));
+        return;
+    }
+    if (url.origin === self.location.origin && url.pathname.startsWith('/api/')) return;  // live data (change feed)
+    if (url.origin === self.location.origin) {
+        event.respondWith((async () => {
+            const cache = await caches.open(PRECACHE_NAME);
+            const precached = await cache.match(request, { ignoreSearch: true });
+            if (precached) return precached;
+            // Fonts and images referenced by the vendored stylesheets (immutable names)
+            return VENDOR_RE.test(url.pathname) ? cacheFirst(request, RUNTIME_NAME) : fetch(request);
+        })());
+        return;
+    }
+    event.respondWith((async () => {
+        const precached = await caches.match(request.url, { cacheName: PRECACHE_NAME });
+        return precached || cacheFirst(request, RUNTIME_NAME);
+    })());
+});
@@ -0,0 +1,278 @@
+"""
+Offline street-network walking routes
+-------------------------------------
+Loads a preprocessed street graph (compact CSR adjacency arrays) and computes
+venue-to-venue shortest walking paths with A*. Results are cached per venue
+pair. Everything runs from the local graph file; without one, routes fall back
+to the straight-line (haversine) estimate.
+
+Graph file layout (little-endian):
+    b"ZMSG" | u32 format version | u32 n_nodes | u32 n_edges
+    f64[n_nodes] lat | f64[n_nodes] lon
+    u32[n_nodes + 1] offsets | u32[n_edges] targets | f32[n_edges] length_m
+
+Build one from an edge list (e.g. OSM ways exported with osmium/ogr2ogr as
+"lat1,lon1,lat2,lon2" rows):
+    python street_routing.py convert edges.csv data/cdmx_streets.graph
+"""
+
+import heapq
+import math
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+GRAPH_MAGIC = b"ZMSG"
+GRAPH_FORMAT_VERSION = 1
+DEFAULT_GRAPH_PATH = os.environ.get(
+    "ZONAMACO_STREET_GRAPH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cdmx_streets.graph"),
+)
+GRID_CELL_DEG = 0.005  # ~550 m buckets for nearest-node lookup
+EARTH_RADIUS_M = 6371000
+
+
+def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _read_array(typecode: str, data: bytes, offset: int, count: int) -> Tuple[array, int]:
+    arr = array(typecode)
+    end = offset + arr.itemsize * count
+    arr.frombytes(data[offset:end])
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr, end
+
+
+def _write_array(f, arr: array) -> None:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    f.write(arr.tobytes())
+
+
+@dataclass
+class Route:
+    """A walking route between two points."""
+    distance_km: float
+    polyline: List[List[float]]  # [[lat, lon], ...] from origin to destination
+    on_streets: bool             # False when it is the straight-line fallback
+
+    def midpoint(self) -> Tuple[float, float, float]:
+        """Point halfway along the route and the bearing there: (lat, lon, angle_deg)."""
+        pts = self.polyline
+        if len(pts) < 2:
+            lat, lon = pts[0]
+            return lat, lon, 0.0
+        seg_lengths = [_haversine_m(*pts[i], *pts[i + 1]) for i in range(len(pts) - 1)]
+        half = sum(seg_lengths) / 2
+        for i, length in enumerate(seg_lengths):
+            if half <= length or i == len(seg_lengths) - 1:
+                t = half / length if length else 0.5
+                (lat1, lon1), (lat2, lon2) = pts[i], pts[i + 1]
+                angle = math.degrees(math.atan2(lon2 - lon1, lat2 - lat1))
+                return lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t, angle
+            half -= length
+        raise AssertionError("unreachable")
+
+
+class StreetGraph:
+    """Street graph in CSR form: neighbours of node u are targets[offsets[u]:offsets[u+1]]."""
+
+    def __init__(self, lats: array, lons: array, offsets: array, targets: array, lengths: array):
+        self.lats, self.lons = lats, lons
+        self.offsets, self.targets, self.lengths = offsets, targets, lengths
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for node, (lat, lon) in enumerate(zip(lats, lons)):
+            self._grid.setdefault(self._cell(lat, lon), []).append(node)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lats)
+
+    @staticmethod
+    def _cell(lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / GRID_CELL_DEG)), int(math.floor(lon / GRID_CELL_DEG))
+
+    @classmethod
+    def load(cls, path: str) -> "StreetGraph":
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != GRAPH_MAGIC:
+            raise ValueError(f"{path}: not a street graph file")
+        version, n_nodes, n_edges = struct.unpack_from("<III", data, 4)
+        if version != GRAPH_FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported graph format version {version}")
+        offset = 16
+        lats, offset = _read_array("d", data, offset, n_nodes)
+        lons, offset = _read_array("d", data, offset, n_nodes)
+        offsets, offset = _read_array("I", data, offset, n_nodes + 1)
+        targets, offset = _read_array("I", data, offset, n_edges)
+        lengths, offset = _read_array("f", data, offset, n_edges)
+        return cls(lats, lons, offsets, targets, lengths)
+
+    def nearest_node(self, lat: float, lon: float, max_rings: int = 4) -> Optional[int]:
+        """Closest graph node, searching grid rings outward (None if nothing nearby)."""
+        ci, cj = self._cell(lat, lon)
+        best, best_d = None, float("inf")
+        for ring in range(max_rings + 1):
+            for i in range(ci - ring, ci + ring + 1):
+                for j in range(cj - ring, cj + ring + 1):
+                    if max(abs(i - ci), abs(j - cj)) != ring:
+                        continue
+                    for node in self._grid.get((i, j), ()):
+                        d = _haversine_m(lat, lon, self.lats[node], self.lons[node])
+                        if d < best_d:
+                            best, best_d = node, d
+            # Anything in a farther ring is at least `ring` cells away
+            if best is not None and best_d <= ring * GRID_CELL_DEG * 111000 * math.cos(math.radians(lat)):
+                break
+        return best
+
+    def shortest_path(self, source: int, target: int) -> Optional[Tuple[float, List[int]]]:
+        """A* with the haversine distance as (admissible) heuristic: (meters, nodes)."""
+        if source == target:
+            return 0.0, [source]
+        lats, lons = self.lats, self.lons
+        offsets, targets, lengths = self.offsets, self.targets, self.lengths
+        tlat, tlon = lats[target], lons[target]
+        dist = {source: 0.0}
+        prev: Dict[int, int] = {}
+        heap = [(_haversine_m(lats[source], lons[source], tlat, tlon), 0.0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u == target:
+                path = [u]
+                while u in prev:
+                    u = prev[u]
+                    path.append(u)
+                return d, path[::-1]
+            if d > dist.get(u, float("inf")):
+                continue
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                nd = d + lengths[k]
+                if nd < dist.get(v, float("inf")):
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(heap, (nd + _haversine_m(lats[v], lons[v], tlat, tlon), nd, v))
+        return None
+
+
+class WalkingRouter:
+    """Venue-to-venue walking routes, cached per coordinate pair."""
+
+    def __init__(self, graph: Optional[StreetGraph] = None):
+        self.graph = graph
+        self._cache: Dict[Tuple[float, float, float, float], Route] = {}
+
+    def route(self, lat1: float, lon1: float, lat2: float, lon2: float) -> Route:
+        key = (lat1, lon1, lat2, lon2)
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._cache[key] = self._compute(lat1, lon1, lat2, lon2)
+        return cached
+
+    def _compute(self, lat1: float, lon1: float, lat2: float, lon2: float) -> Route:
+        straight = Route(_haversine_m(lat1, lon1, lat2, lon2) / 1000, [[lat1, lon1], [lat2, lon2]], False)
+        if self.graph is None or (lat1, lon1) == (lat2, lon2):
+            return straight
+        g = self.graph
+        src, dst = g.nearest_node(lat1, lon1), g.nearest_node(lat2, lon2)
+        if src is None or dst is None:
+            return straight
+        found = g.shortest_path(src, dst)
+        if found is None:
+            return straight
+        meters, nodes = found
+        # Walk from the venue to the snapped node and from the last node to the venue
+        meters += _haversine_m(lat1, lon1, g.lats[src], g.lons[src])
+        meters += _haversine_m(g.lats[dst], g.lons[dst], lat2, lon2)
+        polyline = [[lat1, lon1]] + [[g.lats[n], g.lons[n]] for n in nodes] + [[lat2, lon2]]
+        return Route(meters / 1000, polyline, True)
+
+
+_default_router: Optional[WalkingRouter] = None
+
+
+def get_router(path: str = DEFAULT_GRAPH_PATH) -> WalkingRouter:
+    """Process-wide router for the default graph file (straight lines if it doesn't exist)."""
+    global _default_router
+    if _default_router is None:
+        graph = StreetGraph.load(path) if os.path.exists(path) else None
+        _default_router = WalkingRouter(graph)
+    return _default_router
+
+
+def write_graph(path: str, nodes: Sequence[Tuple[float, float]], edges: Sequence[Tuple[int, int, float]]) -> None:
+    """Write nodes [(lat, lon)] and directed edges [(u, v, length_m)] as a CSR graph file."""
+    order = sorted(range(len(edges)), key=lambda k: edges[k][0])
+    offsets = array("I", [0] * (len(nodes) + 1))
+    for u, _, _ in edges:
+        offsets[u + 1] += 1
+    for i in range(len(nodes)):
+        offsets[i + 1] += offsets[i]
+    targets = array("I", (edges[k][1] for k in order))
+    lengths = array("f", (edges[k][2] for k in order))
+
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp, "wb") as f:
+        f.write(GRAPH_MAGIC + struct.pack("<III", GRAPH_FORMAT_VERSION, len(nodes), len(edges)))
+        _write_array(f, array("d", (lat for lat, _ in nodes)))
+        _write_array(f, array("d", (lon for _, lon in nodes)))
+        _write_array(f, offsets)
+        _write_array(f, targets)
+        _write_array(f, lengths)
+    os.replace(tmp, path)
+
+
+def convert_edge_csv(csv_path: str, graph_path: str, precision: int = 6) -> Tuple[int, int]:
+    """Convert "lat1,lon1,lat2,lon2" street segments into a bidirectional graph file.
+
+    Endpoints are merged when equal after rounding to `precision` decimals.
+    Returns (nodes, directed edges).
+    """
+    import csv
+
+    index: Dict[Tuple[float, float], int] = {}
+    nodes: List[Tuple[float, float]] = []
+    edges: List[Tuple[int, int, float]] = []
+
+    def node_id(lat: float, lon: float) -> int:
+        key = (round(lat, precision), round(lon, precision))
+        if key not in index:
+            index[key] = len(nodes)
+            nodes.append(key)
+        return index[key]
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            try:
+                lat1, lon1, lat2, lon2 = map(float, row[:4])
+            except ValueError:
+                continue  # header or malformed row
+            u, v = node_id(lat1, lon1), node_id(lat2, lon2)
+            if u == v:
+                continue
+            length = _haversine_m(lat1, lon1, lat2, lon2)
+            edges.append((u, v, length))
+            edges.append((v, u, length))
+
+    write_graph(graph_path, nodes, edges)
+    return len(nodes), len(edges)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "convert":
+        print("Usage: python street_routing.py convert <edges.csv> <output.graph>")
+        sys.exit(2)
+    n_nodes, n_edges = convert_edge_csv(sys.argv[2], sys.argv[3])
+    print(f"✅ {sys.argv[3]}: {n_nodes} nodos, {n_edges} aristas")
@@ -0,0 +1,39 @@
+"""Bundler fallbacks: pages keep their CDN links when an asset can't be bundled."""
+
+from asset_bundles import Bundler
+
+PAGE = """<html><head>
+    <script src="https://cdn.example/a.js"></script>
+    <script src="https://cdn.example/b.js"></script>
+</head><body></body></html>"""
+
+
+class StubFetcher:
+    def __init__(self, files):
+        self.files = files
+
+    def fetch(self, url):
+        return self.files.get(url)
+
+
+def test_scripts_are_bundled(tmp_path):
+    bundler = Bundler(str(tmp_path), StubFetcher({
+        "https://cdn.example/a.js": "\ufeffvar a = 1;\n//# sourceMappingURL=a.js.map".encode("utf-8"),
+        "https://cdn.example/b.js": b"var b = 2;",
+    }))
+    html = bundler.rewrite_page(PAGE)
+    assert "cdn.example" not in html
+    [name] = bundler.files
+    assert f'<script src="{name}"></script>' in html
+    content = bundler.files[name].decode("utf-8")
+    assert "\ufeff" not in content and "sourceMappingURL" not in content
+    assert content.index("var a = 1;") < content.index("var b = 2;")
+
+
+def test_missing_or_non_utf8_asset_keeps_cdn_links(tmp_path, capsys):
+    for broken in (None, b"var b = '\xe9';"):
+        files = {"https://cdn.example/a.js": b"var a = 1;", "https://cdn.example/b.js": broken}
+        bundler = Bundler(str(tmp_path), StubFetcher(files))
+        assert bundler.rewrite_page(PAGE) == PAGE
+        assert bundler.files == {}
+    assert "no es UTF-8" in capsys.readouterr().out
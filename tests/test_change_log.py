@@ -0,0 +1,96 @@
+"""The change feed protocol: versions, diffs, exported feed and the deltas app.py serves."""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from change_log import ChangeLog, changes_since, event_ids
+from zonamaco_mapper import Event
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = ChangeLog(str(tmp_path / "log.sqlite"))
+    yield log
+    log.close()
+
+
+def test_versions_grow_only_with_changes(log):
+    assert log.created and log.version == 0
+    assert log.record({"a": {"t": 1}}) == (1, {"added": 1, "updated": 0, "removed": 0})
+    assert log.record({"a": {"t": 1}}) == (1, {"added": 0, "updated": 0, "removed": 0})
+    assert log.record({"a": {"t": 2}, "b": {"t": 1}}) == (2, {"added": 1, "updated": 1, "removed": 0})
+    assert log.record({"b": {"t": 1}}) == (3, {"added": 0, "updated": 0, "removed": 1})
+
+
+def test_log_id_persists_across_opens(tmp_path):
+    first = ChangeLog(str(tmp_path / "log.sqlite"))
+    first.record({"a": {}})
+    first.close()
+    again = ChangeLog(str(tmp_path / "log.sqlite"))
+    assert not again.created
+    assert (again.log_id, again.version) == (first.log_id, 1)
+    again.close()
+    other = ChangeLog(str(tmp_path / "other.sqlite"))
+    assert other.created and other.log_id != first.log_id
+    other.close()
+
+
+def test_feed_lists_changes_in_order(log):
+    log.record({"a": {"t": 1}, "b": {"t": 1}})
+    log.record({"a": {"t": 2}})
+    feed = log.feed()
+    assert (feed["log"], feed["version"], feed["oldest"]) == (log.log_id, 2, 0)
+    assert feed["changes"] == [[1, "added", "a", {"t": 1}], [1, "added", "b", {"t": 1}],
+                               [2, "updated", "a", {"t": 2}], [2, "removed", "b", None]]
+
+
+def test_export_writes_the_feed(log, tmp_path):
+    log.record({"a": {"title": "Mesa de Centro"}})
+    path = tmp_path / "changes.json"
+    size = log.export(str(path))
+    assert size == path.stat().st_size
+    assert json.loads(path.read_text(encoding="utf-8")) == log.feed()
+
+
+def test_changes_since_keeps_the_last_change_per_event(log):
+    log.record({"a": {"t": 1}, "b": {"t": 1}})
+    log.record({"a": {"t": 2}, "b": {"t": 1}, "c": {"t": 1}})
+    log.record({"a": {"t": 3}, "c": {"t": 1}})
+    feed = log.feed()
+    assert changes_since(feed, log.log_id, 1) == {
+        "log": log.log_id, "version": 3,
+        "changes": [["added", "c", {"t": 1}], ["updated", "a", {"t": 3}], ["removed", "b", None]],
+    }
+    assert changes_since(feed, log.log_id, 3)["changes"] == []
+    # b was added and removed again since 0: the client gets the removal, a no-op for it
+    assert [c[:2] for c in changes_since(feed, log.log_id, 0)["changes"]] == [["added", "c"], ["updated", "a"],
+                                                                              ["removed", "b"]]
+
+
+def test_changes_since_resets_clients_it_cannot_answer(log):
+    for n in range(5):
+        log.record({"a": {"t": n}})
+    feed = log.feed(versions=2)
+    assert feed["oldest"] == 3
+    reset = {"log": log.log_id, "version": 5, "reset": True}
+    assert changes_since(feed, "another-log", 4) == reset
+    assert changes_since(feed, None, 4) == reset
+    assert changes_since(feed, log.log_id, 2) == reset  # older than the retained feed
+    assert changes_since(feed, log.log_id, 6) == reset  # ahead of it
+    assert changes_since(feed, log.log_id, 3)["changes"] == [["updated", "a", {"t": 4}]]
+
+
+def test_event_ids_follow_the_event_across_times_of_day():
+    def event(hour, title="Inauguración"):
+        return Event(datetime(2026, 2, 3, hour), "LABOR", title, "", "Público", None, "zonamaco")
+
+    first, second, other = event(18), event(11), event(12, "Otra")
+    ids = event_ids([first, second, other])
+    # same fair, organizer, title and day: numbered in start-time order
+    assert ids[id(first)] == ids[id(second)] + "-2"
+    assert len(set(ids.values())) == 3
+    # a rescheduled event keeps its id
+    moved = event(20, "Otra")
+    assert event_ids([moved])[id(moved)] == ids[id(other)]
@@ -0,0 +1,99 @@
+"""events.bin: encode, map read-only and read back; query filters and the sort orders."""
+
+from datetime import date, datetime
+
+import pytest
+
+from event_snapshot import HEADER, MAGIC, NO_COORD, EventSnapshot, encode_snapshot, write_snapshot
+from zonamaco_mapper import Event, Venue
+
+WABI = Venue("Fundación Casa Wabi", 19.4232, -99.1634, "foundation", "Roma Norte")
+JUMEX = Venue("Museo Jumex", 19.4402, -99.2044, "museum", "Polanco")
+
+EVENTS = [
+    Event(datetime(2026, 2, 3, 18, 0), "Museo Jumex", "Inauguración 'Ñandú'", "Texto con acentos: é, ü, ñ.",
+          "Público", JUMEX),
+    Event(datetime(2026, 2, 3, 10, 0), "Casa Wabi", "Mesa de Centro", "Obra nueva.", "Privado", WABI),
+    Event(datetime(2026, 2, 3, 10, 0), "Casa Wabi", "Cristalización Especular", "Obra nueva.", "Privado", WABI),
+    Event(datetime(2026, 2, 4, 0, 0), "agencia sin sede", "Cena", "", "Privado", None),
+    Event(datetime(2026, 2, 6, 12, 0), "Material", "Material Art Fair", "Feria.", "Público", JUMEX, fair="material"),
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "events.bin"
+    assert write_snapshot(str(path), EVENTS) == path.stat().st_size
+    return EventSnapshot(str(path))
+
+
+def test_records_match_the_events(snapshot):
+    assert len(snapshot) == len(EVENTS)
+    for row, event in enumerate(EVENTS):
+        record = snapshot.record(row)
+        assert {key: record[key] for key in event.to_dict()} == event.to_dict()
+        assert record["venue"] == (event.venue.name if event.venue else "")
+        if event.venue:
+            assert (record["lat"], record["lon"]) == (pytest.approx(event.lat), pytest.approx(event.lon))
+        assert snapshot.start(row) == event.date
+
+
+def test_events_without_coordinates(snapshot):
+    row = 3
+    assert snapshot.columns["lat"][row] == snapshot.columns["lon"][row] == NO_COORD
+    record = snapshot.record(row)
+    assert (record["lat"], record["lon"], record["venue"], record["venue_type"]) == (None, None, "", "special")
+
+
+def test_query_filters(snapshot):
+    titles = lambda rows: [snapshot.record(row)["title"] for row in rows]
+    assert titles(snapshot.query()) == ["Cristalización Especular", "Mesa de Centro", "Inauguración 'Ñandú'", "Cena",
+                                        "Material Art Fair"]
+    assert titles(snapshot.query(day=date(2026, 2, 3))) == ["Cristalización Especular", "Mesa de Centro",
+                                                            "Inauguración 'Ñandú'"]
+    assert titles(snapshot.query(day=date(2026, 2, 4))) == ["Cena"]  # midnight belongs to its own day
+    assert titles(snapshot.query(day=date(2026, 2, 5))) == []
+    assert titles(snapshot.query(fair="material")) == ["Material Art Fair"]
+    assert titles(snapshot.query(day=date(2026, 2, 3), category="Público")) == ["Inauguración 'Ñandú'"]
+    assert titles(snapshot.query(fair="zonamaco", category="Privado")) == ["Cristalización Especular",
+                                                                          "Mesa de Centro", "Cena"]
+
+
+def test_unknown_filter_values_match_nothing(snapshot):
+    assert list(snapshot.query(fair="frieze")) == []
+    assert list(snapshot.query(category="VIP")) == []
+
+
+def test_organizer_order(snapshot):
+    organizers = [snapshot.record(row)["organizer"] for row in snapshot.by_organizer()]
+    assert organizers == ["agencia sin sede", "Casa Wabi", "Casa Wabi", "Material", "Museo Jumex"]
+
+
+def test_strings_are_deduplicated_and_sections_aligned():
+    data = encode_snapshot(EVENTS)
+    assert data.count("Obra nueva.".encode("utf-8")) == 1
+    magic, _, _, meta_len, rows = HEADER.unpack_from(data)
+    assert (magic, rows) == (MAGIC, len(EVENTS))
+    assert (HEADER.size + meta_len) % 8 == 0
+    assert encode_snapshot(EVENTS) == data  # deterministic
+
+
+def test_empty_snapshot(tmp_path):
+    path = tmp_path / "events.bin"
+    write_snapshot(str(path), [])
+    snapshot = EventSnapshot(str(path))
+    assert len(snapshot) == 0 and list(snapshot.query(fair="zonamaco")) == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "events.bin"
+    path.write_bytes(b"ZM")
+    with pytest.raises(ValueError, match="truncated"):
+        EventSnapshot(str(path))
+    path.write_bytes(HEADER.pack(b"NOPE", 1, 0, 0, 0))
+    with pytest.raises(ValueError, match="not a version"):
+        EventSnapshot(str(path))
+    data = encode_snapshot(EVENTS)
+    path.write_bytes(data[:HEADER.size + HEADER.unpack_from(data)[3] + 16])  # cut inside the sections
+    with pytest.raises(ValueError, match="out of bounds"):
+        EventSnapshot(str(path))
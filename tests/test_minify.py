@@ -0,0 +1,140 @@
+"""JS tokenizer edge cases, CSS rule comparison and the same_dom() check."""
+
+import pytest
+
+from minify import css_rules, js_tokens, minify_css, minify_html, minify_js, same_dom
+
+
+def strings(source):
+    return [text for kind, text in js_tokens(source) if kind == "string"]
+
+
+def test_tokens_reassemble_source():
+    source = "var a = `x ${b}` + '/' / 2; // done\nre = /[/]\\//g;"
+    assert "".join(text for _, text in js_tokens(source)) == source
+
+
+@pytest.mark.parametrize("source", [
+    "a = b / c / d",
+    "x = f(a) / 2 / g",
+    "x = a[0] / 2 / 1",
+    "x = i++ / 2 / 3",
+    "x = i-- / 2 // not a regex",
+    "x = 1.5 / 3 / y",
+    "a = b\n/c/ d",  # no ASI before "/": still a division
+])
+def test_division_is_not_a_regex(source):
+    assert strings(source) == []
+
+
+@pytest.mark.parametrize("source, regex", [
+    ("x = /ab+c/g.test(s)", "/ab+c/g"),
+    ("f(/a/, /b/i)", "/a/"),
+    ("return /x\\/y/.test(s)", "/x\\/y/"),
+    ("if (!/^\\d+$/.test(v)) {}", "/^\\d+$/"),
+    ("s.replace(/[/*]/g, '')", "/[/*]/g"),
+    ("x = a ? /y/ : /z/", "/y/"),
+    ("/start/.test(s)", "/start/"),
+])
+def test_regex_literals_are_kept_whole(source, regex):
+    assert regex in strings(source)
+    assert regex in minify_js(source)
+
+
+def test_template_literals():
+    source = "x = `a  ${ {k: `n  ${y}`}.k }  b // c /* d */`;"
+    assert minify_js(source) == "x=`a  ${{k:`n  ${y}`}.k}  b // c /* d */`;"
+    # the substitution is code; the text around it isn't
+    assert ("code", "y") in js_tokens(source)
+    assert ("code", "c") not in js_tokens(source)
+
+
+def test_template_literal_with_escaped_backtick_and_dollar():
+    source = "x = `a \\` \\${b} ${c}`;"
+    assert minify_js(source) == "x=`a \\` \\${b} ${c}`;"
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("a = b\n++c", "a=b\n++c"),
+    ("return\nx", "return\nx"),
+    ("var a = b\n(c)", "var a=b\n(c)"),
+    ("x = 1\n// comment\n[1, 2].forEach(f)", "x=1\n[1,2].forEach(f)"),
+    ("a = 1 /* multi\nline */ b = 2", "a=1\nb=2"),
+])
+def test_newlines_survive_for_asi(source, expected):
+    assert minify_js(source) == expected
+
+
+def test_words_stay_apart():
+    assert minify_js("return  typeof  x") == "return typeof x"
+    assert minify_js("a + +b") == "a + +b"
+    assert minify_js("a - -b") == "a - -b"
+
+
+def test_quotes_and_script_end_in_strings():
+    source = "var s = '<\\/script>', t = \"it's // \\\"here\\\"\"; // end"
+    assert strings(source) == ["'<\\/script>'", "\"it's // \\\"here\\\"\""]
+    assert minify_js(source) == "var s='<\\/script>',t=\"it's // \\\"here\\\"\";"
+
+
+def test_script_end_in_a_string_ends_the_element():
+    # Browsers end the script at the first </script>, whatever the JS says; so do minify_html and same_dom
+    html = '<html><body><script>var s = "</script>";  var t = 1;</script></body></html>'
+    minified = minify_html(html)
+    assert minified.startswith('<html><body><script>var s="</script>')
+    assert same_dom(html, minified)
+
+
+def test_css_rules_ignore_insignificant_whitespace():
+    source = """/* note */ .a > b , .c { margin : 0 auto ; color: rgba(0, 0, 0, 0.5); }
+    @media (max-width: 600px) { .x:hover { content: "a  ; }" } }"""
+    assert css_rules(source) == [
+        (".a>b,.c", [("margin", "0 auto"), ("color", "rgba(0,0,0,0.5)")]),
+        ("@media (max-width:600px)", [(".x:hover", [("content", '"a  ; }"')])]),
+    ]
+    assert css_rules(minify_css(source)) == css_rules(source)
+
+
+@pytest.mark.parametrize("original, broken", [
+    (".a { margin: 0 auto }", ".a{margin:0auto}"),
+    (".a :hover { color: red }", ".a:hover{color:red}"),
+    (".a { width: calc(1px + 2px) }", ".a{width:calc(1px+2px)}"),
+    (".a { color: red } .b { color: blue }", ".a{color:red;.b{color:blue}}"),
+    (".a { content: 'x  y' }", ".a{content:'x y'}"),
+])
+def test_same_dom_catches_broken_css(original, broken):
+    page = "<html><head><style>%s</style></head><body></body></html>"
+    assert not same_dom(page % original, page % broken)
+
+
+def test_same_dom_accepts_minified_page():
+    html = """<!DOCTYPE html>
+<html>
+  <head>
+    <style>
+      .a > b { margin: 0 auto; }  /* comment */
+    </style>
+    <script>
+      // setup
+      var x = i++ / 2;
+      var r = /a b/g;
+    </script>
+  </head>
+  <body>
+    <!-- gone -->
+    <div  class="c">Hello
+       world</div>
+    <pre>  kept
+  as is </pre>
+  </body>
+</html>"""
+    minified = minify_html(html)
+    assert len(minified) < len(html)
+    assert "  kept\n  as is " in minified
+    assert same_dom(html, minified)
+
+
+def test_same_dom_catches_changed_script():
+    page = "<html><body><script>%s</script></body></html>"
+    assert not same_dom(page % "a = b\n++c", page % "a = b++c")
+    assert not same_dom(page % "x = 'a  b'", page % "x = 'a b'")
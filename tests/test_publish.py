@@ -0,0 +1,95 @@
+"""Atomic releases and the content-hash sync of static/maps/ and docs/."""
+
+import os
+
+import pytest
+
+from publish import (CURRENT_POINTER, RELEASES_KEEP, STAGING_PREFIX, current_release, publish_release,
+                     stabilize_element_ids, stage_release, sync_tree)
+
+
+def write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def files(root):
+    return {str(p.relative_to(root)): p.read_text(encoding="utf-8") for p in root.rglob("*") if p.is_file()}
+
+
+@pytest.fixture
+def trees(tmp_path):
+    src, dst = tmp_path / "release", tmp_path / "docs"
+    for rel, text in {"index.html": "index", "a.html": "a", "popups/a-1.json": "{}", "vendor/x.js": "x"}.items():
+        write(src, rel, text)
+    return src, dst
+
+
+def test_sync_copies_a_tree(trees):
+    src, dst = trees
+    assert sync_tree(str(src), str(dst)) == (4, 0)
+    assert files(dst) == files(src)
+
+
+def test_sync_only_writes_changed_files(trees):
+    src, dst = trees
+    sync_tree(str(src), str(dst))
+    unchanged = dst / "index.html"
+    os.utime(unchanged, ns=(1, 1))
+    write(src, "a.html", "a, edited")
+    write(src, "vendor/x.js", "y")  # same size, other bytes
+    assert sync_tree(str(src), str(dst)) == (2, 0)
+    assert unchanged.stat().st_mtime_ns == 1
+    assert files(dst) == files(src)
+    assert sync_tree(str(src), str(dst)) == (0, 0)
+
+
+def test_sync_deletes_stale_files_and_keeps_hand_made_ones(trees):
+    src, dst = trees
+    write(dst, "CNAME", "maps.example.com")
+    write(dst, ".nojekyll", "")
+    write(dst, "old.html", "gone")
+    write(dst, "popups/old/deep/b-2.json", "{}")
+    written, deleted = sync_tree(str(src), str(dst))
+    assert (written, deleted) == (4, 2)
+    assert files(dst) == dict(files(src), **{"CNAME": "maps.example.com", ".nojekyll": ""})
+    assert not (dst / "popups" / "old").exists()  # emptied directories go too, nested ones included
+
+
+def test_publish_switches_current_and_prunes(tmp_path):
+    releases = tmp_path / "releases"
+    assert current_release(str(releases)) is None
+    published = []
+    for n in range(RELEASES_KEEP + 2):
+        staging = stage_release(str(releases), published[-1] if published else None)
+        assert os.path.basename(staging).startswith(STAGING_PREFIX)
+        write(tmp_path, os.path.join(staging, f"page{n}.html"), str(n))
+        release = publish_release(staging, str(releases), f"2026020{n}0000-abc")
+        published.append(release)
+        assert current_release(str(releases)) == release
+        assert (releases / CURRENT_POINTER).read_text(encoding="utf-8").strip() == os.path.basename(release)
+    # partial builds start from a copy of the previous release
+    assert sorted(os.listdir(published[-1])) == [f"page{n}.html" for n in range(RELEASES_KEEP + 2)]
+    kept = sorted(d for d in os.listdir(releases) if d != CURRENT_POINTER)
+    assert kept == [os.path.basename(r) for r in published[-RELEASES_KEEP:]]
+
+
+def test_publish_same_version_twice(tmp_path):
+    releases = str(tmp_path / "releases")
+    first = publish_release(stage_release(releases), releases, "v")
+    second = publish_release(stage_release(releases), releases, "v")
+    assert os.path.basename(first) == "v" and os.path.basename(second) == "v.2"
+    assert current_release(releases) == second
+
+
+def test_stabilize_element_ids():
+    html = "map_0123456789abcdef0123456789abcdef marker_fedcba9876543210fedcba9876543210 map_0123456789abcdef0123456789abcdef"
+    stable = stabilize_element_ids(html, "page.html")
+    first, second, third = stable.split()
+    assert first == third and first != second
+    assert first.startswith("map_") and second.startswith("marker_")
+    other = html.replace("0123456789abcdef", "aaaaaaaaaaaaaaaa")
+    assert stabilize_element_ids(other, "page.html") == stable
+    assert stabilize_element_ids(html, "other.html") != stable
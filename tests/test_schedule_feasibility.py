@@ -0,0 +1,106 @@
+"""Conflict flags and the maximum attendable plan, checked against brute force on small random days."""
+
+import itertools
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from schedule_feasibility import MIN_VISIT_MINUTES, analyze_day
+from street_routing import WalkingRouter
+from travel_times import TravelTimeMatrix
+from zonamaco_mapper import VENUES, Event, analyze_day_feasibility
+
+# A few venues across the city: Polanco, Roma, Condesa, San Ángel, Coyoacán (two events can share one)
+POINTS = [(19.4402, -99.2044), (19.4180, -99.1620), (19.4110, -99.1730), (19.3534, -99.1894), (19.3500, -99.1620)]
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    return TravelTimeMatrix(POINTS, router=WalkingRouter(None))
+
+
+def day_problem(matrix, events):
+    def travel(a, b):
+        hour = (a.date.hour * 60 + a.date.minute + MIN_VISIT_MINUTES) // 60
+        return matrix.best((a.lat, a.lon), (b.lat, b.lon), hour)[1]
+    return travel, lambda e: matrix.max_minutes_into((e.lat, e.lon))
+
+
+def brute_force(events, travel, weight):
+    """Best total weight over every chronological subset whose consecutive picks fit."""
+    order = sorted(events, key=lambda e: e.date)
+    minutes = lambda e: e.date.hour * 60 + e.date.minute
+
+    def fits(a, b):
+        return (a.lat, a.lon) == (b.lat, b.lon) or minutes(a) + MIN_VISIT_MINUTES + travel(a, b) <= minutes(b)
+
+    best = 0
+    for size in range(1, len(order) + 1):
+        for picks in itertools.combinations(order, size):
+            if all(fits(a, b) for a, b in zip(picks, picks[1:])):
+                best = max(best, sum(weight(e) for e in picks))
+    return best
+
+
+def random_day(rng, n):
+    events = []
+    for _ in range(n):
+        lat, lon = rng.choice(POINTS)
+        start = datetime(2026, 2, 3, rng.randint(10, 21), rng.choice((0, 15, 30, 45)))
+        events.append(SimpleNamespace(date=start, lat=lat, lon=lon, weight=rng.choice((1, 1, 2, 5))))
+    return events
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_plan_matches_brute_force(matrix, seed):
+    rng = random.Random(seed)
+    events = random_day(rng, rng.randint(1, 10))
+    travel, max_into = day_problem(matrix, events)
+    weight = (lambda e: e.weight) if seed % 2 else (lambda e: 1)
+    result = analyze_day(events, travel, max_into, weight=weight)
+
+    assert sum(weight(e) for e in result.plan) == brute_force(events, travel, weight)
+    # the plan itself is attendable, in order
+    for a, b in zip(result.plan, result.plan[1:]):
+        assert a.date <= b.date
+        assert (a.lat, a.lon) == (b.lat, b.lon) or \
+            a.date.hour * 60 + a.date.minute + MIN_VISIT_MINUTES + travel(a, b) <= b.date.hour * 60 + b.date.minute
+
+
+def test_conflicts_flag_unreachable_consecutive_events(matrix):
+    rng = random.Random(1)
+    for _ in range(30):
+        events = random_day(rng, 8)
+        travel, max_into = day_problem(matrix, events)
+        result = analyze_day(events, travel, max_into)
+        order = sorted(events, key=lambda e: e.date)
+        for prev, cur in zip(order, order[1:]):
+            gap = (cur.date - prev.date).total_seconds() / 60
+            reachable = (prev.lat, prev.lon) == (cur.lat, cur.lon) or MIN_VISIT_MINUTES + travel(prev, cur) <= gap
+            assert (id(cur) in result.conflicts) == (not reachable)
+            if not reachable:
+                conflict = result.conflicts[id(cur)]
+                assert conflict.previous is prev
+                assert conflict.late_by_minutes == MIN_VISIT_MINUTES + conflict.travel_minutes - gap
+
+
+def test_events_without_coordinates_are_left_out(matrix):
+    events = [SimpleNamespace(date=datetime(2026, 2, 3, 10), lat=None, lon=None)]
+    result = analyze_day(events, *day_problem(matrix, events))
+    assert result.plan == [] and result.conflicts == {}
+
+
+def test_polanco_then_san_angel_half_an_hour_later_is_a_conflict():
+    polanco = Event(datetime(2026, 2, 3, 19, 0), "Museo Jumex", "Apertura", "", "Público", VENUES["MUSEO JUMEX"])
+    san_angel = Event(datetime(2026, 2, 3, 19, 30), "Carrillo Gil", "Apertura", "", "Público",
+                      VENUES["MUSEO DE ARTE CARRILLO GIL"])
+    same_place = Event(datetime(2026, 2, 3, 19, 10), "Museo Jumex", "Cóctel", "", "Privado", VENUES["MUSEO JUMEX"])
+
+    result = analyze_day_feasibility([san_angel, polanco, same_place])
+    conflict = result.conflicts[id(san_angel)]
+    assert conflict.previous is same_place
+    assert conflict.travel_minutes > 0 and conflict.late_by_minutes > 0
+    assert id(same_place) not in result.conflicts  # same venue: one visit
+    assert result.in_plan(polanco) and result.in_plan(same_place) and not result.in_plan(san_angel)
@@ -0,0 +1,159 @@
+"""CSR graph files, A* and nearest-node snapping on a 3x3 street grid fixture (tests/data/streets.csv).
+
+The grid has ~200 m blocks at 19.410-19.414 N, 99.166-99.170 W with the
+street between (0, 1) and (1, 1) missing, plus one segment far away that
+isn't connected to it.
+"""
+
+import heapq
+import os
+import random
+import struct
+
+import pytest
+
+from street_routing import (GRAPH_MAGIC, StreetGraph, WalkingRouter, _haversine_m, convert_edge_csv,
+                            write_graph)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "data", "streets.csv")
+
+
+def grid(r: int, c: int):
+    return round(19.410 + 0.002 * r, 3), round(-99.170 + 0.002 * c, 3)
+
+
+@pytest.fixture
+def graph_path(tmp_path):
+    path = str(tmp_path / "streets.graph")
+    assert convert_edge_csv(FIXTURE, path) == (11, 26)
+    return path
+
+
+@pytest.fixture
+def graph(graph_path):
+    return StreetGraph.load(graph_path)
+
+
+def node_at(graph, point):
+    return next(n for n in range(graph.node_count) if (graph.lats[n], graph.lons[n]) == point)
+
+
+def neighbours(graph, u):
+    return sorted(graph.targets[k] for k in range(graph.offsets[u], graph.offsets[u + 1]))
+
+
+def dijkstra(graph, source, target):
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u == target:
+            return d
+        if d > dist[u]:
+            continue
+        for k in range(graph.offsets[u], graph.offsets[u + 1]):
+            v, nd = graph.targets[k], d + graph.lengths[k]
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return None
+
+
+def test_csr_layout(graph):
+    assert graph.node_count == 11
+    assert list(graph.offsets) == sorted(graph.offsets)
+    assert graph.offsets[-1] == len(graph.targets) == len(graph.lengths) == 26
+    center = node_at(graph, grid(1, 1))
+    assert neighbours(graph, center) == sorted(node_at(graph, grid(*rc)) for rc in ((1, 0), (1, 2), (2, 1)))
+    corner = node_at(graph, grid(0, 0))
+    # the fixture lists the (0, 0)-(0, 1) street twice
+    assert neighbours(graph, corner) == sorted([node_at(graph, grid(1, 0))] + [node_at(graph, grid(0, 1))] * 2)
+
+
+def test_edges_are_bidirectional_with_haversine_lengths(graph):
+    for u in range(graph.node_count):
+        for k in range(graph.offsets[u], graph.offsets[u + 1]):
+            v = graph.targets[k]
+            assert u in neighbours(graph, v)
+            expected = _haversine_m(graph.lats[u], graph.lons[u], graph.lats[v], graph.lons[v])
+            assert graph.lengths[k] == pytest.approx(expected, rel=1e-6)
+
+
+def test_write_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "tiny.graph")
+    nodes = [(19.41, -99.17), (19.42, -99.17), (19.42, -99.16)]
+    write_graph(path, nodes, [(2, 1, 30.0), (0, 1, 10.0), (1, 2, 30.0), (1, 0, 10.0)])
+    g = StreetGraph.load(path)
+    assert list(zip(g.lats, g.lons)) == nodes
+    assert list(g.offsets) == [0, 1, 3, 4]
+    assert sorted((g.targets[k], g.lengths[k]) for k in range(g.offsets[1], g.offsets[2])) == [(0, 10.0), (2, 30.0)]
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "bad.graph"
+    path.write_bytes(b"NOPE" + bytes(12))
+    with pytest.raises(ValueError, match="not a street graph"):
+        StreetGraph.load(str(path))
+    path.write_bytes(GRAPH_MAGIC + struct.pack("<III", 99, 0, 0))
+    with pytest.raises(ValueError, match="version 99"):
+        StreetGraph.load(str(path))
+
+
+def test_astar_detours_around_missing_street(graph):
+    source, target = node_at(graph, grid(0, 1)), node_at(graph, grid(1, 1))
+    meters, path = graph.shortest_path(source, target)
+    assert [(graph.lats[n], graph.lons[n]) for n in path][0] == grid(0, 1)
+    assert [(graph.lats[n], graph.lons[n]) for n in path][-1] == grid(1, 1)
+    assert len(path) == 4  # around one block instead of the missing street
+    across, up = _haversine_m(*grid(0, 0), *grid(0, 1)), _haversine_m(*grid(0, 0), *grid(1, 0))
+    assert meters == pytest.approx(2 * across + up, rel=1e-5)
+
+
+def test_astar_matches_dijkstra_on_every_pair(graph):
+    connected = [node_at(graph, grid(r, c)) for r in range(3) for c in range(3)]
+    for source in connected:
+        for target in connected:
+            meters, path = graph.shortest_path(source, target)
+            assert meters == pytest.approx(dijkstra(graph, source, target), abs=1e-6)
+            assert path[0] == source and path[-1] == target
+            walked = sum(_haversine_m(graph.lats[a], graph.lons[a], graph.lats[b], graph.lons[b])
+                         for a, b in zip(path, path[1:]))
+            assert walked == pytest.approx(meters, rel=1e-5)
+
+
+def test_astar_unreachable_and_same_node(graph):
+    island = node_at(graph, (19.5, -99.1))
+    assert graph.shortest_path(node_at(graph, grid(0, 0)), island) is None
+    assert graph.shortest_path(island, island) == (0.0, [island])
+
+
+def test_nearest_node_matches_brute_force(graph):
+    rng = random.Random(7)
+    for _ in range(500):
+        lat, lon = rng.uniform(19.400, 19.424), rng.uniform(-99.180, -99.156)
+        found = graph.nearest_node(lat, lon)
+        best = min(_haversine_m(lat, lon, graph.lats[n], graph.lons[n]) for n in range(graph.node_count))
+        assert _haversine_m(lat, lon, graph.lats[found], graph.lons[found]) == pytest.approx(best)
+
+
+def test_nearest_node_across_cell_boundary(graph):
+    # just south of the grid's southern cell row: the nearest node is in the next cell up
+    assert graph.nearest_node(19.4099, -99.1701) == node_at(graph, grid(0, 0))
+
+
+def test_nearest_node_too_far(graph):
+    assert graph.nearest_node(19.3, -99.3) is None
+    assert graph.nearest_node(19.3, -99.3, max_rings=100) is not None
+
+
+def test_router_snaps_to_streets_and_falls_back(graph):
+    router = WalkingRouter(graph)
+    route = router.route(19.4101, -99.1681, 19.4121, -99.1681)
+    assert route.on_streets
+    assert route.polyline[0] == [19.4101, -99.1681] and route.polyline[-1] == [19.4121, -99.1681]
+    assert route.distance_km == pytest.approx(0.66, abs=0.03)
+    assert router.route(19.4101, -99.1681, 19.4121, -99.1681) is route
+
+    to_island = router.route(19.41, -99.17, 19.5, -99.1)
+    assert not to_island.on_streets and len(to_island.polyline) == 2
+    assert not WalkingRouter(None).route(19.41, -99.17, 19.412, -99.17).on_streets
@@ -0,0 +1,128 @@
+"""DiskTileCache and TileProxy against a local stub tile server."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tile_cache import DiskTileCache, TileProxy, TileUnavailable
+
+TILE = b"\x89PNG tile"
+
+
+class StubTiles(BaseHTTPRequestHandler):
+    """Answers every GET with TILE, or with the status in the server's `status`; records the request paths."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.paths.append(self.path)
+        time.sleep(server.delay)
+        if server.status != 200:
+            self.send_response(server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(TILE)))
+        self.end_headers()
+        self.wfile.write(TILE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTiles)
+    server.lock = threading.Lock()
+    server.paths = []
+    server.status = 200
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_proxy(root, upstream, max_bytes=1024 * 1024):
+    template = f"http://127.0.0.1:{upstream.server_port}/{{layer}}/{{z}}/{{x}}/{{y}}.png?key=secret"
+    return TileProxy(DiskTileCache(str(root), max_bytes), template)
+
+
+def test_miss_then_hit(tmp_path, upstream):
+    proxy = make_proxy(tmp_path, upstream)
+    assert proxy.get("light", 12, 1, 2) == (TILE, False)
+    assert proxy.get("light", 12, 1, 2) == (TILE, True)
+    assert upstream.paths == ["/light/12/1/2.png?key=secret"]
+
+
+def test_tile_written_by_another_process_is_a_hit(tmp_path, upstream):
+    other = DiskTileCache(str(tmp_path), 1024 * 1024)
+    other.put("light", 12, 1, 2, TILE)
+    assert make_proxy(tmp_path, upstream).get("light", 12, 1, 2) == (TILE, True)
+    assert upstream.paths == []
+
+
+def test_eviction_keeps_directory_under_cap(tmp_path, upstream):
+    cap = 3 * len(TILE)
+    proxy = make_proxy(tmp_path, upstream, max_bytes=cap)
+    for y in range(3):
+        proxy.get("light", 12, 1, y)
+        time.sleep(0.01)  # distinct mtimes
+    proxy.get("light", 12, 1, 0)  # hit: now the most recently used
+    time.sleep(0.01)
+    proxy.get("light", 12, 1, 3)
+    cache = proxy.cache
+    assert cache.size() <= cap
+    assert not os.path.exists(cache.path("light", 12, 1, 1))
+    assert os.path.exists(cache.path("light", 12, 1, 0))
+    assert os.path.exists(cache.path("light", 12, 1, 3))
+
+
+def test_cap_counts_tiles_from_other_processes(tmp_path):
+    cap = 2 * len(TILE)
+    first, second = DiskTileCache(str(tmp_path), cap), DiskTileCache(str(tmp_path), cap)
+    first.put("light", 12, 1, 0, TILE)
+    first.put("light", 12, 1, 1, TILE)
+    second.put("light", 12, 1, 2, TILE)
+    assert second.size() <= cap
+
+
+def test_upstream_error(tmp_path, upstream):
+    upstream.status = 404
+    proxy = make_proxy(tmp_path, upstream)
+    with pytest.raises(TileUnavailable):
+        proxy.get("light", 12, 1, 2)
+    assert proxy.cache.get("light", 12, 1, 2) is None
+
+
+def test_unreachable_upstream(tmp_path, upstream):
+    proxy = make_proxy(tmp_path, upstream)
+    upstream.shutdown()
+    upstream.server_close()
+    with pytest.raises(TileUnavailable):
+        proxy.get("light", 12, 1, 2)
+
+
+def test_concurrent_misses_fetch_once(tmp_path, upstream):
+    upstream.delay = 0.2
+    proxy = make_proxy(tmp_path, upstream)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: proxy.get("light", 12, 1, 2), range(8)))
+    assert [data for data, _ in results] == [TILE] * 8
+    assert len(upstream.paths) == 1
+    assert proxy.inflight == {}
+
+
+def test_bad_tiles_are_rejected(tmp_path, upstream):
+    proxy = make_proxy(tmp_path, upstream)
+    with pytest.raises(KeyError):
+        proxy.get("satellite", 12, 1, 2)
+    with pytest.raises(ValueError):
+        proxy.get("light", 2, 4, 0)
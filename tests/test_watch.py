@@ -0,0 +1,101 @@
+"""Watch mode's dependency graph: which pages an edit of the mapper source rebuilds.
+
+Each test loads an edited copy of zonamaco_mapper.py the way watch() does and
+diffs its BuildGraph against the one of the unedited source.
+"""
+
+import pytest
+
+import zonamaco_mapper
+from zonamaco_mapper import _load_sources, affected_pages, build_dependency_graph
+
+with open(zonamaco_mapper.__file__, encoding="utf-8") as f:
+    SOURCE = f.read()
+
+JUMEX = '"MUSEO JUMEX": Venue("Museo Jumex", 19.4402, -99.2044, "museum", "Polanco",'
+MONCLOVA = '(datetime(2026, 2, 3, 16, 0), "PROYECTOS MONCLOVA GALLERY",'
+
+
+@pytest.fixture
+def original(tmp_path):
+    # same path for both versions, as in watch(): BASE_DIR and the paths derived from it are constants too
+    path = tmp_path / "zonamaco_mapper.py"
+    path.write_text(SOURCE, encoding="utf-8")
+    module = _load_sources(str(path), 0)
+    return module, build_dependency_graph(module)
+
+
+@pytest.fixture
+def edited(tmp_path):
+    def load(old, new):
+        assert SOURCE.count(old) == 1
+        path = tmp_path / "zonamaco_mapper.py"
+        path.write_text(SOURCE.replace(old, new), encoding="utf-8")
+        return build_dependency_graph(_load_sources(str(path), 1))
+    return load
+
+
+def day_pages(module, venue):
+    return {module.day_filename(e.date) for e in module.load_all_events()[0] if e.venue is module.VENUES[venue]}
+
+
+def test_unchanged_source_rebuilds_nothing(original, edited):
+    module, graph = original
+    assert affected_pages(graph, edited("# MUSEUMS", "# MUSEUMS (edited comment)")) == set()
+
+
+def test_venue_coordinates_rebuild_its_day_maps(original, edited):
+    module, graph = original
+    pages = affected_pages(graph, edited(JUMEX, JUMEX.replace("19.4402", "19.4412")))
+    assert pages == day_pages(module, "MUSEO JUMEX")
+    assert pages and "index.html" not in pages  # the index doesn't show coordinates
+
+
+def test_venue_neighborhood_rebuilds_the_index_too(original, edited):
+    module, graph = original
+    pages = affected_pages(graph, edited(JUMEX, JUMEX.replace('"Polanco"', '"Granada"')))
+    assert pages == day_pages(module, "MUSEO JUMEX") | {"index.html"}
+
+
+def test_event_moved_to_another_day_rebuilds_both_days(original, edited):
+    module, graph = original
+    pages = affected_pages(graph, edited(MONCLOVA, MONCLOVA.replace("2, 3, 16", "2, 4, 16")))
+    assert pages == {"2026-02-03_Martes.html", "2026-02-04_Miércoles.html", "index.html"}
+
+
+def test_event_text_rebuilds_its_day_and_the_index(original, edited):
+    module, graph = original
+    pages = affected_pages(graph, edited('"Exposición colectiva.", "Público"', '"Exposición colectiva!", "Público"'))
+    assert pages == {"2026-02-03_Martes.html", "index.html"}
+
+
+def test_template_edit_rebuilds_everything(original, edited):
+    module, graph = original
+    assert affected_pages(graph, edited("zoom=14, tiles=[]", "zoom=15, tiles=[]")) is None
+    assert affected_pages(graph, edited("INDEX_VENUE_FIELDS = (", "INDEX_VENUE_FIELDS = ('name', ")) is None
+
+
+def test_reloaded_module_keeps_the_fragment_cache(original, edited, monkeypatch, tmp_path):
+    monkeypatch.setenv("ZONAMACO_FRAGMENT_CACHE", "off")
+    module, _ = original
+    cache = module.fragment_cache()
+    cache.get("test", [1], lambda: "<b>1</b>")
+
+    edited("# MUSEUMS", "# MUSEUMS (edited comment)")
+    same = _load_sources(str(tmp_path / "zonamaco_mapper.py"), 2)
+    assert same.fragment_cache(cache) is cache
+    assert cache.get("test", [1], lambda: "rendered again") == "<b>1</b>"
+
+    edited("# MUSEUMS", "# MUSEUMS (edited comment)")
+    retemplated = _load_sources(str(tmp_path / "zonamaco_mapper.py"), 3)
+    retemplated.FRAGMENT_TEMPLATE_VERSION += 1
+    assert retemplated.fragment_cache(cache) is cache
+    assert cache.get("test", [1], lambda: "rendered again") == "rendered again"
+
+
+def test_release_options_round_trip(tmp_path):
+    options = zonamaco_mapper.render_options("leaflet", ("es", "en"), True)
+    assert zonamaco_mapper.release_options(str(tmp_path)) is None
+    zonamaco_mapper.write_build_manifest(str(tmp_path), options)
+    assert zonamaco_mapper.release_options(str(tmp_path)) == options
+    assert options != zonamaco_mapper.render_options("folium", ("es", "en"), True)
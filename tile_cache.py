@@ -0,0 +1,316 @@
+"""
+Map tile caching proxy
+----------------------
+Backs the optional /tiles/<layer>/<z>/<x>/<y>.png route in app.py: tiles are
+fetched from the public tile servers over a small pool of keep-alive
+connections and kept in a size-capped LRU cache on disk, so the few hundred
+CDMX tiles every visitor views are downloaded once. The cache lives entirely
+in the directory (file mtimes are the recency), so every gunicorn worker
+sees the same tiles and the same size cap, and concurrent requests for a
+tile that is being fetched wait for that fetch instead of starting another.
+
+Enable it in app.py with ZONAMACO_TILE_PROXY=1 and build the pages with
+ZONAMACO_TILE_PROXY_URL=/tiles so their tile layers point at it. The upstream
+can be replaced (e.g. by a local stub server) with ZONAMACO_TILE_UPSTREAM, a
+URL template with {layer}, {z}, {x} and {y}; its query string (e.g. an API
+key) is sent upstream as is.
+"""
+
+import http.client
+import math
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+# key -> upstream URL template, folium's built-in name for the same tiles, attribution,
+# and the Leaflet URL template/subdomains/max zoom that name stands for (direct-Leaflet pages)
+TILE_LAYERS = {
+    "light": {
+        "upstream": "https://a.basemaps.cartocdn.com/light_all/{z}/{x}/{y}.png",
+        "folium": "cartodbpositron",
+        "url": "https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png",
+        "subdomains": "abcd",
+        "max_zoom": 20,
+        "attr": '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors '
+                '&copy; <a href="https://carto.com/attributions">CARTO</a>',
+    },
+    "osm": {
+        "upstream": "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+        "folium": "OpenStreetMap",
+        "url": "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+        "subdomains": "abc",
+        "max_zoom": 19,
+        "attr": '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
+    },
+}
+
+MAX_ZOOM = 19
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tile_cache")
+DEFAULT_CACHE_MB = 512
+POOL_SIZE = 4          # keep-alive connections per upstream host
+UPSTREAM_TIMEOUT = 10  # seconds
+USER_AGENT = "zonamaco-maps tile proxy"
+
+
+class TileUnavailable(Exception):
+    """The upstream server didn't return the tile."""
+
+
+class DiskTileCache:
+    """Tiles on disk as <root>/<layer>/<z>/<x>/<y>.png, evicted least recently used first.
+
+    The directory is the only state: a hit touches the file, and the size cap
+    is enforced by scanning the directory and removing the oldest files. To
+    keep puts cheap the scan runs once every `max_bytes / 100` bytes written
+    by this process, so the cache may briefly exceed the cap by that much per
+    process.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.scan_every = max(max_bytes // 100, 1)
+        self.lock = threading.Lock()
+        self.written = self.scan_every  # bytes put since the last scan; the first put scans
+
+    def path(self, layer: str, z: int, x: int, y: int) -> str:
+        return os.path.join(self.root, layer, str(z), str(x), f"{y}.png")
+
+    def get(self, layer: str, z: int, x: int, y: int) -> Optional[bytes]:
+        path = self.path(layer, z, x, y)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:  # not cached, or evicted by another process meanwhile
+            return None
+        return data
+
+    def put(self, layer: str, z: int, x: int, y: int, data: bytes) -> None:
+        path = self.path(layer, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self.lock:
+            self.written += len(data)
+            if self.written < self.scan_every:
+                return
+            self.written = 0
+        self.evict(keep=path)
+
+    def size(self) -> int:
+        """Bytes of tiles currently on disk."""
+        return sum(size for _, size, _ in self._files())
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Remove the least recently used tiles until the directory is within the cap; returns how many.
+
+        `keep` (the tile just written) is never removed.
+        """
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:  # already removed by another process
+                pass
+            total -= size
+        return removed
+
+    def _files(self) -> Iterator[Tuple[float, int, str]]:
+        """(mtime, size, path) of every cached tile."""
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".png"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, reused across requests and threads."""
+
+    def __init__(self, scheme: str, netloc: str, size: int = POOL_SIZE, timeout: float = UPSTREAM_TIMEOUT,
+                 user_agent: str = USER_AGENT):
+        self.factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        self.netloc = netloc
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=size)
+
+    def request(self, path: str) -> Tuple[int, bytes]:
+        """GET path; retried once on a fresh connection if a kept-alive one was closed."""
+        for attempt in range(2):
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.factory(self.netloc, timeout=self.timeout)
+            try:
+                conn.request("GET", path, headers={"User-Agent": self.user_agent})
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                conn.close()
+            else:
+                try:
+                    self.idle.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+            return response.status, body
+        raise AssertionError("unreachable")
+
+
+class TileProxy:
+    """Serve tiles from the disk cache, fetching misses from the upstream servers."""
+
+    def __init__(self, cache: DiskTileCache, upstream_override: Optional[str] = None):
+        self.cache = cache
+        self.upstream_override = upstream_override
+        self.pools: Dict[str, ConnectionPool] = {}
+        self.lock = threading.Lock()
+        self.inflight: Dict[Tuple[str, int, int, int], Future] = {}  # tile -> its upstream fetch
+
+    def upstream_url(self, layer: str, z: int, x: int, y: int) -> str:
+        template = self.upstream_override or TILE_LAYERS[layer]["upstream"]
+        return template.format(layer=layer, z=z, x=x, y=y)
+
+    def _pool(self, scheme: str, netloc: str) -> ConnectionPool:
+        with self.lock:
+            key = f"{scheme}://{netloc}"
+            if key not in self.pools:
+                self.pools[key] = ConnectionPool(scheme, netloc)
+            return self.pools[key]
+
+    def get(self, layer: str, z: int, x: int, y: int) -> Tuple[bytes, bool]:
+        """(png bytes, cache hit). KeyError for unknown layers, ValueError for bad coordinates."""
+        if layer not in TILE_LAYERS:
+            raise KeyError(layer)
+        if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise ValueError(f"tile out of range: {z}/{x}/{y}")
+        data = self.cache.get(layer, z, x, y)
+        if data is not None:
+            return data, True
+        key = (layer, z, x, y)
+        with self.lock:
+            fetch = self.inflight.get(key)
+            leader = fetch is None
+            if leader:
+                fetch = self.inflight[key] = Future()
+        if not leader:  # another request is fetching this tile; share its result
+            return fetch.result(), False
+        try:
+            body = self._fetch(layer, z, x, y)
+        except BaseException as exc:
+            fetch.set_exception(exc)
+            raise
+        else:
+            fetch.set_result(body)
+        finally:
+            with self.lock:
+                del self.inflight[key]
+        return body, False
+
+    def _fetch(self, layer: str, z: int, x: int, y: int) -> bytes:
+        """Download a tile and store it in the cache."""
+        url = urlsplit(self.upstream_url(layer, z, x, y))
+        path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+        try:
+            status, body = self._pool(url.scheme, url.netloc).request(path)
+        except (http.client.HTTPException, OSError) as exc:
+            raise TileUnavailable(f"{layer}/{z}/{x}/{y}: {exc}") from exc
+        if status != 200 or not body:
+            raise TileUnavailable(f"{layer}/{z}/{x}/{y}: upstream status {status}")
+        self.cache.put(layer, z, x, y, body)
+        return body
+
+
+def proxy_from_env(require_enabled: bool = True) -> Optional[TileProxy]:
+    """The proxy configured by the ZONAMACO_TILE_* variables, or None when disabled."""
+    if require_enabled and os.environ.get("ZONAMACO_TILE_PROXY") != "1":
+        return None
+    root = os.environ.get("ZONAMACO_TILE_CACHE_DIR", DEFAULT_CACHE_DIR)
+    max_mb = int(os.environ.get("ZONAMACO_TILE_CACHE_MB", DEFAULT_CACHE_MB))
+    return TileProxy(DiskTileCache(root, max_mb * 1024 * 1024), os.environ.get("ZONAMACO_TILE_UPSTREAM"))
+
+
+def proxied_tile_url(layer: str) -> Optional[str]:
+    """Leaflet URL template for a layer when pages should use the proxy (ZONAMACO_TILE_PROXY_URL)."""
+    base = os.environ.get("ZONAMACO_TILE_PROXY_URL")
+    if not base:
+        return None
+    return f"{base.rstrip('/')}/{layer}/{{z}}/{{x}}/{{y}}.png"
+
+
+def leaflet_tile_layer(layer: str) -> Tuple[str, dict]:
+    """URL template and L.tileLayer options for a layer, the same ones folium emits for it."""
+    info = TILE_LAYERS[layer]
+    url = proxied_tile_url(layer)
+    if url:
+        return url, {"attribution": info["attr"], "maxZoom": MAX_ZOOM, "maxNativeZoom": MAX_ZOOM}
+    return info["url"], {"attribution": info["attr"], "subdomains": info["subdomains"],
+                         "maxZoom": info["max_zoom"], "maxNativeZoom": info["max_zoom"]}
+
+
+def tile_xy(lat: float, lon: float, z: int) -> Tuple[int, int]:
+    """Web Mercator tile containing a point."""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bbox(south: float, west: float, north: float, east: float,
+                  zooms: Iterable[int]) -> Iterator[Tuple[int, int, int]]:
+    for z in zooms:
+        x0, y0 = tile_xy(north, west, z)
+        x1, y1 = tile_xy(south, east, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+def prewarm(proxy: TileProxy, bbox: Tuple[float, float, float, float], zooms: Iterable[int],
+            layers: Iterable[str] = ("light",), workers: int = POOL_SIZE) -> Dict[str, int]:
+    """Fetch every tile in bbox (south, west, north, east) at the given zooms into the cache.
+
+    Returns counts of 'cached' (already there), 'fetched' and 'failed' tiles.
+    """
+    counts = {"cached": 0, "fetched": 0, "failed": 0}
+    lock = threading.Lock()
+    jobs = [(layer, z, x, y) for layer in layers for z, x, y in tiles_in_bbox(*bbox, zooms)]
+
+    def fetch(job):
+        try:
+            _, hit = proxy.get(*job)
+            result = "cached" if hit else "fetched"
+        except TileUnavailable:
+            result = "failed"
+        with lock:
+            counts[result] += 1
+            done = sum(counts.values())
+        if done % 500 == 0 or done == len(jobs):
+            print(f"  🗺️  {done}/{len(jobs)} tiles")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(fetch, jobs))
+    return counts
@@ -0,0 +1,173 @@
+"""
+Multi-modal travel-time matrices
+--------------------------------
+Precomputes venue x venue travel times for walking, biking and driving once
+per build. Walking uses the street router (street_routing.py), biking and
+driving use the straight-line distance times a detour factor. Driving times
+are scaled by an hourly congestion profile, precomputed for all 24 hours so
+every lookup during rendering is a constant-time array index.
+
+The congestion profile can be overridden with a JSON file mapping hour to
+multiplier, e.g. {"18": 2.0, "19": 2.1}, via ZONAMACO_TRAFFIC_PROFILE.
+"""
+
+import json
+import os
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from street_routing import WalkingRouter, _haversine_m, get_router
+
+# speed_kmh: moving speed; detour: street distance / straight line; overhead_min: fixed
+# cost per trip (docking a bike, waiting for a ride and parking).
+TRAVEL_MODES = {
+    "walk": {"icon": "🚶", "speed_kmh": 5.0, "detour": 1.0, "overhead_min": 0},
+    "bike": {"icon": "🚲", "speed_kmh": 14.0, "detour": 1.2, "overhead_min": 4},
+    "car": {"icon": "🚗", "speed_kmh": 32.0, "detour": 1.35, "overhead_min": 6},
+}
+
+# Free-flow multiplier per hour of day for car trips in CDMX. The 18:00-21:00 rush
+# overlaps the evening openings.
+DEFAULT_CONGESTION = {
+    0: 0.9, 1: 0.9, 2: 0.9, 3: 0.9, 4: 0.9, 5: 1.0, 6: 1.2, 7: 1.6, 8: 1.8, 9: 1.6,
+    10: 1.3, 11: 1.2, 12: 1.2, 13: 1.4, 14: 1.5, 15: 1.4, 16: 1.4, 17: 1.6,
+    18: 1.9, 19: 2.0, 20: 1.8, 21: 1.5, 22: 1.2, 23: 1.0,
+}
+
+# Car trips longer than this run mostly on highways (e.g. to Morelos) at HIGHWAY_KMH
+URBAN_KM = 15.0
+HIGHWAY_KMH = 70.0
+
+WALK_MAX_MIN = 20    # walking is the sensible choice up to this many minutes
+BIKE_MAX_MIN = 30    # beyond this, take a car even if the bike is a bit faster
+WALK_ROUTE_MAX_KM = 4.0  # longer pairs skip street routing (nobody walks them)
+WALK_DETOUR = 1.3        # street / straight-line distance for pairs without a street route
+
+
+def load_congestion_profile(path: Optional[str] = None) -> Dict[int, float]:
+    """Default profile, with hours overridden from a JSON file if given."""
+    profile = dict(DEFAULT_CONGESTION)
+    path = path or os.environ.get("ZONAMACO_TRAFFIC_PROFILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for hour, factor in json.load(f).items():
+                profile[int(hour) % 24] = float(factor)
+    return profile
+
+
+def pair_minutes(straight_km: float, walk_km: float) -> Tuple[float, float, float]:
+    """(walk, bike, free-flow car) minutes for a trip of straight_km, walking walk_km of streets."""
+    walk, bike, car = TRAVEL_MODES["walk"], TRAVEL_MODES["bike"], TRAVEL_MODES["car"]
+    car_km = straight_km * car["detour"]
+    return (walk_km / walk["speed_kmh"] * 60,
+            bike["overhead_min"] + straight_km * bike["detour"] / bike["speed_kmh"] * 60,
+            (min(car_km, URBAN_KM) / car["speed_kmh"] + max(0.0, car_km - URBAN_KM) / HIGHWAY_KMH) * 60)
+
+
+class TravelTimeMatrix:
+    """Travel minutes between every pair of points, for every mode.
+
+    Points are (lat, lon) tuples, so co-located venues share a row. Car
+    minutes are stored per hour: car[hour][i * n + j]. Lookups involving a
+    point outside the matrix are estimated from the straight-line distance.
+    """
+
+    def __init__(self, points: Iterable[Tuple[float, float]], router: Optional[WalkingRouter] = None,
+                 congestion: Optional[Dict[int, float]] = None):
+        self.points: List[Tuple[float, float]] = sorted(set(points))
+        self.index = {p: i for i, p in enumerate(self.points)}
+        self.congestion = congestion or load_congestion_profile()
+        router = router or get_router()
+
+        n = len(self.points)
+        self.n = n
+        self.distance_km = array("f", [0.0]) * (n * n)
+        self.walk = array("f", [0.0]) * (n * n)
+        self.bike = array("f", [0.0]) * (n * n)
+        car_free = array("f", [0.0]) * (n * n)
+
+        for i, (lat1, lon1) in enumerate(self.points):
+            for j, (lat2, lon2) in enumerate(self.points):
+                if i == j:
+                    continue
+                k = i * n + j
+                straight_km = _haversine_m(lat1, lon1, lat2, lon2) / 1000
+                if straight_km <= WALK_ROUTE_MAX_KM:
+                    walk_km = router.route(lat1, lon1, lat2, lon2).distance_km
+                else:
+                    walk_km = straight_km * WALK_DETOUR
+                self.distance_km[k] = walk_km
+                self.walk[k], self.bike[k], car_free[k] = pair_minutes(straight_km, walk_km)
+
+        self.car = []
+        for hour in range(24):
+            hourly = array("f", (self._car_minutes(v, hour) for v in car_free))
+            self.car.append(hourly)
+
+        # Upper bound of best() into each point over all origins and hours. best() only
+        # grows with congestion, so the most congested hour gives the maximum.
+        self.peak = max(range(24), key=lambda h: self.congestion.get(h, 1.0))
+        self.max_best_into = array("f", [0.0]) * n
+        for i, a in enumerate(self.points):
+            for j, b in enumerate(self.points):
+                if i != j:
+                    self.max_best_into[j] = max(self.max_best_into[j], self.best(a, b, self.peak)[1])
+
+    def _car_minutes(self, free_flow: float, hour: int) -> float:
+        return 0.0 if free_flow == 0 else TRAVEL_MODES["car"]["overhead_min"] + free_flow * self.congestion.get(hour, 1.0)
+
+    def _times(self, a: Tuple[float, float], b: Tuple[float, float], hour: int) -> Tuple[float, float, float, float]:
+        """(walking km, walk, bike, car minutes) of a pair, estimated when either point isn't in the matrix."""
+        i, j = self.index.get(a), self.index.get(b)
+        if i is not None and j is not None:
+            k = i * self.n + j
+            return self.distance_km[k], self.walk[k], self.bike[k], self.car[hour % 24][k]
+        straight_km = _haversine_m(a[0], a[1], b[0], b[1]) / 1000
+        walk, bike, car_free = pair_minutes(straight_km, straight_km * WALK_DETOUR)
+        return straight_km * WALK_DETOUR, walk, bike, self._car_minutes(car_free, hour % 24)
+
+    def minutes(self, mode: str, a: Tuple[float, float], b: Tuple[float, float], hour: int = 12) -> float:
+        _, walk, bike, car = self._times(a, b, hour)
+        if mode == "walk":
+            return walk
+        if mode == "bike":
+            return bike
+        if mode == "car":
+            return car
+        raise ValueError(f"unknown travel mode: {mode}")
+
+    def distance(self, a: Tuple[float, float], b: Tuple[float, float]) -> float:
+        """Walking (street) distance in km."""
+        return self._times(a, b, 12)[0]
+
+    def max_minutes_into(self, b: Tuple[float, float]) -> float:
+        """Longest best() trip into `b` from any point at any hour."""
+        j = self.index.get(b)
+        if j is not None:
+            return self.max_best_into[j]
+        return max((self.best(a, b, self.peak)[1] for a in self.points if a != b), default=0)
+
+    def best(self, a: Tuple[float, float], b: Tuple[float, float], hour: int = 12) -> Tuple[str, int]:
+        """Fastest sensible mode and its minutes at the given departure hour.
+
+        Walk when it takes at most WALK_MAX_MIN; otherwise the faster of bike and
+        car, but never a bike ride longer than BIKE_MAX_MIN.
+        """
+        _, walk, bike, car = self._times(a, b, hour)
+        if walk <= WALK_MAX_MIN:
+            return "walk", round(walk)
+        if bike < car and bike <= BIKE_MAX_MIN:
+            return "bike", round(bike)
+        return "car", round(car)
+
+
+_matrix_cache: Dict[tuple, TravelTimeMatrix] = {}
+
+
+def get_matrix(points: Iterable[Tuple[float, float]]) -> TravelTimeMatrix:
+    """Matrix for these points, built once per process (i.e. once per build)."""
+    key = tuple(sorted(set(points)))
+    matrix = _matrix_cache.get(key)
+    if matrix is None:
+        matrix = _matrix_cache[key] = TravelTimeMatrix(key)
+    return matrix
@@ -10,24 +10,53 @@ Enhanced with:
 - Validation report (v4.1)
 - Fixed click-to-pan (v4.1)
 - venue_key support (v4.1)
+- Subcommand CLI: validate, stats, build [--day], watch (v4.6)
+- Optional tile proxy + prewarm-tiles (v4.6)
+- Binary event snapshot (events.bin) for app.py queries (v4.6)
+- SQLite event store: store import/export, build --db (v4.6)
+- Persistent popup/tooltip fragment cache (v4.6)
+- Streaming page writer with templates compiled once (v4.6)
+- Direct-Leaflet map backend: build --backend leaflet, check-backends (v4.6)
+- Spanish and English pages from one parse: build --locale (v4.6)
+
+folium and the build-stage modules (geocoding, tile cache, minifier,
+bundler, publishing, ...) are imported lazily by the functions that use
+them, as require_folium() does for folium, so the data helpers (VENUES,
+parse_events(), haversine_distance(), ...) can be imported without them and
+`validate` / `stats` start in milliseconds. The leaflet backend doesn't need
+folium at all.
 """
 
+import argparse
 import os
 import sys
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
 from collections import Counter
 import json
 
-# Fail fast if folium not installed
-try:
+from locales import (DEFAULT_LOCALE, LOCALES, STRINGS, alternate_links, day_name, format_date, locale_filename,
+                     text_script)
+from page_stream import Chunks, CompiledTemplate, write_chunks
+
+if TYPE_CHECKING:
     import folium
-    from folium.plugins import AntPath
-    from folium.features import DivIcon
-except ImportError:
-    print("ERROR: folium not installed. Run: pip install folium")
-    sys.exit(1)
+
+    from fragment_cache import FragmentCache
+    from leaflet_pages import MapMarker, MapSpec
+
+
+def require_folium():
+    """Import folium for the rendering commands, failing fast if it's missing."""
+    try:
+        import folium
+        import folium.plugins
+        import folium.features
+    except ImportError:
+        print("ERROR: folium not installed. Run: pip install folium")
+        sys.exit(1)
+    return folium
 
 
 # =============================================================================
@@ -36,8 +65,8 @@ except ImportError:
 @dataclass
 class Venue:
     name: str
-    lat: float
-    lon: float
+    lat: Optional[float]  # None: geocoded from address at build time (see locate_events)
+    lon: Optional[float]
     venue_type: str
     neighborhood: str = ""
     address: str = ""
@@ -210,9 +239,13 @@ TIME_PERIODS = {
     "evening": {"label": "Noche", "icon": "🌙", "color": "#1e3a5f", "range": (18, 24)},
 }
 
-SPANISH_DAYS = {0: "Lunes", 1: "Martes", 2: "Miércoles", 3: "Jueves", 4: "Viernes", 5: "Sábado", 6: "Domingo"}
-SPANISH_MONTHS = {1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril", 5: "Mayo", 6: "Junio",
-                  7: "Julio", 8: "Agosto", 9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre"}
+# Real-user monitoring: pages beacon Performance API timings to app.py
+RUM_ENDPOINT = "/rum"
+
+# Page filenames and --day use the Spanish day names in every locale (labels come from locales.py)
+SPANISH_DAYS = dict(enumerate(STRINGS["es"]["days"]))
+
+FAIRS = {"zonamaco": "ZonaMaco", "material": "Material Art Fair", "acme": "Salón ACME"}
 
 
 @dataclass
@@ -277,8 +310,81 @@ def get_venue(organizer: str, venue_key: Optional[str] = None) -> Optional[Venue
     return None
 
 
-def validate_events(events: List[Event]) -> None:
-    """Validate events and print a report. Call after parsing to catch issues early."""
+# =============================================================================
+# GEOCODING (venues without coordinates)
+# =============================================================================
+GEOCODE_CITY = "Ciudad de México"
+GEOCODED_VENUES: Dict[str, Venue] = {}  # venues located this run, by key (the travel matrix covers them too)
+CATALOG_VENUES: Dict[str, Venue] = {}   # venues of the catalog loaded by load_catalog(), used instead of VENUES
+
+
+def venue_address(venue: Venue) -> str:
+    """What a venue is geocoded by: its address (or name), neighborhood and the city."""
+    return ", ".join(part for part in (venue.address or venue.name, venue.neighborhood, GEOCODE_CITY) if part)
+
+
+def locate_events(venues: Dict[str, Venue], events: List[Event], geocoder=None,
+                  cache_only: bool = False) -> Optional[Dict[str, int]]:
+    """Fill in missing coordinates through geocoding.py before validation.
+
+    Venues without lat/lon are looked up by venue_address(); events without a
+    venue by organizer, and those found get a "special" venue, added to
+    `venues`. The geocoder defaults to ZONAMACO_GEOCODER and the cache file
+    to ZONAMACO_GEOCODE_CACHE. With cache_only no geocoder is called and the
+    cache is only read (validate). Returns geocode()'s counts plus "missing"
+    (still without coordinates), or None when nothing needed locating.
+    """
+    from geocoding import DEFAULT_GEOCODE_CACHE, GeocodeCache, geocode, geocoder_from_env
+
+    pending = {key: venue for key, venue in venues.items() if venue.lat is None or venue.lon is None}
+    venueless: Dict[str, List[Event]] = {}
+    for e in events:
+        if e.venue is None:
+            venueless.setdefault(e.organizer.upper().strip(), []).append(e)
+    if not pending and not venueless:
+        return None
+
+    queries = {key: venue_address(venue) for key, venue in pending.items()}
+    queries.update({key: f"{evs[0].organizer}, {GEOCODE_CITY}" for key, evs in venueless.items()})
+    cache = GeocodeCache(os.environ.get("ZONAMACO_GEOCODE_CACHE", DEFAULT_GEOCODE_CACHE), read_only=cache_only)
+    if cache_only:
+        geocoder = None
+    elif geocoder is None:
+        geocoder = geocoder_from_env()
+    try:
+        coords, stats = geocode(queries.values(), cache, geocoder)
+    finally:
+        cache.close()
+
+    missing = 0
+    for key, venue in pending.items():
+        found = coords[queries[key]]
+        if found is None:
+            missing += sum(1 for e in events if e.venue is venue)
+            continue
+        venue.lat, venue.lon = found
+        GEOCODED_VENUES[key] = venue
+    for key, evs in venueless.items():
+        found = coords[queries[key]]
+        if found is None:
+            missing += len(evs)
+            continue
+        venue = venues.setdefault(key, Venue(evs[0].organizer, found[0], found[1], "special"))
+        GEOCODED_VENUES[key] = venue
+        for e in evs:
+            e.venue = venue
+    stats["missing"] = missing
+    print(f"📍 Geocodificación: {len(queries)} direcciones · {stats['cached']} en caché · "
+          f"{stats['geocoded']} consultas ({stats['found']} encontradas, {stats['failed']} fallidas) · "
+          f"{missing} eventos sin ubicación")
+    return stats
+
+
+def validate_events(events: List[Event]) -> int:
+    """Validate events and print a report. Call after parsing to catch issues early.
+
+    Returns the number of issues found (0 means the data is clean).
+    """
     print("\n" + "="*60)
     print("VALIDATION REPORT")
     print("="*60)
@@ -335,6 +441,7 @@ def validate_events(events: List[Event]) -> None:
     else:
         print(f"VALIDATION WARNING - {total_issues} issues found in {len(events)} events")
     print("="*60 + "\n")
+    return total_issues
 
 
 def parse_events() -> List[Event]:
@@ -535,6 +642,44 @@ def calculate_walking_time(distance_km: float, speed_kmh: float = 5.0) -> int:
     return round(distance_km / speed_kmh * 60)
 
 
+def walking_route(lat1: float, lon1: float, lat2: float, lon2: float):
+    """Street-network walking route between two points (see street_routing.py).
+
+    Falls back to the straight line when no street graph file is available.
+    """
+    from street_routing import get_router
+    return get_router().route(lat1, lon1, lat2, lon2)
+
+
+def get_travel_matrix():
+    """Walk/bike/car travel-time matrix over all located venues (see travel_times.py), built once per build.
+
+    The venues are those the events were loaded with: the catalog's with
+    build --db, VENUES otherwise, plus the ones geocoded this run.
+    """
+    from travel_times import get_matrix
+    venues = list((CATALOG_VENUES or VENUES).values()) + list(GEOCODED_VENUES.values())
+    return get_matrix((v.lat, v.lon) for v in venues if v.lat is not None and v.lon is not None)
+
+
+def best_travel(lat1: float, lon1: float, lat2: float, lon2: float, hour: int) -> Tuple[str, int]:
+    """Fastest sensible travel mode between two venues at a departure hour: (mode, minutes)."""
+    return get_travel_matrix().best((lat1, lon1), (lat2, lon2), hour)
+
+
+def analyze_day_feasibility(events: List[Event]):
+    """Conflicts and the maximum attendable set for a day (see schedule_feasibility.py)."""
+    from schedule_feasibility import MIN_VISIT_MINUTES, analyze_day
+
+    matrix = get_travel_matrix()
+
+    def travel(a: Event, b: Event) -> float:
+        departure_hour = (a.date.hour * 60 + a.date.minute + MIN_VISIT_MINUTES) // 60
+        return matrix.best((a.lat, a.lon), (b.lat, b.lon), departure_hour)[1]
+
+    return analyze_day(events, travel, lambda e: matrix.max_minutes_into((e.lat, e.lon)))
+
+
 def format_walking_time(minutes: int) -> str:
     """Format walking time for display."""
     if minutes < 1:
@@ -579,7 +724,7 @@ END:VCALENDAR"""
     return ics
 
 
-def generate_google_calendar_url(event: Event) -> str:
+def generate_google_calendar_url(event: Event, locale: str = DEFAULT_LOCALE) -> str:
     """Generate Google Calendar add event URL."""
     from urllib.parse import quote
 
@@ -595,7 +740,7 @@ def generate_google_calendar_url(event: Event) -> str:
         "action": "TEMPLATE",
         "text": event.title,
         "dates": f"{start.strftime('%Y%m%dT%H%M%S')}/{end.strftime('%Y%m%dT%H%M%S')}",
-        "details": f"{event.description}\\n\\nOrganiza: {event.organizer}",
+        "details": f"{event.description}\\n\\n{STRINGS[locale]['hosted_by']}: {event.organizer}",
         "location": location,
         "sf": "true"
     }
@@ -604,16 +749,49 @@ def generate_google_calendar_url(event: Event) -> str:
     return f"{base_url}?{param_str}"
 
 
-def create_popup_html(event: Event) -> str:
-    """Create popup with venue contact info."""
-    cat_color = CATEGORY_COLORS.get(event.category, "#666")
+# Bump when a fragment's output changes without its render functions' code changing
+FRAGMENT_TEMPLATE_VERSION = 1
+FRAGMENT_FUNCTIONS = ("_contact_html", "_render_popup_html", "_render_tooltip_html",
+                      "generate_google_calendar_url", "generate_ics_data")
+
+_fragments: Optional["FragmentCache"] = None
+
+
+def fragment_version() -> str:
+    """FRAGMENT_TEMPLATE_VERSION plus a hash of the code and strings the fragments are rendered from."""
+    import hashlib
+
+    code = hashlib.sha256(repr((CATEGORY_COLORS, STRINGS)).encode("utf-8"))
+    for name in FRAGMENT_FUNCTIONS:
+        code.update(repr(_code_fingerprint(globals()[name].__code__)).encode("utf-8"))
+    return f"{FRAGMENT_TEMPLATE_VERSION}-{code.hexdigest()[:12]}"
+
+
+def fragment_cache(shared: Optional["FragmentCache"] = None) -> "FragmentCache":
+    """The build's fragment cache (ZONAMACO_FRAGMENT_CACHE overrides the file; "off" keeps it in memory).
+
+    `shared` adopts another module's cache, so watch keeps one across source reloads.
+    """
+    global _fragments
+    from fragment_cache import DEFAULT_FRAGMENT_CACHE, FragmentCache
+
+    if shared is not None:
+        shared.set_version(fragment_version())
+        _fragments = shared
+    elif _fragments is None:
+        path = os.environ.get("ZONAMACO_FRAGMENT_CACHE", DEFAULT_FRAGMENT_CACHE)
+        _fragments = FragmentCache(None if path == "off" else path, fragment_version())
+    return _fragments
+
+
+def _event_fields(event: Event) -> tuple:
+    """Everything an event's popup and tooltip are rendered from."""
     venue = event.venue
-    neighborhood = venue.neighborhood if venue else ""
-    address = venue.address if venue else ""
-    phone = venue.phone if venue else ""
-    email = venue.email if venue else ""
-    website = venue.website if venue else ""
+    venue_fields = tuple(getattr(venue, f) for f in venue.__dataclass_fields__) if venue else None
+    return (event.date, event.organizer, event.title, event.description, event.category, venue_fields)
 
+
+def _contact_html(phone: str, email: str, website: str) -> str:
     contact_html = ""
     if phone:
         contact_html += f'<div style="margin: 3px 0;"><i class="fa fa-phone" style="width: 16px; color: #4a90d9;"></i> <a href="tel:{phone}" style="color: #4a90d9; text-decoration: none;">{phone}</a></div>'
@@ -621,9 +799,30 @@ def create_popup_html(event: Event) -> str:
         contact_html += f'<div style="margin: 3px 0;"><i class="fa fa-envelope" style="width: 16px; color: #4a90d9;"></i> <a href="mailto:{email}" style="color: #4a90d9; text-decoration: none;">{email}</a></div>'
     if website:
         contact_html += f'<div style="margin: 3px 0;"><i class="fa fa-globe" style="width: 16px; color: #4a90d9;"></i> <a href="https://{website}" target="_blank" style="color: #4a90d9; text-decoration: none;">{website}</a></div>'
+    return contact_html
+
+
+def create_popup_html(event: Event, locale: str = DEFAULT_LOCALE) -> str:
+    """Create popup with venue contact info (cached by locale and the event and venue fields)."""
+    return fragment_cache().get("popup", (locale, _event_fields(event)), lambda: _render_popup_html(event, locale))
+
+
+def _render_popup_html(event: Event, locale: str = DEFAULT_LOCALE) -> str:
+    text = STRINGS[locale]
+    cat_color = CATEGORY_COLORS.get(event.category, "#666")
+    venue = event.venue
+    neighborhood = venue.neighborhood if venue else ""
+    address = venue.address if venue else ""
+    phone = venue.phone if venue else ""
+    email = venue.email if venue else ""
+    website = venue.website if venue else ""
+
+    # Identical for every event at the venue, in every locale
+    contact_html = fragment_cache().get("contact", (phone, email, website),
+                                        lambda: _contact_html(phone, email, website))
 
     # Generate calendar links
-    google_cal_url = generate_google_calendar_url(event)
+    google_cal_url = generate_google_calendar_url(event, locale)
     ics_data = generate_ics_data(event)
     # Encode ICS for data URI
     import base64
@@ -649,15 +848,15 @@ def create_popup_html(event: Event) -> str:
         </div>
         <div style="display: flex; gap: 15px; margin-bottom: 10px; font-size: 12px;">
             <div style="background: #f0f4f8; padding: 6px 10px; border-radius: 4px;"><strong>⏰</strong> {event.date.strftime('%H:%M')}</div>
-            <div style="background: {cat_color}15; color: {cat_color}; padding: 6px 10px; border-radius: 4px; font-weight: 600;">{event.category}</div>
+            <div style="background: {cat_color}15; color: {cat_color}; padding: 6px 10px; border-radius: 4px; font-weight: 600;">{text['categories'].get(event.category, event.category)}</div>
         </div>
         <div style="font-size: 12px; color: #666; margin-bottom: 10px;">
             <div><strong>📍</strong> {neighborhood}</div>
             {'<div style="margin-left: 18px; color: #888;">' + address + '</div>' if address else ''}
         </div>
         <div style="background: #f8fafc; border-radius: 8px; padding: 10px; margin-bottom: 10px; font-size: 11px;">
-            <div style="font-weight: 600; color: #1e3a5f; margin-bottom: 6px;">📞 Contacto</div>
-            {contact_html if contact_html else '<div style="color: #94a3b8;">Sin información de contacto</div>'}
+            <div style="font-weight: 600; color: #1e3a5f; margin-bottom: 6px;">📞 {text['contact']}</div>
+            {contact_html if contact_html else f'<div style="color: #94a3b8;">{text["no_contact"]}</div>'}
         </div>
         <div style="font-size: 12px; color: #444; line-height: 1.5;">
             {event.description[:200] + '...' if len(event.description) > 200 else event.description}
@@ -668,7 +867,11 @@ def create_popup_html(event: Event) -> str:
 
 
 def create_tooltip_html(event: Event) -> str:
-    """Create rich tooltip with venue info."""
+    """Create rich tooltip with venue info (cached like the popup; it has no text to translate)."""
+    return fragment_cache().get("tooltip", _event_fields(event), lambda: _render_tooltip_html(event))
+
+
+def _render_tooltip_html(event: Event) -> str:
     venue = event.venue
     phone = venue.phone if venue else ""
 
@@ -681,52 +884,70 @@ def create_tooltip_html(event: Event) -> str:
     """
 
 
-def create_timeline_html(events: List[Event], day_date: datetime) -> str:
-    day_name = SPANISH_DAYS[day_date.weekday()]
-    morning = sorted([e for e in events if e.time_period == "morning"], key=lambda x: x.date)
-    afternoon = sorted([e for e in events if e.time_period == "afternoon"], key=lambda x: x.date)
-    evening = sorted([e for e in events if e.time_period == "evening"], key=lambda x: x.date)
+def group_events(events: List[Event], by_time: bool = False) -> List[List[Event]]:
+    """Group mapped events sharing a venue coordinate (and start time if by_time).
 
-    # JavaScript helper to find Leaflet map (Folium uses map_<uuid> not 'map')
-    find_map_js = """(function(){var m=Object.values(window).find(function(v){return v&&v._leaflet_id&&v.setView});if(m){m.setView([%s,%s],16)}})()"""
+    Groups come in order of their first event; events inside a group are chronological.
+    """
+    groups: Dict[tuple, List[Event]] = {}
+    for event in sorted(events, key=lambda e: e.date):
+        key = (event.lat, event.lon, event.date) if by_time else (event.lat, event.lon)
+        groups.setdefault(key, []).append(event)
+    return list(groups.values())
 
-    def event_item(e: Event) -> str:
-        cat_color = CATEGORY_COLORS.get(e.category, "#666")
-        onclick_js = find_map_js % (e.lat, e.lon) if e.lat and e.lon else ""
-        # Add data attributes for filtering
-        search_text = f"{e.organizer} {e.title} {e.description}".lower().replace('"', '&quot;')
-        return f"""<div class="event-item" data-search="{search_text}" data-category="{e.category}" style="padding: 8px 10px; margin: 4px 0; background: white; border-radius: 6px; border-left: 3px solid {cat_color}; font-size: 11px; cursor: pointer; box-shadow: 0 1px 3px rgba(0,0,0,0.08); transition: opacity 0.2s;" onclick="{onclick_js}"><div style="font-weight: 600; color: #1e3a5f;">{e.date.strftime('%H:%M')}</div><div style="color: #666; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;">{e.organizer}</div></div>"""
 
-    def walking_indicator(prev_event: Event, next_event: Event) -> str:
-        """Create a walking time indicator between two events."""
-        if not (prev_event.lat and prev_event.lon and next_event.lat and next_event.lon):
-            return ""
-        distance = haversine_distance(prev_event.lat, prev_event.lon, next_event.lat, next_event.lon)
-        walk_minutes = calculate_walking_time(distance)
-        walk_text = format_walking_time(walk_minutes)
-        distance_text = f"{distance:.1f} km" if distance >= 1 else f"{int(distance * 1000)} m"
-        return f"""<div class="walk-indicator" style="display: flex; align-items: center; justify-content: center; padding: 4px 0; margin: 2px 0; font-size: 9px; color: #94a3b8;"><span style="background: #f0f4f8; padding: 2px 8px; border-radius: 10px;">🚶 {walk_text} · {distance_text}</span></div>"""
+def _group_time_format(events: List[Event]) -> str:
+    """Show the date too when a group spans several days (fair maps)."""
+    return '%H:%M' if len({e.date.date() for e in events}) == 1 else '%d/%m %H:%M'
+
+
+def create_group_popup_html(events: List[Event], locale: str = DEFAULT_LOCALE) -> str:
+    """One popup for several events at the same venue: a list whose rows expand to the full event popup."""
+    venue = events[0].venue
+    venue_name = venue.name if venue else events[0].organizer
+    neighborhood = venue.neighborhood if venue else ""
+    time_format = _group_time_format(events)
+    rows = "".join(
+        f"""<details style="border-top: 1px solid #e8ecf0; padding: 6px 0;"><summary style="cursor: pointer; font-size: 12px; color: #1e3a5f; list-style-position: outside;"><span style="color: {CATEGORY_COLORS.get(e.category, '#666')};">●</span> <strong>{e.date.strftime(time_format)}</strong> {e.title}</summary>{create_popup_html(e, locale)}</details>"""
+        for e in events
+    )
+    return f"""<div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; width: 350px; padding: 5px;"><div style="margin-bottom: 8px;"><div style="font-size: 15px; font-weight: 700; color: #1e3a5f;">{venue_name}</div><div style="font-size: 11px; color: #64748b;">{STRINGS[locale]['events'].format(count=len(events))}{' · ' + neighborhood if neighborhood else ''}</div></div>{rows}</div>"""
 
-    def period_section(title: str, events_list: List[Event], color: str, period_id: str) -> str:
-        if not events_list:
-            return ""
-        # Build items with walking indicators between them
-        items_html = ""
-        for i, e in enumerate(events_list):
-            items_html += event_item(e)
-            # Add walking indicator after each event (except the last)
-            if i < len(events_list) - 1:
-                items_html += walking_indicator(e, events_list[i + 1])
-        return f"""<div class="period-section" id="{period_id}" style="margin-bottom: 15px;"><div class="period-header" style="font-size: 11px; font-weight: 700; color: {color}; margin-bottom: 6px; padding: 4px 8px; background: {color}15; border-radius: 4px;">{title} (<span class="period-count">{len(events_list)}</span>)</div>{items_html}</div>"""
 
-    # Search box HTML
-    search_box = """<div style="margin-bottom: 12px;"><input type="text" id="sidebarSearch" placeholder="Buscar..." style="width: 100%; padding: 8px 10px; border: 1px solid #e2e8f0; border-radius: 6px; font-size: 12px; background: white;"></div>"""
+def create_group_tooltip_html(events: List[Event], locale: str = DEFAULT_LOCALE) -> str:
+    venue = events[0].venue
+    time_format = _group_time_format(events)
+    times = ", ".join(dict.fromkeys(e.date.strftime(time_format) for e in events))
+    return f"""<div style="font-family: -apple-system, sans-serif; padding: 8px; min-width: 200px;"><div style="font-weight: 700; color: #1e3a5f; font-size: 13px;">{venue.name if venue else events[0].organizer}</div><div style="color: #666; font-size: 11px; margin-top: 4px;">{STRINGS[locale]['events'].format(count=len(events))} · {times}</div></div>"""
 
-    # Filter buttons
-    filter_buttons = """<div style="display: flex; gap: 4px; margin-bottom: 12px;"><button class="filter-btn active" data-filter="all" style="flex: 1; padding: 6px; border: 1px solid #e2e8f0; border-radius: 4px; font-size: 10px; cursor: pointer; background: #4a90d9; color: white;">Todos</button><button class="filter-btn" data-filter="Público" style="flex: 1; padding: 6px; border: 1px solid #e2e8f0; border-radius: 4px; font-size: 10px; cursor: pointer; background: white;">🔵 Púb</button><button class="filter-btn" data-filter="Privado" style="flex: 1; padding: 6px; border: 1px solid #e2e8f0; border-radius: 4px; font-size: 10px; cursor: pointer; background: white;">🟠 Priv</button></div>"""
 
-    # Dark mode styles for sidebar
-    dark_mode_styles = """<style>
+def event_marker(events: List[Event], color: str, icon: str, prefix: str = "fa", layer: Optional[int] = None,
+                 ids: Optional[Dict[int, str]] = None) -> "MapMarker":
+    """One marker for a group of co-located events; ids maps id(event) to its event id (change_log.event_ids)."""
+    from leaflet_pages import MapMarker
+
+    return MapMarker(events[0].lat, events[0].lon, events, color, icon, prefix, layer,
+                     ids=[ids[id(e)] for e in events] if ids else [])
+
+
+def marker_popup_html(marker: "MapMarker", locale: str = DEFAULT_LOCALE) -> str:
+    """The usual event popup, or the venue list when the marker has several events."""
+    if len(marker.events) == 1:
+        return create_popup_html(marker.events[0], locale)
+    return create_group_popup_html(marker.events, locale)
+
+
+def marker_tooltip_html(marker: "MapMarker", locale: str = DEFAULT_LOCALE) -> str:
+    if len(marker.events) > 1:
+        return create_group_tooltip_html(marker.events, locale)
+    event = marker.events[0]
+    if marker.short_tooltip:
+        return f"<b>{event.date.strftime('%d/%m %H:%M')}</b><br>{event.title}"
+    return create_tooltip_html(event)
+
+
+# Day sidebar: static parts and the layout around the per-period event lists
+SIDEBAR_STYLES = """<style>
     .sidebar-dark { background: #1a1a2e !important; border-color: #2d2d44 !important; }
     .sidebar-dark .sidebar-header { border-color: #2d2d44 !important; }
     .sidebar-dark .sidebar-title { color: #a8c5e8 !important; }
@@ -743,12 +964,14 @@ def create_timeline_html(events: List[Event], day_date: datetime) -> str:
     .sidebar-dark .theme-toggle-mini { background: #2d2d44; border-color: #3d3d54; }
     </style>"""
 
-    # JavaScript for filtering and dark mode
-    filter_script = """<script>
+SIDEBAR_SEARCH_BOX = """<div style="margin-bottom: 12px;"><input type="text" id="sidebarSearch" placeholder="{search}" style="width: 100%; padding: 8px 10px; border: 1px solid #e2e8f0; border-radius: 6px; font-size: 12px; background: white;"></div>"""
+
+SIDEBAR_FILTER_BUTTONS = """<div style="display: flex; gap: 4px; margin-bottom: 12px;"><button class="filter-btn active" data-filter="all" style="flex: 1; padding: 6px; border: 1px solid #e2e8f0; border-radius: 4px; font-size: 10px; cursor: pointer; background: #4a90d9; color: white;">{all}</button><button class="filter-btn" data-filter="Público" style="flex: 1; padding: 6px; border: 1px solid #e2e8f0; border-radius: 4px; font-size: 10px; cursor: pointer; background: white;">🔵 {public}</button><button class="filter-btn" data-filter="Privado" style="flex: 1; padding: 6px; border: 1px solid #e2e8f0; border-radius: 4px; font-size: 10px; cursor: pointer; background: white;">🟠 {private}</button></div>"""
+
+SIDEBAR_SCRIPT = """<script>
     document.addEventListener('DOMContentLoaded', function() {
         const searchInput = document.getElementById('sidebarSearch');
         const filterBtns = document.querySelectorAll('.filter-btn');
-        const eventItems = document.querySelectorAll('.event-item');
         const sidebar = document.getElementById('eventSidebar');
         const themeBtn = document.getElementById('sidebarThemeToggle');
         let activeFilter = 'all';
@@ -771,8 +994,9 @@ def create_timeline_html(events: List[Event], day_date: datetime) -> str:
         function applyFilters() {
             const searchTerm = searchInput.value.toLowerCase();
             let visibleCount = { morning: 0, afternoon: 0, evening: 0 };
+            const visibleEvents = {};
 
-            eventItems.forEach(item => {
+            sidebar.querySelectorAll('.event-item').forEach(item => {
                 const searchText = item.dataset.search;
                 const category = item.dataset.category;
                 const matchesSearch = !searchTerm || searchText.includes(searchTerm);
@@ -782,6 +1006,7 @@ def create_timeline_html(events: List[Event], day_date: datetime) -> str:
                 item.style.opacity = show ? '1' : '0.3';
 
                 if (show) {
+                    visibleEvents[item.dataset.event] = true;
                     const section = item.closest('.period-section');
                     if (section) {
                         if (section.id === 'morning') visibleCount.morning++;
@@ -791,6 +1016,9 @@ def create_timeline_html(events: List[Event], day_date: datetime) -> str:
                 }
             });
 
+            // Same filter on the map: markers with no visible event are hidden
+            if (window.zmMarkers) zmMarkers.filter(visibleEvents);
+
             // Update period counts
             document.querySelectorAll('.period-section').forEach(section => {
                 const count = section.querySelectorAll('.event-item[style*="display: block"], .event-item:not([style*="display"])').length;
@@ -828,56 +1056,436 @@ def create_timeline_html(events: List[Event], day_date: datetime) -> str:
                 applyFilters();
             }
         });
+
+        // Click: pan to the event's marker and open its popup (MARKER_INDEX_JS)
+        sidebar.addEventListener('click', e => {
+            const item = e.target.closest('.event-item');
+            if (item && window.zmMarkers) zmMarkers.focus(item.dataset.event);
+        });
+
+        // Live schedule changes (change_log.py): rows of this page are updated, added or removed in place.
+        // Patched rows lose their plan/conflict badges and travel indicators until the next build.
+        const categoryColors = """ + json.dumps(CATEGORY_COLORS, ensure_ascii=False) + """;
+
+        function detach(item) {
+            [item.previousElementSibling, item.nextElementSibling].forEach(sibling => {
+                if (sibling && sibling.classList.contains('walk-indicator')) sibling.remove();
+            });
+            item.remove();
+        }
+
+        function place(item, record) {
+            const section = document.getElementById(record.time_period);
+            const next = Array.from(section.querySelectorAll('.event-item')).find(other => other.dataset.start > record.date);
+            section.insertBefore(item, next || null);
+        }
+
+        function applyChanges(changes) {
+            changes.forEach(([op, id, record]) => {
+                let item = sidebar.querySelector('.event-item[data-event="' + id + '"]');
+                if (item) detach(item);
+                if (op === 'removed' || record.page !== sidebar.dataset.page || record.lat === null) return;
+                if (!item) {
+                    item = document.createElement('div');
+                    item.className = 'event-item';
+                    item.dataset.event = id;
+                    item.style.cssText = 'padding: 8px 10px; margin: 4px 0; background: white; border-radius: 6px; border-left: 3px solid #666; font-size: 11px; cursor: pointer; box-shadow: 0 1px 3px rgba(0,0,0,0.08); transition: opacity 0.2s;';
+                    item.innerHTML = '<div style="font-weight: 600; color: #1e3a5f;"></div><div style="color: #666; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;"></div>';
+                }
+                item.dataset.start = record.date;
+                item.dataset.search = (record.organizer + ' ' + record.title + ' ' + record.description).toLowerCase();
+                item.dataset.category = record.category;
+                item.style.borderLeftColor = categoryColors[record.category] || '#666';
+                item.children[0].textContent = record.time;
+                item.children[1].textContent = record.organizer;
+                place(item, record);
+            });
+            document.querySelectorAll('.period-section').forEach(section => {
+                section.style.display = section.querySelector('.event-item') ? '' : 'none';
+            });
+            sidebar.querySelector('.sidebar-count').textContent = zmText.events.replace('{count}', sidebar.querySelectorAll('.event-item').length);
+            applyFilters();
+        }
+
+        if (sidebar.dataset.changeLog) zmChangeFeed(sidebar.dataset.changeLog, +sidebar.dataset.changeVersion, applyChanges);
+
+        if (window.zmRum) zmRum.mark('sidebar_rendered');
     });
     </script>"""
 
-    return f"""{dark_mode_styles}<div id="eventSidebar" style="position: fixed; top: 10px; right: 10px; width: 220px; max-height: 90vh; background: #f8fafc; border-radius: 12px; padding: 15px; z-index: 1000; box-shadow: 0 4px 20px rgba(0,0,0,0.1); overflow-y: auto; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; border: 1px solid #e2e8f0;"><button id="sidebarThemeToggle" class="theme-toggle-mini">🌙</button><div class="sidebar-header" style="text-align: center; margin-bottom: 12px; padding-bottom: 10px; border-bottom: 2px solid #e2e8f0;"><div class="sidebar-title" style="font-size: 18px; font-weight: 700; color: #1e3a5f;">{day_name}</div><div class="sidebar-subtitle" style="font-size: 12px; color: #64748b;">{day_date.day} de {SPANISH_MONTHS[day_date.month]}</div><div class="sidebar-count" style="font-size: 11px; color: #94a3b8; margin-top: 4px;">{len(events)} eventos</div></div>{search_box}{filter_buttons}{period_section("☀️ Mañana", morning, "#f39c12", "morning")}{period_section("🌤️ Tarde", afternoon, "#e67e22", "afternoon")}{period_section("🌙 Noche", evening, "#1e3a5f", "evening")}</div>{filter_script}"""
+# Subscribes a page to the change feed: SSE from /api/changes/stream, or polling /api/changes without
+# EventSource or when the stream is refused. apply(changes) gets [op, event id, record or null] entries. Pages without the API
+# (docs/ on GitHub Pages, file://) get a 404 and simply stay as rendered.
+CHANGE_FEED_SCRIPT = """<script>
+    window.zmChangeFeed = function(log, version, apply) {
+        function handle(delta) {
+            if (delta.reset) return false;  // another log, or further behind than the feed goes: keep the page as is
+            if (delta.changes.length) apply(delta.changes);
+            version = delta.version;
+            return true;
+        }
+        if (window.EventSource) {
+            const source = new EventSource('/api/changes/stream?log=' + encodeURIComponent(log) + '&since=' + version);
+            source.addEventListener('changes', message => {
+                if (!handle(JSON.parse(message.data))) source.close();
+            });
+            // Refused (503 while the server has all its streams open) or no API: poll instead
+            source.addEventListener('error', () => { if (source.readyState === EventSource.CLOSED) poll(); });
+            return;
+        }
+        poll();
+
+        function poll() {
+            fetch('/api/changes?log=' + encodeURIComponent(log) + '&since=' + version)
+                .then(response => { if (!response.ok) throw new Error(response.status); return response.json(); })
+                .then(delta => { if (handle(delta)) setTimeout(poll, 60000); })
+                .catch(() => {});
+        }
+    };
+    </script>"""
+
+SIDEBAR_TEMPLATE = CompiledTemplate("""{styles}<div id="eventSidebar"{feed_attrs} style="position: fixed; top: 10px; right: 10px; width: 220px; max-height: 90vh; background: #f8fafc; border-radius: 12px; padding: 15px; z-index: 1000; box-shadow: 0 4px 20px rgba(0,0,0,0.1); overflow-y: auto; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; border: 1px solid #e2e8f0;"><button id="sidebarThemeToggle" class="theme-toggle-mini">🌙</button><div class="sidebar-header" style="text-align: center; margin-bottom: 12px; padding-bottom: 10px; border-bottom: 2px solid #e2e8f0;"><div class="sidebar-title" style="font-size: 18px; font-weight: 700; color: #1e3a5f;">{day_name}</div><div class="sidebar-subtitle" style="font-size: 12px; color: #64748b;">{date_str}</div><div class="sidebar-count" style="font-size: 11px; color: #94a3b8; margin-top: 4px;">{event_count}</div><div class="sidebar-plan" style="font-size: 10px; color: #27ae60; margin-top: 2px;">🧭 {plan_count}</div></div>{search_box}{filter_buttons}{morning}{afternoon}{evening}</div>{script}""")
 
 
-def add_arrow_markers(m: folium.Map, coords: List[List[float]], color: str = "#4a90d9", show_walking_time: bool = True):
-    """Add arrow markers along the route to show direction and walking time."""
-    import math
+def stream_timeline_html(events: List[Event], day_date: datetime, feed: Optional[dict] = None,
+                         locale: str = DEFAULT_LOCALE, feasibility=None) -> Iterator[str]:
+    """The day sidebar, yielded section by section and event by event.
+
+    feed ({log, version} of the change log) makes the sidebar patch itself from /api/changes.
+    feasibility: analyze_day_feasibility(events), when the caller already has it (other locales).
+    """
+    from change_log import event_ids
+    from travel_times import TRAVEL_MODES
+
+    text = STRINGS[locale]
+    morning = sorted([e for e in events if e.time_period == "morning"], key=lambda x: x.date)
+    afternoon = sorted([e for e in events if e.time_period == "afternoon"], key=lambda x: x.date)
+    evening = sorted([e for e in events if e.time_period == "evening"], key=lambda x: x.date)
 
+    # Items point at their marker through the map's marker index (MARKER_INDEX_JS) and
+    # are patched by the change feed, both by event id
+    ids = event_ids(events)
+
+    # Which events fit in one person's day, and which can't be reached in time
+    if feasibility is None:
+        feasibility = analyze_day_feasibility(events)
+
+    def feasibility_badges(e: Event) -> str:
+        badges = ""
+        if feasibility.in_plan(e):
+            badges += f"""<span class="plan-badge" title="{text['plan_title']}" style="margin-left: 6px; padding: 1px 5px; border-radius: 8px; font-size: 9px; font-weight: 600; background: #e8f8ef; color: #27ae60;">✓ {text['plan']}</span>"""
+        conflict = feasibility.conflicts.get(id(e))
+        if conflict:
+            tip = text["conflict_title"].format(late=conflict.late_by_minutes, previous=conflict.previous.organizer,
+                                                travel=conflict.travel_minutes).replace('"', '&quot;')
+            badges += f"""<span class="conflict-badge" title="{tip}" style="margin-left: 6px; padding: 1px 5px; border-radius: 8px; font-size: 9px; font-weight: 600; background: #fdecea; color: #e74c3c;">⚠️ {text['conflict']}</span>"""
+        return badges
+
+    def event_item(e: Event) -> str:
+        cat_color = CATEGORY_COLORS.get(e.category, "#666")
+        # Add data attributes for filtering
+        search_text = f"{e.organizer} {e.title} {e.description}".lower().replace('"', '&quot;')
+        return f"""<div class="event-item" data-event="{ids[id(e)]}" data-start="{e.date.isoformat()}" data-search="{search_text}" data-category="{e.category}" style="padding: 8px 10px; margin: 4px 0; background: white; border-radius: 6px; border-left: 3px solid {cat_color}; font-size: 11px; cursor: pointer; box-shadow: 0 1px 3px rgba(0,0,0,0.08); transition: opacity 0.2s;"><div style="font-weight: 600; color: #1e3a5f;">{e.date.strftime('%H:%M')}{feasibility_badges(e)}</div><div style="color: #666; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;">{e.organizer}</div></div>"""
+
+    def travel_indicator(prev_event: Event, next_event: Event) -> str:
+        """Create a travel time indicator (fastest sensible mode) between two events."""
+        if not (prev_event.lat and prev_event.lon and next_event.lat and next_event.lon):
+            return ""
+        a, b = (prev_event.lat, prev_event.lon), (next_event.lat, next_event.lon)
+        matrix = get_travel_matrix()
+        mode, minutes = matrix.best(a, b, prev_event.date.hour)
+        distance = matrix.distance(a, b)
+        travel_text = format_walking_time(minutes)
+        distance_text = f"{distance:.1f} km" if distance >= 1 else f"{int(distance * 1000)} m"
+        return f"""<div class="walk-indicator" style="display: flex; align-items: center; justify-content: center; padding: 4px 0; margin: 2px 0; font-size: 9px; color: #94a3b8;"><span style="background: #f0f4f8; padding: 2px 8px; border-radius: 10px;">{TRAVEL_MODES[mode]["icon"]} {travel_text} · {distance_text}</span></div>"""
+
+    def period_section(title: str, events_list: List[Event], color: str, period_id: str) -> Iterator[str]:
+        if not events_list and not feed:
+            return
+        hidden = "" if events_list else " display: none;"  # kept for events the change feed adds
+        yield f"""<div class="period-section" id="{period_id}" style="margin-bottom: 15px;{hidden}"><div class="period-header" style="font-size: 11px; font-weight: 700; color: {color}; margin-bottom: 6px; padding: 4px 8px; background: {color}15; border-radius: 4px;">{title} (<span class="period-count">{len(events_list)}</span>)</div>"""
+        # Items with travel indicators between them
+        for i, e in enumerate(events_list):
+            yield event_item(e)
+            if i < len(events_list) - 1:
+                yield travel_indicator(e, events_list[i + 1])
+        yield "</div>"
+
+    return SIDEBAR_TEMPLATE.stream(
+        styles=SIDEBAR_STYLES,
+        day_name=day_name(day_date, locale),
+        date_str=format_date(day_date, locale),
+        event_count=text["events"].format(count=len(events)),
+        plan_count=text["plan_count"].format(count=len(feasibility.plan)),
+        search_box=SIDEBAR_SEARCH_BOX.format(search=text["search"]),
+        filter_buttons=SIDEBAR_FILTER_BUTTONS.format(all=text["all"], public=text["category_short"]["Público"].capitalize(),
+                                                     private=text["category_short"]["Privado"].capitalize()),
+        morning=period_section(f"☀️ {text['periods']['morning']}", morning, "#f39c12", "morning"),
+        afternoon=period_section(f"🌤️ {text['periods']['afternoon']}", afternoon, "#e67e22", "afternoon"),
+        evening=period_section(f"🌙 {text['periods']['evening']}", evening, "#1e3a5f", "evening"),
+        feed_attrs=(f' data-page="{day_filename(day_date)}" data-change-log="{feed["log"]}"'
+                    f' data-change-version="{feed["version"]}"' if feed else ""),
+        script=CHANGE_FEED_SCRIPT + SIDEBAR_SCRIPT,
+    )
+
+
+def create_rum_script(page: str) -> str:
+    """Real-user timing beacon for a generated page.
+
+    Collects navigation timings plus the marks the page sets itself (map_ready,
+    markers_rendered, sidebar_rendered, cards_rendered) and sends them as one
+    batch via navigator.sendBeacon when the page is hidden. Batches that can't
+    be sent are kept in localStorage and retried on the next page view.
+    Must be placed in the body so it runs after leaflet.js and before folium's
+    map script.
+    """
+    return """<script>
+(function(){
+    var page = %s, endpoint = %s, marks = {}, sent = false;
+    function mark(name) { if (!(name in marks)) marks[name] = Math.round(performance.now()); }
+    function deviceClass() {
+        var cls = window.matchMedia('(max-width: 768px)').matches ? 'mobile' : 'desktop';
+        if ((navigator.deviceMemory || 8) <= 2 || (navigator.hardwareConcurrency || 8) <= 2) cls += '-low';
+        return cls;
+    }
+    window.zmRum = { mark: mark };
+    if (window.L && L.Map) L.Map.addInitHook(function() { this.whenReady(function() { mark('map_ready'); }); });
+    document.addEventListener('DOMContentLoaded', function() {
+        requestAnimationFrame(function() { if (document.querySelector('.leaflet-marker-icon')) mark('markers_rendered'); });
+    });
+    function flush() {
+        if (sent || !navigator.sendBeacon) return;
+        sent = true;
+        var nav = performance.getEntriesByType('navigation')[0], metrics = {};
+        if (nav) {
+            metrics.ttfb = Math.round(nav.responseStart);
+            metrics.dom_interactive = Math.round(nav.domInteractive);
+            metrics.dom_content_loaded = Math.round(nav.domContentLoadedEventEnd);
+            if (nav.loadEventEnd) metrics.load = Math.round(nav.loadEventEnd);
+        }
+        for (var k in marks) metrics[k] = marks[k];
+        var batch = [];
+        try { batch = JSON.parse(localStorage.getItem('zmRumQueue') || '[]'); } catch (e) {}
+        batch.push({ page: page, device: deviceClass(), metrics: metrics });
+        batch = batch.slice(-20);
+        var ok = navigator.sendBeacon(endpoint, new Blob([JSON.stringify(batch)], { type: 'text/plain' }));
+        try { ok ? localStorage.removeItem('zmRumQueue') : localStorage.setItem('zmRumQueue', JSON.stringify(batch)); } catch (e) {}
+    }
+    document.addEventListener('visibilitychange', function() { if (document.visibilityState === 'hidden') flush(); });
+    window.addEventListener('pagehide', flush);
+})();
+</script>""" % (json.dumps(page), json.dumps(RUM_ENDPOINT))
+
+
+# folium macros calling the leaflet_pages runtime functions, passed in as this.js when the element is added.
+# One script for all route arrows: the legs are data, the icon markup is built in JS (ROUTE_ARROWS_JS).
+# leg = [lat, lon, rotation_deg, label or ""]
+ROUTE_ARROWS_TEMPLATE = """
+{% macro script(this, kwargs) %}
+({{ this.js }})({{ this._parent.get_name() }}, {{ this.color|tojson }}, {{ this.legs|tojson }});
+{% endmacro %}
+"""
+
+MARKER_INDEX_TEMPLATE = """
+{% macro script(this, kwargs) %}
+({{ this.js }})({{ this._parent.get_name() }}, [{% for marker, target, ids in this.entries %}[{{ marker.get_name() }}, {{ target.get_name() }}, {{ ids|tojson }}]{{ ", " if not loop.last }}{% endfor %}]);
+{% endmacro %}
+"""
+
+# Popups fetched from the page's popups file on first use (LAZY_POPUPS_JS); entries are (marker, max width)
+LAZY_POPUPS_TEMPLATE = """
+{% macro script(this, kwargs) %}
+({{ this.js }})({{ this.url|tojson }}, [{% for marker, max_width in this.entries %}[{{ marker.get_name() }}, {{ max_width }}]{{ ", " if not loop.last }}{% endfor %}], {{ this.failed|tojson }});
+{% endmacro %}
+"""
+
+ROUTE_STYLE = {"color": "#4a90d9", "weight": 4, "opacity": 0.8, "dashArray": [10, 20], "delay": 800, "pulseColor": "#fff"}
+FONT_AWESOME_CSS = '<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css"/>'
+MAP_BACKENDS = ("folium", "leaflet")
+
+
+def route_arrow_legs(coords: List[List[float]], show_walking_time: bool = True,
+                     hours: Optional[List[int]] = None) -> List[list]:
+    """Direction arrows and travel times along the route, as [lat, lon, angle, label] legs.
+
+    Each arrow sits halfway along the walking route between consecutive stops,
+    pointing along the street at that spot. The label shows the fastest
+    sensible mode, using `hours[i]` as the departure hour of leg i. Each leg
+    costs a few dozen bytes of data instead of a marker with its own icon markup.
+    """
+    from travel_times import TRAVEL_MODES
+
+    legs = []
     for i in range(len(coords) - 1):
         lat1, lon1 = coords[i]
         lat2, lon2 = coords[i + 1]
 
-        # Calculate midpoint
-        mid_lat = (lat1 + lat2) / 2
-        mid_lon = (lon1 + lon2) / 2
+        route = walking_route(lat1, lon1, lat2, lon2)
+        mid_lat, mid_lon, angle = route.midpoint()
+
+        label = ""
+        if show_walking_time:
+            hour = hours[i] if hours else 12
+            mode, travel_minutes = best_travel(lat1, lon1, lat2, lon2, hour)
+            label = f"{TRAVEL_MODES[mode]['icon']} {format_walking_time(travel_minutes)}"
+        legs.append([round(mid_lat, 6), round(mid_lon, 6), round(90 - angle, 1), label])
+    return legs
+
+
+def add_route_arrows(m: "folium.Map", color: str, legs: List[list]) -> None:
+    """Add the route arrows to a folium map or feature group as one data-driven layer."""
+    from branca.element import MacroElement
+    from jinja2 import Template
+    from leaflet_pages import ROUTE_ARROWS_JS
+
+    layer = MacroElement()
+    layer._name = "RouteArrows"
+    layer._template = Template(ROUTE_ARROWS_TEMPLATE)
+    layer.js = ROUTE_ARROWS_JS
+    layer.color = color
+    layer.legs = legs
+    layer.add_to(m)
+
+
+def add_marker_index(m: "folium.Map", entries: List[tuple]) -> None:
+    """Register the map and its (marker, parent, event ids) entries for the sidebar (MARKER_INDEX_JS)."""
+    from branca.element import MacroElement
+    from jinja2 import Template
+    from leaflet_pages import MARKER_INDEX_JS
+
+    index = MacroElement()
+    index._name = "MarkerIndex"
+    index._template = Template(MARKER_INDEX_TEMPLATE)
+    index.js = MARKER_INDEX_JS
+    index.entries = entries
+    index.add_to(m)
+
+
+def add_lazy_popups(m: "folium.Map", url: str, entries: List[tuple], failed: str) -> None:
+    """Bind the (marker, max width) entries to the popups at url (write_popups), in order."""
+    from branca.element import MacroElement
+    from jinja2 import Template
+    from leaflet_pages import LAZY_POPUPS_JS
+
+    popups = MacroElement()
+    popups._name = "LazyPopups"
+    popups._template = Template(LAZY_POPUPS_TEMPLATE)
+    popups.js = LAZY_POPUPS_JS
+    popups.url = url
+    popups.entries = entries
+    popups.failed = failed
+    popups.add_to(m)
+
+
+def save_map(m: "folium.Map", output_path: str, slots: Optional[Dict[str, Iterator[str]]] = None) -> None:
+    """Write a folium map like m.save(), streaming each slot's chunks in place of its placeholder element."""
+    chunks = [m.get_root().render()]
+    for placeholder, stream in (slots or {}).items():
+        head, tail = chunks.pop().split(placeholder, 1)
+        chunks += [head, stream, tail]
+    write_chunks(output_path, (chunk for part in chunks
+                               for chunk in ((part,) if isinstance(part, str) else part)))
+
+
+def add_tile_layer(m: "folium.Map", layer: str, name: Optional[str] = None) -> None:
+    """Add a base layer, served through the tile proxy when ZONAMACO_TILE_PROXY_URL is set."""
+    import folium
+    from tile_cache import TILE_LAYERS, proxied_tile_url
 
-        # Calculate angle
-        angle = math.degrees(math.atan2(lon2 - lon1, lat2 - lat1))
+    info = TILE_LAYERS[layer]
+    url = proxied_tile_url(layer)
+    if url:
+        folium.TileLayer(tiles=url, attr=info['attr'], name=name or info['folium'], max_zoom=19).add_to(m)
+    else:
+        folium.TileLayer(info['folium'], name=name).add_to(m)
 
-        # Calculate walking time
-        distance = haversine_distance(lat1, lon1, lat2, lon2)
-        walk_minutes = calculate_walking_time(distance)
-        walk_text = format_walking_time(walk_minutes)
 
-        # Create arrow marker with walking time at midpoint
-        if show_walking_time:
-            arrow_icon = DivIcon(
-                icon_size=(60, 40),
-                icon_anchor=(30, 20),
-                html=f'''<div style="text-align: center;">
-                    <div style="font-size: 14px; color: {color}; transform: rotate({90 - angle}deg); text-shadow: 1px 1px 2px white, -1px -1px 2px white; font-weight: bold;">➤</div>
-                    <div style="font-size: 9px; background: white; color: #666; padding: 1px 4px; border-radius: 8px; box-shadow: 0 1px 3px rgba(0,0,0,0.2); white-space: nowrap; margin-top: 2px;">🚶 {walk_text}</div>
-                </div>'''
-            )
-        else:
-            arrow_icon = DivIcon(
-                icon_size=(20, 20),
-                icon_anchor=(10, 10),
-                html=f'''<div style="font-size: 16px; color: {color}; transform: rotate({90 - angle}deg); text-shadow: 1px 1px 2px white, -1px -1px 2px white; font-weight: bold;">➤</div>'''
-            )
+def folium_map(spec: "MapSpec", popups: str, locale: str = DEFAULT_LOCALE) -> "folium.Map":
+    """The folium object tree for a map spec, with tooltips in `locale` and popups fetched from `popups` (write_popups)."""
+    import folium
+    from folium.plugins import AntPath
 
-        folium.Marker(
-            location=[mid_lat, mid_lon],
-            icon=arrow_icon,
-        ).add_to(m)
+    m = folium.Map(location=spec.center, zoom_start=spec.zoom, tiles=None, control_scale=spec.scale)
+    for layer, name in spec.tiles:
+        add_tile_layer(m, layer, name)
+    groups = [folium.FeatureGroup(name=name, show=True) for name in spec.layers]
+
+    def target(layer: Optional[int]):
+        return m if layer is None else groups[layer]
+
+    entries = []
+    for marker in spec.markers:
+        parent = target(marker.layer)
+        entries.append((folium.Marker(
+            location=[marker.lat, marker.lon],
+            tooltip=folium.Tooltip(marker_tooltip_html(marker, locale)),
+            icon=folium.Icon(color=marker.color, icon=marker.icon, prefix=marker.prefix),
+        ).add_to(parent), parent, marker.ids))
+
+    if spec.route:
+        style = spec.route.style
+        AntPath(
+            locations=spec.route.path,
+            color=style["color"],
+            weight=style["weight"],
+            opacity=style["opacity"],
+            dash_array=style["dashArray"],
+            delay=style["delay"],
+            pulse_color=style["pulseColor"]
+        ).add_to(target(spec.route.layer))
+        add_route_arrows(target(spec.route.layer), spec.route.arrow_color, spec.route.legs)
+
+    for group in groups:
+        group.add_to(m)
+    if spec.layer_control:
+        folium.LayerControl(**spec.layer_control).add_to(m)
+    add_marker_index(m, entries)
+    add_lazy_popups(m, popups, [(marker, spec_marker.max_width) for (marker, _, _), spec_marker in zip(entries, spec.markers)],
+                    STRINGS[locale]["popup_failed"])
+    return m
+
+
+def write_map_page(spec: "MapSpec", output_path: str, backend: str, head: List[str], body: List[Chunks],
+                   locale: str = DEFAULT_LOCALE) -> None:
+    """Write a map page with the given backend; body elements that are chunk iterators are streamed in place.
+
+    The popups go to the page's popups file either way (write_popups).
+    """
+    from leaflet_pages import write_leaflet_page, write_popups
 
+    popups = write_popups(output_path, [marker_popup_html(marker, locale) for marker in spec.markers])
+    if backend == "leaflet":
+        write_leaflet_page(output_path, spec, head, body, [marker_tooltip_html(marker, locale) for marker in spec.markers],
+                           popups, STRINGS[locale]["popup_failed"])
+        return
+    import folium
+
+    m = folium_map(spec, popups, locale)
+    slots = {}
+    for element in body:
+        if not isinstance(element, str):
+            placeholder = f"<!--zm:slot{len(slots)}-->"
+            slots[placeholder] = element
+            element = placeholder
+        m.get_root().html.add_child(folium.Element(element))
+    for element in head:
+        m.get_root().header.add_child(folium.Element(element))
+    save_map(m, output_path, slots)
+
+
+def create_day_map(events: List[Event], day_date: datetime, output_path: str, group_by_time: bool = False,
+                   backend: str = "folium", feed: Optional[dict] = None,
+                   locales: Tuple[str, ...] = (DEFAULT_LOCALE,)) -> int:
+    """Day map with one marker per venue (per venue and start time with group_by_time).
+
+    feed: {log, version} of the change log, for the sidebar's live updates.
+    One page per locale (output_path for the default one, see locale_filename()); markers,
+    route and schedule plan are computed once for all of them.
+    """
+    from change_log import event_ids
+    from leaflet_pages import MapRoute, MapSpec
+    from pwa import pwa_head_html
 
-def create_day_map(events: List[Event], day_date: datetime, output_path: str) -> int:
     mappable = [e for e in events if e.lat and e.lon]
     if not mappable:
         return 0
@@ -885,153 +1493,127 @@ def create_day_map(events: List[Event], day_date: datetime, output_path: str) ->
     center_lat = sum(e.lat for e in mappable) / len(mappable)
     center_lon = sum(e.lon for e in mappable) / len(mappable)
 
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=14, tiles=None, control_scale=True)
-    folium.TileLayer('cartodbpositron', name='Claro').add_to(m)
-    folium.TileLayer('OpenStreetMap', name='OpenStreetMap').add_to(m)
-
-    fg_publico = folium.FeatureGroup(name='🔵 Público', show=True)
-    fg_privado = folium.FeatureGroup(name='🟠 Privado', show=True)
-    fg_route = folium.FeatureGroup(name='➡️ Ruta sugerida', show=True)
+    # Tile and layer names are set per locale below
+    spec = MapSpec(center=[center_lat, center_lon], zoom=14, tiles=[], scale=True,
+                   layer_control={"collapsed": False, "position": "topleft"})
+    layer_publico, layer_privado, layer_route = range(3)
 
     sorted_events = sorted(mappable, key=lambda x: x.date)
+    ids = event_ids(mappable)
 
-    for event in sorted_events:
-        venue_type = event.venue.venue_type if event.venue else "special"
+    for group in group_events(sorted_events, by_time=group_by_time):
+        venue_type = group[0].venue.venue_type if group[0].venue else "special"
         icon_info = VENUE_ICONS.get(venue_type, VENUE_ICONS["special"])
-        popup = folium.Popup(create_popup_html(event), max_width=370)
-        tooltip = folium.Tooltip(create_tooltip_html(event))
-
-        marker = folium.Marker(
-            location=[event.lat, event.lon],
-            popup=popup,
-            tooltip=tooltip,
-            icon=folium.Icon(color='orange' if event.category == 'Privado' else 'blue', icon=icon_info["icon"], prefix=icon_info["prefix"])
-        )
-
-        if event.category == "Público":
-            marker.add_to(fg_publico)
+        categories = {e.category for e in group}
+        if categories == {"Público"}:
+            color, layer = 'blue', layer_publico
+        elif categories == {"Privado"}:
+            color, layer = 'orange', layer_privado
+        else:
+            color, layer = 'cadetblue', None  # mixed venues stay visible whichever layer is hidden
+        spec.markers.append(event_marker(group, color, icon_info["icon"], icon_info["prefix"], layer, ids))
+
+    # Route stops: consecutive events at the same venue are one stop (no zero-length hops).
+    # The departure hour of a stop is that of its last event.
+    stops: List[Tuple[List[float], int]] = []
+    for e in sorted_events:
+        if stops and stops[-1][0] == [e.lat, e.lon]:
+            stops[-1] = (stops[-1][0], e.date.hour)
         else:
-            marker.add_to(fg_privado)
+            stops.append(([e.lat, e.lon], e.date.hour))
 
     # Add route with arrows
-    if len(sorted_events) >= 2:
-        route_coords = [[e.lat, e.lon] for e in sorted_events]
-
-        # Animated path
-        AntPath(
-            locations=route_coords,
-            color="#4a90d9",
-            weight=4,
-            opacity=0.8,
-            dash_array=[10, 20],
-            delay=800,
-            pulse_color="#fff"
-        ).add_to(fg_route)
-
-        # Add arrow markers
-        add_arrow_markers(fg_route, route_coords, "#1e3a5f")
-
-    fg_publico.add_to(m)
-    fg_privado.add_to(m)
-    fg_route.add_to(m)
-
-    folium.LayerControl(collapsed=False, position='topleft').add_to(m)
-    m.get_root().html.add_child(folium.Element(create_timeline_html(mappable, day_date)))
-
-    legend_html = """<div style="position: fixed; bottom: 30px; left: 10px; z-index: 1000; background: white; padding: 12px 15px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); font-family: -apple-system, sans-serif; font-size: 11px; border: 1px solid #e2e8f0;"><div style="font-weight: 700; margin-bottom: 8px; color: #1e3a5f;">Leyenda</div><div style="margin: 4px 0;"><span style="color: #4a90d9;">●</span> Público</div><div style="margin: 4px 0;"><span style="color: #e67e22;">●</span> Privado</div><div style="margin: 4px 0;"><span style="color: #4a90d9;">➤</span> Ruta sugerida</div><div style="margin-top: 8px; padding-top: 8px; border-top: 1px solid #e2e8f0;"><div><i class="fa fa-university"></i> Museo</div><div><i class="fa fa-image"></i> Galería</div><div><i class="fa fa-building"></i> Feria</div><div><i class="fa fa-bed"></i> Hotel</div></div></div>"""
-    m.get_root().html.add_child(folium.Element(legend_html))
-    m.get_root().header.add_child(folium.Element('<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css"/>'))
-
-    m.save(output_path)
+    if len(stops) >= 2:
+        route_coords = [coords for coords, _ in stops]
+
+        # Follow the streets between stops when a street graph is available
+        path_coords = [route_coords[0]]
+        for (lat1, lon1), (lat2, lon2) in zip(route_coords, route_coords[1:]):
+            path_coords.extend(walking_route(lat1, lon1, lat2, lon2).polyline[1:])
+
+        spec.route = MapRoute(path=path_coords, legs=route_arrow_legs(route_coords, hours=[hour for _, hour in stops]),
+                              style=ROUTE_STYLE, arrow_color="#1e3a5f", layer=layer_route)
+
+    feasibility = analyze_day_feasibility(mappable)
+    directory, filename = os.path.split(output_path)
+    for locale in locales:
+        text = STRINGS[locale]
+        page = locale_filename(filename, locale)
+        legend_html = f"""<div style="position: fixed; bottom: 30px; left: 10px; z-index: 1000; background: white; padding: 12px 15px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); font-family: -apple-system, sans-serif; font-size: 11px; border: 1px solid #e2e8f0;"><div style="font-weight: 700; margin-bottom: 8px; color: #1e3a5f;">{text['legend']}</div><div style="margin: 4px 0;"><span style="color: #4a90d9;">●</span> {text['categories']['Público']}</div><div style="margin: 4px 0;"><span style="color: #e67e22;">●</span> {text['categories']['Privado']}</div><div style="margin: 4px 0;"><span style="color: #4a90d9;">➤</span> {text['route']}</div><div style="margin-top: 8px; padding-top: 8px; border-top: 1px solid #e2e8f0;"><div><i class="fa fa-university"></i> {text['venue_types']['museum']}</div><div><i class="fa fa-image"></i> {text['venue_types']['gallery']}</div><div><i class="fa fa-building"></i> {text['venue_types']['fair']}</div><div><i class="fa fa-bed"></i> {text['venue_types']['hotel']}</div></div></div>"""
+        page_spec = replace(spec, tiles=[('light', text['light_tiles']), ('osm', 'OpenStreetMap')],
+                            layers=[f"🔵 {text['categories']['Público']}", f"🟠 {text['categories']['Privado']}",
+                                    f"➡️ {text['route']}"])
+        write_map_page(page_spec, os.path.join(directory, page), backend,
+                       head=[FONT_AWESOME_CSS, pwa_head_html(), text_script(locale), alternate_links(filename, locales)],
+                       body=[create_rum_script(os.path.splitext(page)[0]),
+                             stream_timeline_html(mappable, day_date, feed, locale, feasibility), legend_html],
+                       locale=locale)
     return len(mappable)
 
 
-def create_fair_map(events: List[Event], fair_name: str, fair_title: str, output_path: str):
-    """Create a dedicated map for a specific fair."""
+def create_fair_map(events: List[Event], fair_name: str, fair_title: str, output_path: str, backend: str = "folium",
+                    locales: Tuple[str, ...] = (DEFAULT_LOCALE,)):
+    """Create a dedicated map for a specific fair, one page per locale like create_day_map()."""
+    from leaflet_pages import MapMarker, MapSpec
+    from pwa import pwa_head_html
+
     mappable = [e for e in events if e.lat and e.lon]
     if not mappable:
         return
 
     # Center on the fair venue
-    center_lat = mappable[0].lat
-    center_lon = mappable[0].lon
-
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=15, tiles='cartodbpositron')
-
-    for event in mappable:
-        cat_color = CATEGORY_COLORS.get(event.category, "#666")
-        popup = folium.Popup(create_popup_html(event), max_width=370)
-
-        folium.Marker(
-            location=[event.lat, event.lon],
-            popup=popup,
-            tooltip=f"<b>{event.date.strftime('%d/%m %H:%M')}</b><br>{event.title}",
-            icon=folium.Icon(color='purple', icon='building', prefix='fa')
-        ).add_to(m)
-
-    # Title overlay
-    title_html = f"""<div style="position: fixed; top: 10px; left: 50%; transform: translateX(-50%); z-index: 1000; background: white; padding: 15px 30px; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.15); font-family: -apple-system, sans-serif; text-align: center; border: 2px solid #9b59b6;"><div style="font-size: 20px; font-weight: 700; color: #9b59b6;">{fair_title}</div><div style="font-size: 12px; color: #666; margin-top: 4px;">{len(mappable)} eventos • Feb 4-8, 2026</div></div>"""
-    m.get_root().html.add_child(folium.Element(title_html))
-    m.get_root().header.add_child(folium.Element('<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css"/>'))
-
-    m.save(output_path)
+    spec = MapSpec(center=[mappable[0].lat, mappable[0].lon], zoom=15, tiles=[('light', None)])
 
+    for group in group_events(mappable):
+        if len(group) == 1:
+            spec.markers.append(MapMarker(group[0].lat, group[0].lon, group, 'purple', 'building',
+                                          max_width=370, short_tooltip=True))
+        else:
+            spec.markers.append(event_marker(group, 'purple', 'building'))
 
-def create_premium_index(days_info: List[dict], all_events: List[Event], output_dir: str, material_events: List[Event], acme_events: List[Event]):
-    """Create index page with all fairs."""
-
-    total_publico = sum(1 for e in all_events if e.category == "Público")
-    total_privado = sum(1 for e in all_events if e.category == "Privado")
-    total_venues = len(set(e.organizer for e in all_events))
-
-    venue_counts = {}
-    for e in all_events:
-        vt = e.venue.venue_type if e.venue else "special"
-        venue_counts[vt] = venue_counts.get(vt, 0) + 1
+    directory, filename = os.path.split(output_path)
+    for locale in locales:
+        text = STRINGS[locale]
+        page = locale_filename(filename, locale)
+        # Title overlay
+        title_html = f"""<div style="position: fixed; top: 10px; left: 50%; transform: translateX(-50%); z-index: 1000; background: white; padding: 15px 30px; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.15); font-family: -apple-system, sans-serif; text-align: center; border: 2px solid #9b59b6;"><div style="font-size: 20px; font-weight: 700; color: #9b59b6;">{fair_title}</div><div style="font-size: 12px; color: #666; margin-top: 4px;">{text['events'].format(count=len(mappable))} • {text['fair_dates']}</div></div>"""
+        write_map_page(spec, os.path.join(directory, page), backend,
+                       head=[FONT_AWESOME_CSS, pwa_head_html(), text_script(locale), alternate_links(filename, locales)],
+                       body=[create_rum_script(os.path.splitext(page)[0]), title_html], locale=locale)
 
-    events_json = json.dumps([e.to_dict() for e in all_events], ensure_ascii=False)
 
-    day_cards_html = ""
-    for day in days_info:
-        day_cards_html += f"""
-            <div class="day-card" data-day="{day['dow']}" data-filename="{day['filename']}">
+DAY_CARD_TEMPLATE = CompiledTemplate("""
+            <div class="day-card" data-day="{dow}" data-filename="{filename}">
                 <div class="day-card-header">
-                    <div class="day-number">{day['day_num']}</div>
+                    <div class="day-number">{day_num}</div>
                     <div class="day-info">
-                        <div class="day-name">{day['day_name']}</div>
-                        <div class="day-month">Febrero 2026</div>
+                        <div class="day-name">{day_name}</div>
+                        <div class="day-month">{month_year}</div>
                     </div>
                 </div>
                 <div class="day-card-stats">
-                    <div class="stat-pill total">{day['count']} eventos</div>
-                    <div class="stat-pill publico">{day['publico']} púb</div>
-                    <div class="stat-pill privado">{day['privado']} priv</div>
+                    <div class="stat-pill total">{count_label}</div>
+                    <div class="stat-pill publico">{publico_label}</div>
+                    <div class="stat-pill privado">{privado_label}</div>
                 </div>
-                <div class="day-card-preview" id="preview-{day['dow']}"></div>
-                <a href="{day['filename']}" class="day-card-link">
-                    Ver mapa <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2.5"><path d="M5 12h14M12 5l7 7-7 7"/></svg>
+                <div class="day-card-preview" id="preview-{dow}"></div>
+                <a href="{filename}" class="day-card-link">
+                    {view_map} <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2.5"><path d="M5 12h14M12 5l7 7-7 7"/></svg>
                 </a>
             </div>
-        """
+        """)
 
-    venue_badges_html = ""
-    for vt, info in VENUE_ICONS.items():
-        count = venue_counts.get(vt, 0)
-        if count > 0:
-            venue_badges_html += f"""<div class="venue-badge"><i class="fa fa-{info['icon']}" style="color: {info['color']};"></i><span class="venue-count">{count}</span><span class="venue-label">{info['label']}</span></div>"""
-
-    # Get unique neighborhoods for filter
-    neighborhoods = sorted(set(e.venue.neighborhood for e in all_events if e.venue and e.venue.neighborhood))
-    neighborhoods_json = json.dumps(neighborhoods, ensure_ascii=False)
-
-    html = f"""<!DOCTYPE html>
-<html lang="es">
+INDEX_TEMPLATE = CompiledTemplate("""<!DOCTYPE html>
+<html lang="{lang}">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Art Week CDMX 2026 | ZonaMaco + Material + ACME</title>
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css"/>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+    {pwa_head}
+    {text_script}
+    {alternate_links}
     <style>
         :root {{
             --white: #ffffff;
@@ -1181,12 +1763,27 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
         .day-card-link {{ display: flex; align-items: center; justify-content: center; gap: 8px; padding: 12px; background: var(--blue-primary); border-radius: 8px; color: white; text-decoration: none; font-weight: 600; font-size: 13px; transition: all 0.2s ease; }}
         .day-card-link:hover {{ background: var(--blue-dark); }}
 
+        /* Near me */
+        .nearby-section {{ margin-bottom: 60px; text-align: center; }}
+        .nearby-btn {{ display: inline-flex; align-items: center; gap: 8px; padding: 12px 20px; background: var(--green-primary); border: none; border-radius: 8px; color: white; font-weight: 600; font-size: 13px; cursor: pointer; transition: all 0.2s ease; }}
+        .nearby-btn:disabled {{ opacity: 0.6; cursor: default; }}
+        .nearby-status {{ font-size: 13px; color: var(--text-secondary); margin-top: 12px; }}
+        .nearby-list {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(320px, 1fr)); gap: 16px; margin-top: 20px; text-align: left; }}
+        .nearby-item {{ background: var(--white); border: 1px solid var(--border); border-radius: 12px; padding: 16px; }}
+        .nearby-venue {{ display: flex; justify-content: space-between; gap: 8px; font-size: 14px; color: var(--text-dark); }}
+        .nearby-distance {{ font-size: 12px; color: var(--green-primary); white-space: nowrap; }}
+        .nearby-meta {{ font-size: 11px; color: var(--text-muted); margin-bottom: 8px; }}
+        .nearby-item .preview-event {{ background: var(--bg-light); text-decoration: none; }}
+        .nearby-walks {{ font-size: 11px; color: var(--text-secondary); margin-top: 8px; }}
+
         footer {{ text-align: center; padding: 40px 24px; border-top: 1px solid var(--border); margin-top: 40px; background: var(--white); }}
         .footer-text {{ color: var(--text-muted); font-size: 13px; }}
+        .lang-link {{ font-size: 13px; font-weight: 600; color: var(--blue-primary); text-decoration: none; }}
         @media (max-width: 768px) {{ .stats-row {{ gap: 20px; }} .stat-value {{ font-size: 1.8rem; }} .fairs-grid {{ grid-template-columns: 1fr; }} }}
     </style>
 </head>
 <body>
+    {rum_script}
     <header class="header">
         <div class="header-content">
             <div class="logo">
@@ -1194,7 +1791,8 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
                 <span class="logo-badge">2026</span>
             </div>
             <div style="display: flex; align-items: center; gap: 20px;">
-                <div style="font-size: 14px; color: var(--text-secondary);">2 - 8 de Febrero</div>
+                <div style="font-size: 14px; color: var(--text-secondary);">{dates}</div>
+                {language_links}
                 <div class="theme-toggle">
                     <i class="fa fa-sun theme-icon sun"></i>
                     <button class="theme-toggle-btn" id="themeToggle" aria-label="Toggle dark mode"></button>
@@ -1207,38 +1805,38 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
     <div class="search-filter-bar">
         <div class="search-filter-content">
             <div class="search-box">
-                <input type="text" id="searchInput" placeholder="Buscar eventos, galerías, artistas...">
+                <input type="text" id="searchInput" placeholder="{search_placeholder}">
                 <i class="fa fa-search"></i>
             </div>
             <select class="filter-select" id="filterCategory">
-                <option value="">Categoría</option>
-                <option value="Público">🔵 Público</option>
-                <option value="Privado">🟠 Privado</option>
+                <option value="">{category}</option>
+                <option value="Público">🔵 {category_publico}</option>
+                <option value="Privado">🟠 {category_privado}</option>
             </select>
             <select class="filter-select" id="filterVenueType">
-                <option value="">Tipo de venue</option>
-                <option value="museum">🏛️ Museo</option>
-                <option value="gallery">🖼️ Galería</option>
-                <option value="hotel">🏨 Hotel</option>
-                <option value="foundation">🏛️ Fundación</option>
-                <option value="studio">🎨 Estudio</option>
-                <option value="fair">🎪 Feria</option>
-                <option value="special">⭐ Especial</option>
+                <option value="">{venue_type}</option>
+                <option value="museum">🏛️ {venue_museum}</option>
+                <option value="gallery">🖼️ {venue_gallery}</option>
+                <option value="hotel">🏨 {venue_hotel}</option>
+                <option value="foundation">🏛️ {venue_foundation}</option>
+                <option value="studio">🎨 {venue_studio}</option>
+                <option value="fair">🎪 {venue_fair}</option>
+                <option value="special">⭐ {venue_special}</option>
             </select>
             <select class="filter-select" id="filterTimePeriod">
-                <option value="">Horario</option>
-                <option value="morning">🌅 Mañana</option>
-                <option value="afternoon">☀️ Tarde</option>
-                <option value="evening">🌙 Noche</option>
+                <option value="">{time_of_day}</option>
+                <option value="morning">🌅 {period_morning}</option>
+                <option value="afternoon">☀️ {period_afternoon}</option>
+                <option value="evening">🌙 {period_evening}</option>
             </select>
             <select class="filter-select" id="filterFair">
-                <option value="">Feria</option>
+                <option value="">{fair}</option>
                 <option value="zonamaco">💎 ZonaMaco</option>
                 <option value="material">🎨 Material</option>
                 <option value="acme">⚡ ACME</option>
             </select>
             <button class="clear-filters" id="clearFilters" style="display: none;">
-                <i class="fa fa-times"></i> Limpiar
+                <i class="fa fa-times"></i> {clear}
             </button>
             <span class="filter-count" id="filterCount" style="display: none;"></span>
         </div>
@@ -1246,22 +1844,29 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
 
     <div class="container">
         <section class="hero">
-            <h1>Semana del <span>Arte</span></h1>
-            <p class="hero-subtitle">ZonaMaco + Material + Salón ACME • Ciudad de México</p>
+            <h1>{hero_title}</h1>
+            <p class="hero-subtitle">{hero_subtitle}</p>
             <div class="stats-row">
-                <div class="stat-item"><div class="stat-value navy">{len(all_events) + len(material_events) + len(acme_events)}</div><div class="stat-label">Eventos</div></div>
-                <div class="stat-item"><div class="stat-value blue">{total_venues}</div><div class="stat-label">Venues</div></div>
-                <div class="stat-item"><div class="stat-value orange">3</div><div class="stat-label">Ferias</div></div>
+                <div class="stat-item"><div class="stat-value navy">{total_events}</div><div class="stat-label">{stat_events}</div></div>
+                <div class="stat-item"><div class="stat-value blue">{total_venues}</div><div class="stat-label">{stat_venues}</div></div>
+                <div class="stat-item"><div class="stat-value orange">3</div><div class="stat-label">{stat_fairs}</div></div>
             </div>
             <div class="category-pills">
-                <div class="category-pill publico"><strong>{total_publico}</strong> Públicos</div>
-                <div class="category-pill privado"><strong>{total_privado}</strong> Privados</div>
+                <div class="category-pill publico"><strong>{total_publico}</strong> {public_total}</div>
+                <div class="category-pill privado"><strong>{total_privado}</strong> {private_total}</div>
             </div>
-            <div class="venue-badges">{venue_badges_html}</div>
+            <div class="venue-badges">{venue_badges}</div>
+        </section>
+
+        <section class="nearby-section">
+            <h2 class="section-title">{nearby_title}</h2>
+            <button class="nearby-btn" id="nearbyBtn"><i class="fa fa-location-arrow"></i> {nearby_button}</button>
+            <p class="nearby-status" id="nearbyStatus"></p>
+            <div class="nearby-list" id="nearbyList"></div>
         </section>
 
         <section class="fairs-section">
-            <h2 class="section-title">Las Ferias</h2>
+            <h2 class="section-title">{fairs_title}</h2>
             <div class="fairs-grid">
                 <div class="fair-card zonamaco">
                     <div class="fair-header">
@@ -1269,8 +1874,8 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
                         <div><div class="fair-name">ZonaMaco</div><div class="fair-venue">Centro Banamex</div></div>
                     </div>
                     <div class="fair-dates">📅 4-8 Feb • VIP Preview 4 Feb</div>
-                    <p style="font-size: 13px; color: var(--text-secondary); margin-bottom: 16px;">La feria de arte contemporáneo más importante de América Latina. 200+ galerías internacionales.</p>
-                    <a href="2026-02-05_Jueves.html" class="fair-link zonamaco">Ver programa ZonaMaco →</a>
+                    <p style="font-size: 13px; color: var(--text-secondary); margin-bottom: 16px;">{zonamaco_about}</p>
+                    <a href="{zonamaco_page}" class="fair-link zonamaco">{view_zonamaco}</a>
                 </div>
                 <div class="fair-card material">
                     <div class="fair-header">
@@ -1278,8 +1883,8 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
                         <div><div class="fair-name">Material Art Fair</div><div class="fair-venue">Expo Reforma</div></div>
                     </div>
                     <div class="fair-dates">📅 5-8 Feb • VIP Preview 4 Feb</div>
-                    <p style="font-size: 13px; color: var(--text-secondary); margin-bottom: 16px;">Arte emergente y diseño. Galerías jóvenes de México y Latinoamérica.</p>
-                    <a href="material.html" class="fair-link material">Ver programa Material →</a>
+                    <p style="font-size: 13px; color: var(--text-secondary); margin-bottom: 16px;">{material_about}</p>
+                    <a href="{material_page}" class="fair-link material">{view_material}</a>
                 </div>
                 <div class="fair-card acme">
                     <div class="fair-header">
@@ -1287,20 +1892,21 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
                         <div><div class="fair-name">Salón ACME</div><div class="fair-venue">Frontón México</div></div>
                     </div>
                     <div class="fair-dates">📅 5-8 Feb • VIP Preview 4 Feb</div>
-                    <p style="font-size: 13px; color: var(--text-secondary); margin-bottom: 16px;">Arte independiente y experimental en el icónico Frontón México.</p>
-                    <a href="acme.html" class="fair-link acme">Ver programa ACME →</a>
+                    <p style="font-size: 13px; color: var(--text-secondary); margin-bottom: 16px;">{acme_about}</p>
+                    <a href="{acme_page}" class="fair-link acme">{view_acme}</a>
                 </div>
             </div>
         </section>
 
         <section class="days-section">
-            <h2 class="section-title">Programa ZonaMaco VIP por Día</h2>
-            <div class="days-grid">{day_cards_html}</div>
+            <h2 class="section-title">{days_title}</h2>
+            <div class="days-grid">{day_cards}</div>
         </section>
     </div>
 
     <footer><p class="footer-text">Art Week CDMX 2026 • ZonaMaco + Material + Salón ACME</p></footer>
 
+    {change_feed_script}
     <script>
         const events = {events_json};
         const neighborhoods = {neighborhoods_json};
@@ -1353,7 +1959,7 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
 
             if (hasFilters) {{
                 filterCountEl.style.display = 'inline';
-                filterCountEl.textContent = filteredEvents.length + ' de ' + events.length;
+                filterCountEl.textContent = zmText.of.replace('{{count}}', filteredEvents.length).replace('{{total}}', events.length);
             }} else {{
                 filterCountEl.style.display = 'none';
             }}
@@ -1378,14 +1984,14 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
                 const publico = dayEvents.filter(e => e.category === 'Público').length;
                 const privado = dayEvents.filter(e => e.category === 'Privado').length;
                 statsEl.innerHTML = `
-                    <div class="stat-pill total">${{dayEvents.length}} eventos</div>
-                    <div class="stat-pill publico">${{publico}} púb</div>
-                    <div class="stat-pill privado">${{privado}} priv</div>
+                    <div class="stat-pill total">${{zmText.events.replace('{{count}}', dayEvents.length)}}</div>
+                    <div class="stat-pill publico">${{zmText.public_count.replace('{{count}}', publico)}}</div>
+                    <div class="stat-pill privado">${{zmText.private_count.replace('{{count}}', privado)}}</div>
                 `;
 
                 // Update preview
                 const html = dayEvents.map(e => `<div class="preview-event ${{e.category.toLowerCase()}}"><span class="preview-time">${{e.time}}</span><span class="preview-title">${{e.organizer}}</span></div>`).join('');
-                preview.innerHTML = html || '<p style="color: var(--text-muted); font-size: 11px; text-align: center; padding: 15px;">Sin eventos</p>';
+                preview.innerHTML = html || '<p style="color: var(--text-muted); font-size: 11px; text-align: center; padding: 15px;">' + zmText.no_events + '</p>';
 
                 // Dim cards with no events
                 card.style.opacity = dayEvents.length === 0 && hasFilters ? '0.5' : '1';
@@ -1398,7 +2004,7 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
                     noResults = document.createElement('div');
                     noResults.id = 'noResults';
                     noResults.className = 'no-results';
-                    noResults.innerHTML = '<i class="fa fa-search"></i><p>No se encontraron eventos con los filtros seleccionados</p>';
+                    noResults.innerHTML = '<i class="fa fa-search"></i><p>' + zmText.no_results + '</p>';
                     daysGrid.after(noResults);
                 }}
                 noResults.style.display = 'block';
@@ -1435,6 +2041,22 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
 
         // Initial render
         applyFilters();
+        if (window.zmRum) zmRum.mark('cards_rendered');
+
+        // Live schedule changes (change_log.py): patch the events array and re-render the cards.
+        // The index lists the ZonaMaco program; other fairs' events have their own pages.
+        const changeFeed = {change_feed};
+        if (changeFeed) {{
+            zmChangeFeed(changeFeed.log, changeFeed.version, changes => {{
+                changes.forEach(([op, id, record]) => {{
+                    const i = events.findIndex(e => e.id === id);
+                    if (i >= 0) events.splice(i, 1);
+                    if (op !== 'removed' && record.fair === 'zonamaco') events.push(Object.assign({{id: id}}, record));
+                }});
+                events.sort((a, b) => a.date < b.date ? -1 : a.date > b.date ? 1 : 0);
+                applyFilters();
+            }});
+        }}
 
         // Theme Toggle
         const themeToggle = document.getElementById('themeToggle');
@@ -1458,102 +2080,973 @@ def create_premium_index(days_info: List[dict], all_events: List[Event], output_
             }}
         }});
     </script>
+    {nearby_script}
 </body>
 </html>
-"""
+""")
+
+
+# "Cerca de mí": the visitor's geohash cell picks the shards to download (geo_shards.py);
+# distances and walking minutes use the same formulas as haversine_distance() and calculate_walking_time().
+NEARBY_SCRIPT = r"""<script>
+    (function() {
+        const BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz';
+        const NEARBY_VENUES = 6;
+        const btn = document.getElementById('nearbyBtn');
+        const statusEl = document.getElementById('nearbyStatus');
+        const list = document.getElementById('nearbyList');
+        const shards = {};
+        let index = null;
+
+        if (!('geolocation' in navigator)) {
+            btn.disabled = true;
+            statusEl.textContent = zmText.geolocation_unsupported;
+            return;
+        }
 
-    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as f:
-        f.write(html)
+        function geohash(lat, lon, precision) {
+            const latRange = [-90, 90], lonRange = [-180, 180];
+            let hash = '', bits = 0, value = 0, even = true;
+            while (hash.length < precision) {
+                const range = even ? lonRange : latRange, mid = (range[0] + range[1]) / 2;
+                value <<= 1;
+                if ((even ? lon : lat) >= mid) { value |= 1; range[0] = mid; } else { range[1] = mid; }
+                even = !even;
+                if (++bits === 5) { hash += BASE32[value]; bits = 0; value = 0; }
+            }
+            return hash;
+        }
 
+        function distanceKm(lat1, lon1, lat2, lon2) {
+            const rad = Math.PI / 180, dLat = (lat2 - lat1) * rad, dLon = (lon2 - lon1) * rad;
+            const a = Math.sin(dLat / 2) ** 2 + Math.cos(lat1 * rad) * Math.cos(lat2 * rad) * Math.sin(dLon / 2) ** 2;
+            return 6371 * 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1 - a));
+        }
 
-def main():
-    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "maps")
-    os.makedirs(output_dir, exist_ok=True)
+        function formatMinutes(minutes) {
+            if (minutes < 1) return '< 1 min';
+            if (minutes < 60) return minutes + ' min';
+            const hours = Math.floor(minutes / 60), mins = minutes % 60;
+            return mins ? hours + 'h ' + mins + 'min' : hours + 'h';
+        }
 
-    print("=" * 60)
-    print("   ZonaMaco 2026 - Generador de Mapas v4.5")
-    print("   + Material Art Fair + Salón ACME")
-    print("   + Search, Calendar, Dark Mode, Walking Times")
-    print("=" * 60)
+        function escapeHtml(text) {
+            return String(text).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})[c]);
+        }
 
-    # Parse all events
-    events = parse_events()
-    material_events = parse_material_events()
-    acme_events = parse_acme_events()
+        function fetchJson(url) {
+            return fetch(url).then(response => {
+                if (!response.ok) throw new Error(url + ': ' + response.status);
+                return response.json();
+            });
+        }
 
-    # Validate all events (prints report)
-    all_events = events + material_events + acme_events
-    validate_events(all_events)
+        function loadShard(cell) {
+            return shards[cell] || (shards[cell] = fetchJson('shards/' + cell + '.json'));
+        }
 
-    print(f"\n📊 ZonaMaco: {len(events)} eventos")
-    print(f"📊 Material: {len(material_events)} eventos")
-    print(f"📊 ACME: {len(acme_events)} eventos")
-    print(f"📊 TOTAL: {len(all_events)} eventos")
-    print(f"\n🔵 Públicos: {sum(1 for e in all_events if e.category == 'Público')}")
-    print(f"🟠 Privados: {sum(1 for e in all_events if e.category == 'Privado')}")
+        function render(lat, lon, loaded) {
+            const byCell = {}, venues = [];
+            loaded.forEach(shard => {
+                byCell[shard.cell] = shard;
+                shard.venues.forEach((v, i) => venues.push({shard: shard, index: i, row: v, events: [],
+                                                            km: distanceKm(lat, lon, v[1], v[2])}));
+            });
+            const lookup = {};
+            venues.forEach(v => { lookup[v.shard.cell + ':' + v.index] = v; });
+            loaded.forEach(shard => shard.events.forEach(e => lookup[shard.cell + ':' + e[0]].events.push(e)));
+            venues.sort((a, b) => a.km - b.km);
+
+            const d = new Date(), pad = n => String(n).padStart(2, '0');
+            const now = d.getFullYear() + '-' + pad(d.getMonth() + 1) + '-' + pad(d.getDate()) + 'T' + pad(d.getHours()) + ':' + pad(d.getMinutes());
+            list.innerHTML = venues.slice(0, NEARBY_VENUES).map(v => {
+                const upcoming = v.events.filter(e => e[1] >= now);
+                const events = (upcoming.length ? upcoming : v.events).slice(0, 3).map(e =>
+                    `<a class="preview-event ${e[4].toLowerCase().normalize('NFD').replace(/[\u0300-\u036f]/g, '')}" href="${encodeURI(e[6].replace(/\.html$/, zmText.page_suffix + '.html'))}"><span class="preview-time">${e[1].slice(8, 10)}/${e[1].slice(5, 7)} ${e[1].slice(11, 16)}</span><span class="preview-title">${escapeHtml(e[2])} · ${escapeHtml(e[3])}</span></a>`).join('');
+                const walks = v.shard.walks.filter(w => w[0] === v.index && byCell[w[1]]).slice(0, 3)
+                    .map(w => escapeHtml(byCell[w[1]].venues[w[2]][0]) + ' (' + formatMinutes(w[3]) + ')');
+                return `<div class="nearby-item"><div class="nearby-venue"><strong>${escapeHtml(v.row[0])}</strong><span class="nearby-distance">🚶 ${formatMinutes(Math.round(v.km / 5 * 60))} · ${v.km < 1 ? Math.round(v.km * 1000) + ' m' : v.km.toFixed(1) + ' km'}</span></div><div class="nearby-meta">${escapeHtml(v.row[4])}</div>${events}${walks.length ? '<div class="nearby-walks">🚶 ' + zmText.on_foot + ': ' + walks.join(', ') + '</div>' : ''}</div>`;
+            }).join('');
+            statusEl.textContent = zmText.venues_around.replace('{count}', venues.length);
+        }
+
+        function search(position) {
+            const lat = position.coords.latitude, lon = position.coords.longitude;
+            statusEl.textContent = zmText.searching;
+            (index ? Promise.resolve(index) : fetchJson('shards/index.json').then(data => index = data))
+                .then(data => {
+                    const cells = data.cells[geohash(lat, lon, data.precision)] || [];
+                    return Promise.all(cells.map(loadShard));
+                })
+                .then(loaded => {
+                    if (!loaded.length) {
+                        list.innerHTML = '';
+                        statusEl.textContent = zmText.nothing_nearby;
+                        return;
+                    }
+                    render(lat, lon, loaded);
+                })
+                .catch(() => { statusEl.textContent = zmText.nearby_failed; })
+                .finally(() => { btn.disabled = false; });
+        }
+
+        btn.addEventListener('click', () => {
+            btn.disabled = true;
+            statusEl.textContent = zmText.locating;
+            navigator.geolocation.getCurrentPosition(search, () => {
+                btn.disabled = false;
+                statusEl.textContent = zmText.locate_failed;
+            }, {timeout: 10000, maximumAge: 300000});
+        });
+    })();
+    </script>"""
 
-    # Group by day
+
+def _json_array(items) -> Iterator[str]:
+    """json.dumps(list, ensure_ascii=False), one chunk per item."""
+    yield "["
+    for i, item in enumerate(items):
+        yield (", " if i else "") + json.dumps(item, ensure_ascii=False)
+    yield "]"
+
+
+def create_premium_index(days_info: List[dict], all_events: List[Event], output_dir: str, material_events: List[Event], acme_events: List[Event],
+                         feed: Optional[dict] = None, locale: str = DEFAULT_LOCALE,
+                         locales: Tuple[str, ...] = (DEFAULT_LOCALE,)):
+    """Create index page with all fairs, streamed to disk card by card and event by event.
+
+    feed: {log, version} of the change log; the page then patches its events from /api/changes.
+    days_info are day_info() summaries in `locale`; the page is written as
+    locale_filename("index.html", locale) and links to the other `locales`.
+    """
+    from change_log import event_ids
+    from pwa import pwa_head_html
+
+    text = STRINGS[locale]
+    page = locale_filename("index.html", locale)
+
+    total_publico = sum(1 for e in all_events if e.category == "Público")
+    total_privado = sum(1 for e in all_events if e.category == "Privado")
+    total_venues = len(set(e.organizer for e in all_events))
+
+    venue_counts = {}
+    for e in all_events:
+        vt = e.venue.venue_type if e.venue else "special"
+        venue_counts[vt] = venue_counts.get(vt, 0) + 1
+
+    day_cards = (chunk for day in days_info
+                 for chunk in DAY_CARD_TEMPLATE.stream(**{key: str(value) for key, value in day.items()}))
+
+    venue_badges = (
+        f"""<div class="venue-badge"><i class="fa fa-{info['icon']}" style="color: {info['color']};"></i><span class="venue-count">{venue_counts[vt]}</span><span class="venue-label">{text['venue_types'][vt]}</span></div>"""
+        for vt, info in VENUE_ICONS.items() if venue_counts.get(vt, 0) > 0
+    )
+
+    ids = event_ids(all_events)
+
+    # Get unique neighborhoods for filter
+    neighborhoods = sorted(set(e.venue.neighborhood for e in all_events if e.venue and e.venue.neighborhood))
+
+    language_links = "".join(f'<a class="lang-link" hreflang="{other}" href="{locale_filename("index.html", other)}">'
+                             f'{STRINGS[other]["name"]}</a>' for other in locales if other != locale)
+
+    write_chunks(os.path.join(output_dir, page), INDEX_TEMPLATE.stream(
+        lang=locale,
+        pwa_head=pwa_head_html(),
+        text_script=text_script(locale),
+        alternate_links=alternate_links("index.html", locales),
+        language_links=language_links,
+        rum_script=create_rum_script(os.path.splitext(page)[0]),
+        total_events=str(len(all_events) + len(material_events) + len(acme_events)),
+        total_venues=str(total_venues),
+        total_publico=str(total_publico),
+        total_privado=str(total_privado),
+        venue_badges=venue_badges,
+        day_cards=day_cards,
+        events_json=_json_array(dict(e.to_dict(), id=ids[id(e)]) for e in all_events),
+        neighborhoods_json=json.dumps(neighborhoods, ensure_ascii=False),
+        nearby_script=NEARBY_SCRIPT,
+        change_feed_script=CHANGE_FEED_SCRIPT,
+        change_feed=json.dumps(feed),
+        category_publico=text['categories']['Público'],
+        category_privado=text['categories']['Privado'],
+        **{f"venue_{vt}": label for vt, label in text['venue_types'].items()},
+        **{f"period_{period}": label for period, label in text['periods'].items()},
+        zonamaco_page=locale_filename(day_filename(datetime(2026, 2, 5)), locale),
+        material_page=locale_filename("material.html", locale),
+        acme_page=locale_filename("acme.html", locale),
+        view_zonamaco=text['view_program'].format(fair="ZonaMaco"),
+        view_material=text['view_program'].format(fair="Material"),
+        view_acme=text['view_program'].format(fair="ACME"),
+        **text['index'],
+    ))
+
+
+def write_build_manifest(output_dir: str, options: Optional[dict] = None) -> dict:
+    """Write build.json with a build version, the render options and the list of generated artifacts.
+
+    app.py reads it for the /ready probe. The version is the build time plus a
+    short hash of the artifact contents, so identical rebuilds are recognisable.
+    Partial builds compare `options` (see render_options()) before patching a release.
+    """
+    import hashlib
+    from asset_bundles import referenced_vendor_files
+    from change_log import CHANGES_FILE
+    from event_snapshot import SNAPSHOT_FILE
+    from event_store import STORE_FILE
+    from geo_shards import SHARD_DIR, SHARD_INDEX
+    from leaflet_pages import popup_files
+    from pwa import PWA_FILES
+
+    artifacts = sorted(f for f in os.listdir(output_dir)
+                       if f.endswith('.html') or f in PWA_FILES or f in (SNAPSHOT_FILE, STORE_FILE, CHANGES_FILE))
+    if os.path.exists(os.path.join(output_dir, SHARD_DIR, SHARD_INDEX)):
+        artifacts.append(f"{SHARD_DIR}/{SHARD_INDEX}")
+    artifacts += popup_files(output_dir)
+    artifacts += referenced_vendor_files(output_dir)
+    digest = hashlib.sha256()
+    for name in artifacts:
+        with open(os.path.join(output_dir, name), 'rb') as f:
+            digest.update(name.encode('utf-8'))
+            digest.update(f.read())
+
+    manifest = {
+        "version": f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{digest.hexdigest()[:12]}",
+        "built_at": datetime.now().isoformat(timespec='seconds'),
+        "options": options or {},
+        "artifacts": artifacts,
+    }
+    with open(os.path.join(output_dir, "build.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(BASE_DIR, "static", "maps")
+DOCS_DIR = os.path.join(BASE_DIR, "docs")
+RELEASES_DIR = os.path.join(BASE_DIR, "static", "releases")
+
+
+def load_all_events() -> Tuple[List[Event], List[Event], List[Event]]:
+    """Parse ZonaMaco, Material and ACME events."""
+    return parse_events(), parse_material_events(), parse_acme_events()
+
+
+def load_catalog(db: str) -> Tuple[Dict[str, Venue], Tuple[List[Event], List[Event], List[Event]]]:
+    """Venues by key and the (ZonaMaco, Material, ACME) events from a catalog database, in catalog order."""
+    from event_store import EventStore
+
+    store = EventStore(db)
+    try:
+        venues = {row["key"]: Venue(row["name"], row["lat"], row["lon"], row["venue_type"], row["neighborhood"],
+                                    row["address"], row["phone"], row["email"], row["website"])
+                  for row in store.venues()}
+        fairs = []
+        for fair in ("zonamaco", "material", "acme"):
+            fairs.append([Event(date=datetime.fromisoformat(row["starts_at"]), organizer=row["organizer"],
+                                title=row["title"], description=row["description"], category=row["category"],
+                                venue=venues.get(row["venue"]), fair=row["fair"], venue_key=row["venue_key"])
+                          for row in store.events(fair=fair, by_time=False)])
+        CATALOG_VENUES.clear()
+        CATALOG_VENUES.update(venues)
+        return venues, tuple(fairs)
+    finally:
+        store.close()
+
+
+def group_events_by_day(events: List[Event]) -> Dict[datetime, List[Event]]:
     events_by_day: Dict[datetime, List[Event]] = {}
     for event in events:
         day = event.date.replace(hour=0, minute=0, second=0, microsecond=0)
         if day not in events_by_day:
             events_by_day[day] = []
         events_by_day[day].append(event)
+    return events_by_day
+
+
+def day_filename(day: datetime) -> str:
+    return f"{day.strftime('%Y-%m-%d')}_{SPANISH_DAYS[day.weekday()]}.html"
+
+
+def event_page(event: Event) -> str:
+    """The map page an event is on: its fair's page, or its day's for ZonaMaco."""
+    return day_filename(event.date) if event.fair == "zonamaco" else f"{event.fair}.html"
+
+
+def change_record(event: Event) -> dict:
+    """What the change log stores and the pages patch from for one event."""
+    return dict(event.to_dict(), page=event_page(event), lat=event.lat, lon=event.lon)
+
+
+def record_changes(output_dir: str, events: List[Event]) -> dict:
+    """Log this build's event changes (ZONAMACO_CHANGE_LOG overrides the file) and export the feed.
+
+    Returns {log, version} for the pages.
+    """
+    from change_log import CHANGES_FILE, DEFAULT_CHANGE_LOG, ChangeLog, event_ids
+
+    path = os.environ.get("ZONAMACO_CHANGE_LOG", DEFAULT_CHANGE_LOG)
+    log = ChangeLog(path)
+    try:
+        if log.created:
+            print(f"  🆕 Registro de cambios nuevo: {path}. Consérvalo entre builds; las páginas publicadas con otro "
+                  f"registro no reciben cambios hasta recargarse")
+        ids = event_ids(events)
+        version, counts = log.record({ids[id(e)]: change_record(e) for e in events})
+        size = log.export(os.path.join(output_dir, CHANGES_FILE))
+        print(f"  📰 Cambios: v{version} (+{counts['added']} ~{counts['updated']} -{counts['removed']}), {size / 1024:.1f} KB")
+        return {"log": log.log_id, "version": version}
+    finally:
+        log.close()
+
+
+def write_proximity_shards(output_dir: str, events: List[Event]) -> None:
+    """Geohash shards for the index's "near me" (see geo_shards.py), walking times from haversine_distance()."""
+    from geo_shards import SHARD_DIR, write_shards
+
+    count, size = write_shards(
+        os.path.join(output_dir, SHARD_DIR), events,
+        lambda lat1, lon1, lat2, lon2: calculate_walking_time(haversine_distance(lat1, lon1, lat2, lon2)),
+        event_page)
+    print(f"  🧭 Shards: {count} celdas geohash, {size / 1024:.1f} KB")
+
+
+def parse_day_arg(value: str, days: List[datetime]) -> datetime:
+    """Resolve --day given as YYYY-MM-DD or a Spanish day name (accents optional)."""
+    import unicodedata
+
+    def fold(text: str) -> str:
+        return unicodedata.normalize("NFD", text).encode("ascii", "ignore").decode().lower()
+
+    for day in days:
+        if value == day.strftime("%Y-%m-%d") or fold(value) == fold(SPANISH_DAYS[day.weekday()]):
+            return day
+    valid = ", ".join(d.strftime("%Y-%m-%d") for d in days)
+    raise argparse.ArgumentTypeError(f"unknown day '{value}' (expected one of: {valid})")
+
+
+def print_stats(events: List[Event], material_events: List[Event], acme_events: List[Event]) -> None:
+    all_events = events + material_events + acme_events
+    print(f"\n📊 ZonaMaco: {len(events)} eventos")
+    print(f"📊 Material: {len(material_events)} eventos")
+    print(f"📊 ACME: {len(acme_events)} eventos")
+    print(f"📊 TOTAL: {len(all_events)} eventos")
+    print(f"\n🔵 Públicos: {sum(1 for e in all_events if e.category == 'Público')}")
+    print(f"🟠 Privados: {sum(1 for e in all_events if e.category == 'Privado')}")
 
-    sorted_days = sorted(events_by_day.keys())
-    print(f"\n📅 Días: {len(sorted_days)}")
 
-    days_info = []
-    print("\nGenerando mapas ZonaMaco...")
-
-    for day in sorted_days:
-        day_events = events_by_day[day]
-        day_name = SPANISH_DAYS[day.weekday()]
-        filename = f"{day.strftime('%Y-%m-%d')}_{day_name}.html"
-        output_path = os.path.join(output_dir, filename)
-
-        count = create_day_map(day_events, day, output_path)
-
-        publico = sum(1 for e in day_events if e.category == "Público" and e.lat)
-        privado = sum(1 for e in day_events if e.category == "Privado" and e.lat)
-
-        days_info.append({
-            'day_name': day_name,
-            'day_num': day.day,
-            'date_str': f"{day.day} de {SPANISH_MONTHS[day.month]}",
-            'filename': filename,
-            'count': count,
-            'publico': publico,
-            'privado': privado,
-            'dow': day.weekday(),
-        })
-
-        print(f"  ✅ {day_name} {day.strftime('%d/%m')}: {count} eventos")
-
-    # Create fair-specific maps
-    print("\nGenerando mapas de ferias...")
-    create_fair_map(material_events, "material", "Material Art Fair", os.path.join(output_dir, "material.html"))
-    print("  ✅ Material Art Fair")
-    create_fair_map(acme_events, "acme", "Salón ACME", os.path.join(output_dir, "acme.html"))
-    print("  ✅ Salón ACME")
-
-    # Create index
-    create_premium_index(days_info, events, output_dir, material_events, acme_events)
-
-    # Also copy to docs for GitHub Pages
-    docs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "docs")
-    os.makedirs(docs_dir, exist_ok=True)
+def day_info(day_date: datetime, day_events: List[Event], locale: str = DEFAULT_LOCALE) -> dict:
+    """Summary of one day for the index cards, labelled in `locale`."""
+    text = STRINGS[locale]
+    count = sum(1 for e in day_events if e.lat and e.lon)
+    publico = sum(1 for e in day_events if e.category == "Público" and e.lat)
+    privado = sum(1 for e in day_events if e.category == "Privado" and e.lat)
+    return {
+        'day_name': day_name(day_date, locale),
+        'day_num': day_date.day,
+        'date_str': format_date(day_date, locale),
+        'month_year': f"{text['months'][day_date.month - 1]} {day_date.year}",
+        'filename': locale_filename(day_filename(day_date), locale),
+        'count': count,
+        'publico': publico,
+        'privado': privado,
+        'count_label': text['events'].format(count=count),
+        'publico_label': text['script']['public_count'].format(count=publico),
+        'privado_label': text['script']['private_count'].format(count=privado),
+        'view_map': text['view_map'],
+        'dow': day_date.weekday(),
+    }
+
+
+def render_site(output_dir: str, events: List[Event], material_events: List[Event], acme_events: List[Event],
+                only: Optional[set] = None, backend: str = "folium", feed: Optional[dict] = None,
+                locales: Tuple[str, ...] = LOCALES, group_by_time: bool = False) -> List[str]:
+    """Render the day, fair and index pages with the given map backend; `only` restricts to those filenames.
+
+    feed ({log, version} of the change log) subscribes the sidebars and the index to live changes.
+    group_by_time splits the day maps' venue markers by start time (see create_day_map()).
+    Every page is written once per locale; `only` names default-locale filenames
+    and covers all their variants. Returns the filenames written.
+    """
+    events_by_day = group_events_by_day(events)
+    written = []
+
+    for day_date in sorted(events_by_day.keys()):
+        filename = day_filename(day_date)
+        if only is not None and filename not in only:
+            continue
+        count = create_day_map(events_by_day[day_date], day_date, os.path.join(output_dir, filename),
+                               group_by_time=group_by_time, backend=backend, feed=feed, locales=locales)
+        written += [locale_filename(filename, locale) for locale in locales]
+        print(f"  ✅ {SPANISH_DAYS[day_date.weekday()]} {day_date.strftime('%d/%m')}: {count} eventos")
+
+    for fair_events, fair_name, fair_title in ((material_events, "material", FAIRS["material"]),
+                                               (acme_events, "acme", FAIRS["acme"])):
+        filename = f"{fair_name}.html"
+        if only is None or filename in only:
+            create_fair_map(fair_events, fair_name, fair_title, os.path.join(output_dir, filename), backend=backend,
+                            locales=locales)
+            written += [locale_filename(filename, locale) for locale in locales]
+            print(f"  ✅ {fair_title}")
+
+    if only is None or "index.html" in only:
+        for locale in locales:
+            days_info = [day_info(day_date, events_by_day[day_date], locale) for day_date in sorted(events_by_day)]
+            create_premium_index(days_info, events, output_dir, material_events, acme_events, feed, locale, locales)
+            written.append(locale_filename("index.html", locale))
+        print("  ✅ Índice")
+    if len(locales) > 1:
+        print(f"  🌐 Idiomas: {', '.join(locales)}")
+    return written
+
+
+def finish_build(output_dir: str, written: List[str], minify: bool = True, options: Optional[dict] = None) -> dict:
+    """Post-process the rendered pages: stable ids, vendored bundles, minification, PWA files, build.json."""
+    from asset_bundles import bundle_pages
+    from minify import minify_pages
+    from publish import stabilize_element_ids
+    from pwa import write_pwa_files
+
+    for page in written:
+        path = os.path.join(output_dir, page)
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(stabilize_element_ids(html, page))
+    vendor_files = bundle_pages(output_dir, written)
+    print(f"  📦 Assets: {sum(1 for f in vendor_files if f.endswith(('.js', '.css')))} bundles, {len(vendor_files)} archivos en vendor/")
+    if minify:
+        report = minify_pages(output_dir, written)
+        for page, before, after in report:
+            print(f"  🗜️  {page}: {before / 1024:.1f} KB → {after / 1024:.1f} KB (-{before - after:,} bytes)")
+        saved = sum(before - after for _, before, after in report)
+        print(f"  🗜️  Total ahorrado: {saved / 1024:.1f} KB")
+    _, precached = write_pwa_files(output_dir, "Art Week CDMX 2026 | ZonaMaco + Material + ACME", "Art Week CDMX")
+    print(f"  📴 Service worker: {precached} URLs en precache")
+    return write_build_manifest(output_dir, options)
+
+
+def render_options(backend: str, locales: Tuple[str, ...], group_by_time: bool) -> dict:
+    """The build options that change what the pages look like, as recorded in build.json."""
+    return {"backend": backend, "locales": list(locales), "group_by_time": group_by_time}
+
+
+def release_options(directory: str) -> Optional[dict]:
+    """render_options() of the build in `directory`, or None if its build.json has none."""
+    try:
+        with open(os.path.join(directory, "build.json"), encoding="utf-8") as f:
+            return json.load(f).get("options") or None
+    except (OSError, ValueError):
+        return None
+
+
+def render_release(events: List[Event], material_events: List[Event], acme_events: List[Event],
+                   only: Optional[set] = None, minify: bool = True, releases_dir: str = RELEASES_DIR,
+                   output_dir: str = OUTPUT_DIR, docs_dir: str = DOCS_DIR,
+                   venues: Optional[Dict[str, Venue]] = None, backend: str = "folium",
+                   locales: Tuple[str, ...] = LOCALES, group_by_time: bool = False) -> dict:
+    """Render into a staging directory, publish it atomically, then sync static/maps/ and docs/.
+
+    Partial builds (`only`) start from a copy of the live release, unless it was
+    rendered with other options (backend, locales, grouping): then everything is
+    re-rendered rather than mixing two kinds of pages. The change feed, the event
+    snapshot, the SQLite store app.py queries and the proximity shards are always
+    rewritten from the full event list.
+    """
     import shutil
-    for f in os.listdir(output_dir):
-        if f.endswith('.html'):
-            shutil.copy(os.path.join(output_dir, f), os.path.join(docs_dir, f))
+    from event_snapshot import SNAPSHOT_FILE, write_snapshot
+    from event_store import STORE_FILE, import_catalog
+    from publish import current_release, publish_release, stage_release, sync_tree
+
+    options = render_options(backend, locales, group_by_time)
+    base = None if only is None else (current_release(releases_dir) or output_dir)
+    if base is not None and release_options(base) != options:
+        print(f"  ⚠️  El release actual se generó con otras opciones ({release_options(base) or 'desconocidas'}); "
+              f"se reconstruye todo")
+        only, base = None, None
+    staging = stage_release(releases_dir, base)
+    try:
+        all_events = events + material_events + acme_events
+        feed = record_changes(staging, all_events)
+        written = render_site(staging, events, material_events, acme_events, only, backend=backend, feed=feed,
+                              locales=locales, group_by_time=group_by_time)
+        size = write_snapshot(os.path.join(staging, SNAPSHOT_FILE), all_events)
+        print(f"  🗃️  Snapshot: {len(all_events)} eventos, {size / 1024:.1f} KB")
+        import_catalog(os.path.join(staging, STORE_FILE), VENUES if venues is None else venues, all_events, FAIRS)
+        write_proximity_shards(staging, all_events)
+        fragments = fragment_cache().flush()
+        print(f"  🧩 Fragmentos: {fragments['memory'] + fragments['disk']} reutilizados, {fragments['rendered']} renderizados")
+        manifest = finish_build(staging, written, minify=minify, options=options)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    release = publish_release(staging, releases_dir, manifest['version'])
+    manifest['release'] = release
+    for target in (output_dir, docs_dir):
+        updated, deleted = sync_tree(release, target)
+        print(f"  🔄 {os.path.relpath(target, BASE_DIR)}: {updated} actualizados, {deleted} eliminados")
+    return manifest
+
+
+def build(day: Optional[str] = None, output_dir: str = OUTPUT_DIR, docs_dir: str = DOCS_DIR,
+          minify: bool = True, db: Optional[str] = None, backend: str = "folium",
+          locales: Tuple[str, ...] = LOCALES, group_by_time: bool = False) -> None:
+    """Render the maps. With `day`, only that day's page is re-rendered; with `db`, events come from that catalog.
+
+    backend "leaflet" writes the map pages with leaflet_pages instead of folium. Events are
+    parsed, geocoded and validated once and every page is rendered in each of `locales`.
+    group_by_time gives each venue one day-map marker per start time instead of one per day.
+    """
+    if backend == "folium":
+        require_folium()
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("=" * 60)
+    print("   ZonaMaco 2026 - Generador de Mapas v4.6")
+    print("   + Material Art Fair + Salón ACME")
+    print("   + Search, Calendar, Dark Mode, Walking Times")
+    print("=" * 60)
+
+    # Parse all events (or read them from the catalog)
+    venues = None
+    if db is None:
+        events, material_events, acme_events = load_all_events()
+    else:
+        venues, (events, material_events, acme_events) = load_catalog(db)
+        print(f"🗄️  Catálogo: {db}")
+
+    # Geocode what has no coordinates yet, then validate all events (prints report)
+    all_events = events + material_events + acme_events
+    locate_events(VENUES if venues is None else venues, all_events)
+    validate_events(all_events)
+    print_stats(events, material_events, acme_events)
+
+    sorted_days = sorted(group_events_by_day(events).keys())
+    print(f"\n📅 Días: {len(sorted_days)}")
+
+    only = None
+    if day is not None:
+        only = {day_filename(parse_day_arg(day, sorted_days))}
+
+    print(f"\nGenerando mapas ({backend})...")
+    manifest = render_release(events, material_events, acme_events, only, minify=minify,
+                              output_dir=output_dir, docs_dir=docs_dir, venues=venues, backend=backend,
+                              locales=locales, group_by_time=group_by_time)
 
     print(f"\n{'=' * 60}")
+    print(f"✨ Release publicado: {manifest['release']}")
     print(f"✨ Mapas generados en: {output_dir}")
     print(f"✨ GitHub Pages en: {docs_dir}")
+    print(f"🏷️  Versión: {manifest['version']}")
     print(f"🌐 Abre index.html en tu navegador")
     print("=" * 60)
 
 
+# =============================================================================
+# WATCH MODE (dependency-aware partial rebuilds)
+# =============================================================================
+# Events and venues are defined in this file, so it is the watched source.
+WATCH_SOURCES = [os.path.abspath(__file__)]
+WATCH_INTERVAL = 0.5  # seconds between mtime/size polls
+
+# Venue fields that the index page shows; other venue fields only affect the map pages.
+INDEX_VENUE_FIELDS = ("neighborhood", "venue_type")
+
+# Functions holding event data as code constants; edits to them are data edits, not template edits.
+DATA_FUNCTIONS = {"parse_events", "parse_material_events", "parse_acme_events"}
+
+
+@dataclass
+class BuildGraph:
+    """Dependency graph venue key -> events -> pages, plus fingerprints to diff against.
+
+    Events are identified by (fair, organizer, title, n) where n disambiguates
+    repeats, so moving an event to another day is an update of the same node.
+    """
+    venue_fp: Dict[str, tuple]
+    event_fp: Dict[tuple, tuple]
+    venue_events: Dict[str, set]
+    event_pages: Dict[tuple, set]
+    code_fp: str
+
+
+def _code_fingerprint(code) -> tuple:
+    """Bytecode, constants and names of a code object, ignoring line numbers."""
+    consts = tuple(_code_fingerprint(c) if hasattr(c, "co_code") else repr(c) for c in code.co_consts)
+    return (code.co_code, consts, code.co_names)
+
+
+def build_dependency_graph(module, db: Optional[str] = None) -> BuildGraph:
+    """Build the dependency graph from a (freshly loaded) mapper module, or from its view of the catalog `db`."""
+    import hashlib
+
+    venues, events = _load_watched(module, db)
+    venue_key_of = {id(v): k for k, v in venues.items()}
+    venue_fp = {k: tuple(getattr(v, f) for f in v.__dataclass_fields__) for k, v in venues.items()}
+
+    event_fp: Dict[tuple, tuple] = {}
+    venue_events: Dict[str, set] = {}
+    event_pages: Dict[tuple, set] = {}
+    seen: Counter = Counter()
+    for e in sum(events, []):
+        base = (e.fair, e.organizer, e.title)
+        node = base + (seen[base],)
+        seen[base] += 1
+        venue_key = venue_key_of.get(id(e.venue))
+        event_fp[node] = (e.date, e.description, e.category, venue_key)
+        if e.fair == "zonamaco":
+            day = e.date.replace(hour=0, minute=0, second=0, microsecond=0)
+            event_pages[node] = {module.day_filename(day), "index.html"}
+        else:
+            event_pages[node] = {f"{e.fair}.html", "index.html"}
+        if venue_key is not None:
+            venue_events.setdefault(venue_key, set()).add(node)
+
+    code = hashlib.sha256()
+    for name, obj in sorted(vars(module).items()):
+        if name in DATA_FUNCTIONS or name == "VENUES":
+            continue
+        if callable(obj) and hasattr(obj, "__code__") and obj.__module__ == module.__name__:
+            code.update(repr(_code_fingerprint(obj.__code__)).encode("utf-8"))
+        elif name.isupper() and isinstance(obj, (dict, list, tuple, str, int, float)):
+            code.update(f"{name}={obj!r}".encode("utf-8"))
+    return BuildGraph(venue_fp, event_fp, venue_events, event_pages, code.hexdigest())
+
+
+def affected_pages(old: BuildGraph, new: BuildGraph) -> Optional[set]:
+    """Pages to rebuild going from `old` to `new`; None means everything (template change)."""
+    if old.code_fp != new.code_fp:
+        return None
+
+    pages: set = set()
+    for node in old.event_fp.keys() | new.event_fp.keys():
+        if old.event_fp.get(node) != new.event_fp.get(node):
+            pages |= old.event_pages.get(node, set()) | new.event_pages.get(node, set())
+
+    index_fields = [i for i, f in enumerate(Venue.__dataclass_fields__) if f in INDEX_VENUE_FIELDS]
+    for key in old.venue_fp.keys() | new.venue_fp.keys():
+        before, after = old.venue_fp.get(key), new.venue_fp.get(key)
+        if before == after:
+            continue
+        for node in old.venue_events.get(key, set()) | new.venue_events.get(key, set()):
+            node_pages = old.event_pages.get(node, set()) | new.event_pages.get(node, set())
+            if before and after and all(before[i] == after[i] for i in index_fields):
+                node_pages = node_pages - {"index.html"}
+            pages |= node_pages
+    return pages
+
+
+def _load_watched(module, db: Optional[str] = None) -> Tuple[Dict[str, Venue], Tuple[List[Event], List[Event], List[Event]]]:
+    """Venues and (ZonaMaco, Material, ACME) events as `module` loads them: from its source, or from the catalog."""
+    if db is not None:
+        return module.load_catalog(db)
+    return module.VENUES, module.load_all_events()
+
+
+def _load_sources(path: str, generation: int):
+    """Load a fresh, independent copy of the mapper module from `path`."""
+    import importlib.util
+
+    name = f"_zonamaco_watch_{generation}"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module  # dataclasses resolve annotations through sys.modules
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.modules.pop(name, None)
+    return module
+
+
+def _stat_sources(paths: List[str]) -> Dict[str, tuple]:
+    stats = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stats[path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stats[path] = None
+    return stats
+
+
+def watch(output_dir: str = OUTPUT_DIR, docs_dir: str = DOCS_DIR, interval: float = WATCH_INTERVAL,
+          minify: bool = True, db: Optional[str] = None, backend: str = "folium",
+          locales: Tuple[str, ...] = LOCALES, group_by_time: bool = False) -> None:
+    """Poll the sources and rebuild only the pages affected by each edit.
+
+    Uses mtime+size polling so it works without inotify bindings. A source that
+    fails to load (e.g. a half-saved edit) is reported and skipped until the
+    next change. The build options are those of build(); with `db` the catalog
+    file is watched too. One fragment cache is kept across source reloads.
+    """
+    import time
+    import traceback
+
+    if backend == "folium":
+        require_folium()
+    os.makedirs(output_dir, exist_ok=True)
+    source = WATCH_SOURCES[0]
+    watched = WATCH_SOURCES + ([os.path.abspath(db)] if db else [])
+    generation = 0
+
+    def rebuild(module, only):
+        venues, events = _load_watched(module, db)
+        module.locate_events(venues, sum(events, []))
+        module.render_release(*events, only=only, minify=minify, output_dir=output_dir, docs_dir=docs_dir,
+                              venues=venues, backend=backend, locales=locales, group_by_time=group_by_time)
+
+    module = _load_sources(source, generation)
+    graph = build_dependency_graph(module, db)
+    print("👀 Build inicial...")
+    rebuild(module, None)
+
+    stats = _stat_sources(watched)
+    print(f"👀 Observando {', '.join(os.path.basename(p) for p in watched)} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(interval)
+            current = _stat_sources(watched)
+            if current == stats:
+                continue
+            stats = current
+            started = time.perf_counter()
+            generation += 1
+            try:
+                new_module = _load_sources(source, generation)
+                new_graph = build_dependency_graph(new_module, db)
+            except Exception:
+                print("⚠️  No se pudo cargar la fuente; esperando el siguiente cambio:")
+                traceback.print_exc(limit=1)
+                continue
+
+            pages = affected_pages(graph, new_graph)
+            new_module.fragment_cache(module.fragment_cache())
+            module, graph = new_module, new_graph
+            if pages is not None and not pages:
+                print("·  Sin cambios en los datos")
+                continue
+            label = "todo (cambio de plantilla)" if pages is None else ", ".join(sorted(pages))
+            print(f"🔁 Reconstruyendo: {label}")
+            # Render with the reloaded module so template edits take effect too
+            rebuild(module, pages)
+            print(f"✨ Listo en {time.perf_counter() - started:.2f}s")
+    except KeyboardInterrupt:
+        print("\n👋 Watch detenido")
+
+
+def cmd_validate(args: argparse.Namespace) -> int:
+    events, material_events, acme_events = load_all_events()
+    # Only what the cache already knows; geocoding is left to build and geocode
+    locate_events(VENUES, events + material_events + acme_events, cache_only=True)
+    issues = validate_events(events + material_events + acme_events)
+    return 1 if issues else 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    events, material_events, acme_events = load_all_events()
+    print_stats(events, material_events, acme_events)
+    print("\n📅 Por día:")
+    for day_date, day_events in sorted(group_events_by_day(events).items()):
+        mapped = sum(1 for e in day_events if e.lat and e.lon)
+        print(f"  {SPANISH_DAYS[day_date.weekday()]:<10} {day_date.strftime('%d/%m')}: {len(day_events):>3} eventos ({mapped} en mapa)")
+    venue_types = Counter(e.venue.venue_type if e.venue else "special" for e in events)
+    print("\n🏛️  Por tipo de venue:")
+    for vt, count in venue_types.most_common():
+        print(f"  {VENUE_ICONS.get(vt, VENUE_ICONS['special'])['label']:<10} {count:>3}")
+    return 0
+
+
+PREWARM_RADIUS_KM = 20  # events farther than this from the median venue (day trips) are left out
+
+
+def event_bbox(events: List[Event], radius_km: float = PREWARM_RADIUS_KM) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) around the mapped events near the city centre."""
+    located = [e for e in events if e.lat and e.lon]
+    lats, lons = sorted(e.lat for e in located), sorted(e.lon for e in located)
+    mid_lat, mid_lon = lats[len(lats) // 2], lons[len(lons) // 2]
+    near = [e for e in located if haversine_distance(mid_lat, mid_lon, e.lat, e.lon) <= radius_km]
+    return (min(e.lat for e in near), min(e.lon for e in near),
+            max(e.lat for e in near), max(e.lon for e in near))
+
+
+def cmd_prewarm_tiles(args: argparse.Namespace) -> int:
+    from tile_cache import TILE_LAYERS, prewarm, proxy_from_env, tiles_in_bbox
+
+    unknown = sorted(set(args.layer or ()) - set(TILE_LAYERS))
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown tile layer: {', '.join(unknown)} (choose from {', '.join(sorted(TILE_LAYERS))})")
+    events, material_events, acme_events = load_all_events()
+    bbox = event_bbox(events + material_events + acme_events)
+    zooms = range(args.min_zoom, args.max_zoom + 1)
+    layers = args.layer or ["light"]
+    total = sum(1 for _ in tiles_in_bbox(*bbox, zooms)) * len(layers)
+    print(f"🗺️  Precalentando {total} tiles ({', '.join(layers)}; zoom {args.min_zoom}-{args.max_zoom})")
+    counts = prewarm(proxy_from_env(require_enabled=False), bbox, zooms, layers)
+    print(f"✅ {counts['fetched']} descargados, {counts['cached']} ya en caché, {counts['failed']} fallidos")
+    return 1 if counts['failed'] else 0
+
+
+def cmd_geocode(args: argparse.Namespace) -> int:
+    """Run the geocoding stage on its own (e.g. to fill the cache before an offline build)."""
+    from geocoding import GEOCODE_WORKERS, geocoder_from_env, geocoder_from_spec
+
+    workers = args.workers or GEOCODE_WORKERS
+    try:
+        geocoder = geocoder_from_spec(args.geocoder, workers) if args.geocoder else geocoder_from_env(workers)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    events, material_events, acme_events = load_all_events()
+    stats = locate_events(VENUES, events + material_events + acme_events, geocoder)
+    if stats is None:
+        print("📍 Geocodificación: todos los venues tienen coordenadas")
+        return 0
+    return 1 if stats["missing"] else 0
+
+
+def build_locales(selected: Optional[List[str]]) -> Tuple[str, ...]:
+    """The --locale choices in LOCALES order; the default locale is always rendered, since
+    the manifest, the shards and the sidebars link to its filenames."""
+    return tuple(locale for locale in LOCALES if locale == DEFAULT_LOCALE or locale in selected) if selected else LOCALES
+
+
+def cmd_build(args: argparse.Namespace) -> int:
+    build(day=args.day, minify=not args.no_minify, db=args.db, backend=args.backend, locales=build_locales(args.locale),
+          group_by_time=args.group_by_time)
+    return 0
+
+
+def cmd_check_backends(args: argparse.Namespace) -> int:
+    """Render every map page with both backends and compare the maps they draw."""
+    import tempfile
+    import time
+    from leaflet_pages import compare_features, folium_features, leaflet_features
+
+    require_folium()
+    events, material_events, acme_events = load_all_events()
+    locales = (DEFAULT_LOCALE,) if args.locale == DEFAULT_LOCALE else (DEFAULT_LOCALE, args.locale)
+    pages = [(day_filename(day), lambda path, backend, evs=evs, day=day: create_day_map(evs, day, path, backend=backend,
+                                                                                        locales=locales))
+             for day, evs in sorted(group_events_by_day(events).items())]
+    pages += [(f"{name}.html", lambda path, backend, evs=evs, name=name: create_fair_map(evs, name, FAIRS[name], path, backend=backend,
+                                                                                        locales=locales))
+              for evs, name in ((material_events, "material"), (acme_events, "acme"))]
+
+    failures = 0
+    totals = {backend: [0, 0.0] for backend in MAP_BACKENDS}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in MAP_BACKENDS + ("warmup",):
+            os.makedirs(os.path.join(tmp, backend))
+        for filename, render in pages:
+            render(os.path.join(tmp, "warmup", filename), "leaflet")  # fill the fragment and routing caches first
+            features, report = {}, []
+            for backend in MAP_BACKENDS:
+                path = os.path.join(tmp, backend, filename)
+                start = time.perf_counter()
+                render(path, backend)
+                elapsed = time.perf_counter() - start
+                path = os.path.join(tmp, backend, locale_filename(filename, args.locale))
+                with open(path, encoding="utf-8") as f:
+                    html = f.read()
+                read_features = folium_features if backend == "folium" else leaflet_features
+                features[backend] = read_features(html, os.path.dirname(path))
+                size = len(html.encode("utf-8"))
+                totals[backend][0] += size
+                totals[backend][1] += elapsed
+                report.append(f"{backend} {size / 1024:.1f} KB / {elapsed * 1000:.0f} ms")
+            problems = compare_features(features["folium"], features["leaflet"])
+            if problems:
+                failures += 1
+                print(f"  ❌ {filename}: {'; '.join(problems)}")
+            else:
+                print(f"  ✅ {filename}: {len(features['folium']['markers'])} marcadores · {' → '.join(report)}")
+    print(" · ".join(f"{backend}: {size / 1024:.1f} KB, {elapsed * 1000:.0f} ms" for backend, (size, elapsed) in totals.items()))
+    return 1 if failures else 0
+
+
+def cmd_store(args: argparse.Namespace) -> int:
+    from event_store import DEFAULT_CATALOG, EventStore, import_catalog
+
+    db = args.db or DEFAULT_CATALOG
+    if args.action == "import":
+        events, material_events, acme_events = load_all_events()
+        os.makedirs(os.path.dirname(os.path.abspath(db)), exist_ok=True)
+        count = import_catalog(db, VENUES, events + material_events + acme_events, FAIRS)
+        print(f"🗄️  Catálogo: {count} eventos, {len(VENUES)} venues, {len(FAIRS)} ferias → {db}")
+        return 0
+    store = EventStore(db)
+    try:
+        catalog = store.export_catalog()
+    finally:
+        store.close()
+    text = json.dumps(catalog, indent=2, ensure_ascii=False) + "\n"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"🗄️  {len(catalog['events'])} eventos exportados → {args.output}")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    watch(interval=args.interval, minify=not args.no_minify, db=args.db, backend=args.backend,
+          locales=build_locales(args.locale), group_by_time=args.group_by_time)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ZonaMaco 2026 map generator")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("validate", help="check event data (exit 1 if issues are found)").set_defaults(func=cmd_validate)
+    subparsers.add_parser("stats", help="print event counts").set_defaults(func=cmd_stats)
+    build_parser = subparsers.add_parser("build", help="render the maps (default command)")
+    build_parser.add_argument("--day", help="only re-render one day (YYYY-MM-DD or day name, e.g. Martes)")
+    build_parser.set_defaults(func=cmd_build)
+    check_parser = subparsers.add_parser("check-backends", help="render the map pages with both backends and compare them "
+                                                                "(exit 1 on differences)")
+    check_parser.add_argument("--locale", choices=LOCALES, default=DEFAULT_LOCALE, help="page language to compare")
+    check_parser.set_defaults(func=cmd_check_backends)
+    watch_parser = subparsers.add_parser("watch", help="rebuild affected pages whenever the sources change")
+    watch_parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="polling interval in seconds")
+    watch_parser.set_defaults(func=cmd_watch)
+    # watch re-renders with the same options as build, so a partial rebuild matches the rest of the release
+    for render_parser in (build_parser, watch_parser):
+        render_parser.add_argument("--no-minify", action="store_true", help="keep the pages readable (skip minification)")
+        render_parser.add_argument("--db", help="read events from this catalog database instead of this file")
+        render_parser.add_argument("--backend", choices=MAP_BACKENDS, default="folium",
+                                   help="map page renderer: folium, or leaflet (fixed shell + JSON payload)")
+        render_parser.add_argument("--locale", action="append", choices=LOCALES,
+                                   help="page language to render besides the default one (repeatable, default: all)")
+        render_parser.add_argument("--group-by-time", action="store_true",
+                                   help="one day-map marker per venue and start time instead of per venue")
+
+    store_parser = subparsers.add_parser("store", help="import the events into a SQLite catalog or export it as JSON")
+    store_parser.add_argument("action", choices=("import", "export"))
+    store_parser.add_argument("--db", help="catalog database (default: data/events.sqlite)")
+    store_parser.add_argument("-o", "--output", help="export: write JSON here instead of stdout")
+    store_parser.set_defaults(func=cmd_store)
+
+    geocode_parser = subparsers.add_parser("geocode", help="locate venues without coordinates and fill the geocode cache "
+                                                          "(exit 1 if events remain unlocated)")
+    geocode_parser.add_argument("--geocoder", help="gazetteer:<path> or nominatim:<url> (default: $ZONAMACO_GEOCODER)")
+    geocode_parser.add_argument("--workers", type=int, help="concurrent geocoder requests (default: 4)")
+    geocode_parser.set_defaults(func=cmd_geocode)
+
+    tiles_parser = subparsers.add_parser("prewarm-tiles", help="seed the tile proxy cache for the event area")
+    tiles_parser.add_argument("--min-zoom", type=int, default=12)
+    tiles_parser.add_argument("--max-zoom", type=int, default=17)
+    tiles_parser.add_argument("--layer", action="append", help="tile layer to seed: light or osm (repeatable, default: light)")
+    tiles_parser.set_defaults(func=cmd_prewarm_tiles)
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(["build"])
+    try:
+        return args.func(args)
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())